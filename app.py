@@ -2,40 +2,47 @@
 # -*- coding: utf-8 -*-
 """
 智能瞭望数据分析处理系统 - 主应用
+
+WSGI服务器通过应用工厂启动，例如:
+    gunicorn -w 4 'app:create_app()'
+
+导入本模块只定义应用和路由，不配置日志、不访问数据库也不创建目录；爬虫
+（requests / 结果页解析器）和PDF渲染（pdfkit）相关的模块在第一次使用时才导入。
 """
 
 import os
+import time
+import threading
+import functools
+import json
 import sqlite3
-from flask import Flask, render_template, request, redirect, url_for, session, flash
-from utils.baidu_spider import BaiduSpider
-import pdfkit
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, render_template, stream_template, request, redirect, url_for, session, flash, jsonify, send_from_directory, abort, Response, g
+from utils.spider_pool import SpiderPool
+from utils.db import ConnectionPool
+from utils.search_cache import SqliteSearchCache
+from utils.result_store import ResultStore
+from utils.warehouse_search import KeysetPage
+from utils.pdf_jobs import PdfJobQueue, STATUS_DONE
+from utils.report_cache import ReportCache
+from utils import pdf_chunks
+from utils.warehouse import save_items
+from utils.warehouse_export import export_stream, EXPORT_FORMATS
+from utils import near_dup
+from utils import analytics
+from utils import warehouse_archive
+from utils import batch_search
+from utils import schema
+from utils.log_config import setup_logging
+from utils import metrics
 import datetime
 import logging
 
-# 确保日志目录存在
-os.makedirs('logs', exist_ok=True)
-
-# 配置日志
-print('开始配置日志...')
-# 确保logs目录存在
-if not os.path.exists('logs'):
-    print('创建logs目录')
-    os.makedirs('logs', exist_ok=True)
-
-logging.basicConfig(
-    filename='logs/app.log',
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    encoding='utf-8'
-)
-
-# 添加控制台日志
-console = logging.StreamHandler()
-console.setLevel(logging.DEBUG)
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-console.setFormatter(formatter)
-logging.getLogger('').addHandler(console)
-print('日志配置完成')
+# 日志配置：LOG_PROFILE 选择配置方案（development / production），
+# LOG_LEVELS 按 "模块名=级别,..." 单独设置模块的日志级别
+LOG_PROFILE = os.environ.get('LOG_PROFILE', 'development')
+LOG_LEVELS = os.environ.get('LOG_LEVELS', '')
+logger = logging.getLogger('app')
 
 # 创建Flask应用
 app = Flask(__name__)
@@ -44,66 +51,126 @@ app.secret_key = os.urandom(24)  # 用于会话加密
 # 数据库配置
 DB_PATH = 'data.db'
 
-# 初始化数据库
+# 数据库连接池：借出/归还WAL模式的长连接，池大小与WSGI工作线程数相当
+DB_POOL_SIZE = 16
+db = ConnectionPool(DB_PATH, max_size=DB_POOL_SIZE)
+
+# 搜索结果存储：会话中只保存搜索ID，结果本身保存在服务器端
+result_store = ResultStore(db, ttl=3600, max_entries=1000)
+
+# 数据仓库分页配置：默认每页条数和允许的最大每页条数
+WAREHOUSE_PAGE_SIZE = 50
+WAREHOUSE_MAX_PAGE_SIZE = 500
+
+# 关键词趋势页面配置：默认统计天数、列出的关键词数和每个关键词列出的来源数
+ANALYTICS_DAYS = 30
+ANALYTICS_TOP_KEYWORDS = 20
+ANALYTICS_TOP_SOURCES = 10
+
+# PDF报告配置：输出目录和同时生成PDF的最大任务数
+REPORTS_DIR = os.path.join('static', 'reports')
+PDF_WORKERS = 2
+
+# 大报告分块渲染：数据条数达到阈值时分块并行渲染后合并（需要安装 pypdf），
+# 每块条数和同时运行的 wkhtmltopdf 进程数
+PDF_CHUNK_THRESHOLD = 600
+PDF_CHUNK_SIZE = 300
+PDF_CHUNK_WORKERS = os.cpu_count() or 2
+
+# PDF报告缓存：相同数据和模板的报告直接复用，报告目录按最近使用时间淘汰
+report_cache = ReportCache(REPORTS_DIR, os.path.join('templates', 'pdf_template.html'),
+                           max_files=200, max_bytes=500 * 1024 * 1024)
+
+# 爬虫配置：多页搜索时并发抓取的页数上限（1 表示逐页顺序抓取）
+SPIDER_CONCURRENCY = 3
+
+# 每个关键词最多爬取的页数（与首页搜索表单中页数输入框的上限一致）
+SEARCH_MAX_PAGES = 10
+
+# 搜索结果缓存：按关键词和页码缓存，不同分析员的相同搜索直接复用
+search_cache = SqliteSearchCache(db, ttl=1800, max_entries=10000)
+
+# 爬虫会话池：进程内复用已初始化的爬虫会话和keep-alive连接，
+# 池大小与WSGI工作线程数相当；Cookie使用超过 SPIDER_COOKIE_TTL 秒后重新获取；
+# 启动时预热 SPIDER_POOL_WARM 个会话
+SPIDER_POOL_SIZE = 8
+SPIDER_POOL_WARM = 2
+SPIDER_COOKIE_TTL = 1800
+def create_spider(**kwargs):
+    # 第一次创建爬虫时才导入爬虫模块（requests 和结果页解析器）
+    from utils.baidu_spider import BaiduSpider
+    return BaiduSpider(**kwargs)
+
+spider_pool = SpiderPool(
+    functools.partial(create_spider, cache=search_cache, cookie_ttl=SPIDER_COOKIE_TTL, pool_maxsize=SPIDER_CONCURRENCY),
+    max_size=SPIDER_POOL_SIZE,
+)
+
+# 批量关键词搜索：所有批量搜索请求共用的线程池大小，即同时搜索的关键词总数
+# （每个关键词占用一个爬虫会话，应小于 SPIDER_POOL_SIZE）
+BATCH_SEARCH_WORKERS = 4
+batch_search_executor = ThreadPoolExecutor(max_workers=BATCH_SEARCH_WORKERS, thread_name_prefix='batch-search')
+
+# 运行指标：/metrics 以 Prometheus 文本格式输出；设置了 METRICS_TOKEN 时
+# 抓取请求需要携带 "Authorization: Bearer <token>"
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+REQUEST_SECONDS = metrics.histogram('http_request_duration_seconds', '请求处理耗时（秒），流式响应只统计到开始输出',
+                                    ['endpoint', 'method', 'status'])
+PDF_RENDER_SECONDS = metrics.histogram('pdf_render_seconds', 'PDF报告渲染耗时（秒）', ['mode'],
+                                       buckets=(0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800))
+metrics.callback('spider_pool_spiders', '爬虫会话池中的爬虫数', 'gauge',
+                 lambda: {('total',): spider_pool.stats()['size'], ('idle',): spider_pool.stats()['idle']}, ['state'])
+metrics.callback('sqlite_pool_connections', '数据库连接池中的连接数', 'gauge',
+                 lambda: {('total',): db.stats()['size'], ('idle',): db.stats()['idle']}, ['state'])
+metrics.callback('search_cache_requests_total', '搜索结果缓存的查询次数', 'counter',
+                 lambda: {('hit',): search_cache.hits, ('miss',): search_cache.misses}, ['result'])
+
+# 记录每个请求的处理耗时
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        REQUEST_SECONDS.labels(request.endpoint or 'unknown', request.method, response.status_code).observe(
+            time.perf_counter() - started)
+    return response
+
+# 已在当前进程中完成结构检查的数据库文件
+_schema_ready = set()
+_schema_lock = threading.Lock()
+
+# 初始化数据库（见 utils.schema）：每个数据库文件在每个进程中只检查一次，结构已是当前版本时不再建表和迁移
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # 创建用户表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # 创建数据仓库表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS data_warehouse (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            source TEXT,
-            url TEXT NOT NULL,
-            content TEXT,
-            keywords TEXT NOT NULL,
-            crawled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # 创建管理员用户（如果不存在）
-    cursor.execute('SELECT * FROM users WHERE username = ?', ('admin',))
-    if not cursor.fetchone():
-        cursor.execute('INSERT INTO users (username, password) VALUES (?, ?)', ('admin', 'admin888'))
-    
-    conn.commit()
-    conn.close()
+    path = os.path.realpath(DB_PATH)
+    with _schema_lock:
+        if path in _schema_ready:
+            return
+        with db.connection() as conn:
+            schema.init_schema(conn)
+        _schema_ready.add(path)
 
-# 数据库连接装饰器
+# 数据库连接装饰器：从连接池取当前线程的连接，把游标作为第一个参数传给被装饰函数
 def with_db_connection(func):
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        result = func(cursor, *args, **kwargs)
-        conn.commit()
-        conn.close()
-        return result
+        with db.connection() as conn:
+            return func(conn.cursor(), *args, **kwargs)
     return wrapper
 
 # 登录页面
 @app.route('/login', methods=['GET', 'POST'])
-def login():
+@with_db_connection
+def login(cursor):
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
         
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
         cursor.execute('SELECT * FROM users WHERE username = ? AND password = ?', (username, password))
         user = cursor.fetchone()
-        conn.close()
         
         if user:
             session['logged_in'] = True
@@ -120,9 +187,6 @@ def logout():
     session.clear()
     return redirect(url_for('login'))
 
-# 导入functools模块
-import functools
-
 # 检查登录状态的装饰器
 def login_required(func):
     @functools.wraps(func)
@@ -136,134 +200,395 @@ def login_required(func):
 @app.route('/', methods=['GET', 'POST'])
 @login_required
 def index():
-    print(f'请求方法: {request.method}')
     if request.method == 'POST':
-        print('处理POST请求')
         try:
             keywords = request.form['keywords']
             pages = request.form.get('pages', 1, type=int)
-            print(f'获取到关键词: {keywords}, 页数: {pages}')
+            logger.debug(f'搜索请求: 关键词 {keywords}, 页数 {pages}')
             
             try:
-                print(f'开始搜索关键词: {keywords}, 页数: {pages}')
+                # 从爬虫会话池借出爬虫获取数据，用完自动归还
+                with spider_pool.spider() as spider:
+                    results = spider.search(keywords, pages=pages, concurrency=SPIDER_CONCURRENCY)
+                    partial_error = spider.last_error
                 
-                # 使用百度爬虫获取数据
-                spider = None
-                try:
-                    print('创建BaiduSpider实例...')
-                    spider = BaiduSpider()
-                    print('创建BaiduSpider实例成功')
-                    
-                    print(f'开始爬取关键词: {keywords}')
-                    results = spider.search(keywords, pages=pages)
-                    print(f'爬取完成，获取到 {len(results)} 条结果')
-                    
-                    # 保存搜索结果到会话中
-                    print(f'保存搜索结果到会话，共 {len(results)} 条')
-                    session['search_results'] = results
-                    session['current_keywords'] = keywords
-                    print('搜索结果保存到会话成功')
-                    
-                finally:
-                    if spider:
-                        print('关闭BaiduSpider实例...')
-                        spider.close()
-                        print('BaiduSpider实例已关闭')
+                # 部分页面重试后仍下载失败时仍然展示已获取的结果
+                if partial_error:
+                    flash(f'部分页面获取失败，仅显示已获取的 {len(results)} 条结果: {partial_error}', 'warning')
+                
+                # 保存搜索结果到服务器端存储，会话中只记录搜索ID
+                session['search_id'] = result_store.put(keywords, results)
+                session['current_keywords'] = keywords
                 
-                print('渲染模板...')
+                logger.info(f'搜索完成: 关键词 {keywords}, 页数 {pages}, 结果 {len(results)} 条')
                 return render_template('index.html', results=results, keywords=keywords)
             except Exception as e:
-                import traceback
-                print(f'爬虫搜索失败: {str(e)}')
-                print(f'错误堆栈: {traceback.format_exc()}')
-                error_message = f'获取数据失败: {str(e)}'
-                flash(error_message, 'error')
-                logging.error(f'爬虫搜索失败: {str(e)}')
-                logging.error(f'错误堆栈: {traceback.format_exc()}')
+                flash(f'获取数据失败: {str(e)}', 'error')
+                logger.exception(f'爬虫搜索失败: {str(e)}')
         except Exception as e:
-            import traceback
-            print(f'请求处理失败: {str(e)}')
-            print(f'错误堆栈: {traceback.format_exc()}')
             flash(f'请求处理失败: {str(e)}', 'error')
+            logger.exception(f'请求处理失败: {str(e)}')
     
-    # 从会话中获取搜索结果
-    results = session.get('search_results', [])
+    # 根据会话中的搜索ID获取搜索结果
+    stored = result_store.get(session.get('search_id'))
+    results = stored['results'] if stored else []
     keywords = session.get('current_keywords', '')
-    print(f'处理GET请求，返回 {len(results)} 条结果')
     
     return render_template('index.html', results=results, keywords=keywords)
 
+# 正在逐页推送结果的搜索：搜索ID -> 取消事件（只在当前进程内有效）
+active_searches = {}
+active_searches_lock = threading.Lock()
+
+def sse_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+# 逐页推送搜索结果（Server-Sent Events）：每解析完一页立即推送给浏览器
+@app.route('/search/stream', methods=['GET'], endpoint='search_stream')
+@login_required
+def search_stream():
+    keywords = request.args.get('keywords', '').strip()
+    pages = request.args.get('pages', 1, type=int)
+    if not keywords:
+        return jsonify({'error': '搜索关键词不能为空'}), 400
+    
+    # 先保存空结果并写入会话，保存数据时按推送过程中逐页更新的结果读取
+    search_id = result_store.put(keywords, [])
+    session['search_id'] = search_id
+    session['current_keywords'] = keywords
+    cancelled = threading.Event()
+    with active_searches_lock:
+        active_searches[search_id] = cancelled
+    logger.debug(f'逐页推送搜索请求: 关键词 {keywords}, 页数 {pages}')
+    
+    def generate():
+        results = []
+        try:
+            yield sse_event('start', {'search_id': search_id, 'keywords': keywords, 'pages': pages})
+            with spider_pool.spider() as spider:
+                # 浏览器断开连接或取消时关闭生成器，停止抓取后续页面
+                search = spider.iter_search(keywords, pages=pages, concurrency=SPIDER_CONCURRENCY, cancelled=cancelled)
+                try:
+                    for page, page_results in search:
+                        offset = len(results)
+                        results.extend(page_results)
+                        result_store.update(search_id, results)
+                        yield sse_event('page', {'page': page + 1, 'offset': offset, 'results': page_results})
+                finally:
+                    search.close()
+                partial_error = spider.last_error
+            logger.info(f'逐页推送搜索完成: 关键词 {keywords}, 页数 {pages}, 结果 {len(results)} 条')
+            yield sse_event('done', {'total': len(results), 'error': partial_error})
+        except Exception as e:
+            logger.exception(f'爬虫搜索失败: {str(e)}')
+            yield sse_event('failed', {'error': str(e), 'total': len(results)})
+        finally:
+            with active_searches_lock:
+                active_searches.pop(search_id, None)
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+# 取消正在推送的搜索
+@app.route('/search/stream/<search_id>/cancel', methods=['POST'], endpoint='cancel_search_stream')
+@login_required
+def cancel_search_stream(search_id):
+    with active_searches_lock:
+        cancelled = active_searches.get(search_id)
+    # 只能取消当前会话发起的搜索
+    if cancelled is None or session.get('search_id') != search_id:
+        return jsonify({'error': '搜索不存在或已结束'}), 404
+    cancelled.set()
+    logger.info(f'逐页推送搜索已取消: {search_id}')
+    return jsonify({'cancelled': True})
+
+# 请求参数中的开关：接受JSON布尔值和 1/0、true/false、yes/no、on/off
+def parse_flag(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ('1', 'true', 'yes', 'on'):
+        return True
+    if text in ('0', 'false', 'no', 'off', ''):
+        return False
+    raise ValueError(f'无法识别的开关值: {value}')
+
+# 请求参数中的页数：不是整数时抛出 ValueError，超出范围时限制在 1 到 SEARCH_MAX_PAGES 之间
+def parse_pages(value):
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f'页数必须是整数: {value}')
+    try:
+        pages = int(value)
+    except ValueError:
+        raise ValueError(f'页数必须是整数: {value}')
+    return max(1, min(pages, SEARCH_MAX_PAGES))
+
+# 批量关键词搜索：并发搜索一组关键词，跨关键词按URL去重合并（保留搜到每条结果的全部关键词），
+# 在一个事务中写入数据仓库；以 Server-Sent Events 逐个推送关键词的完成进度和耗时
+@app.route('/search/batch', methods=['POST'], endpoint='batch_search')
+@login_required
+def batch_search_endpoint():
+    # 接受表单（keywords 可重复或按行分隔）或JSON（{"keywords": [...], "pages": 1, "save": true}）
+    data = request.get_json(silent=True)
+    try:
+        if isinstance(data, dict):
+            values = data.get('keywords') or []
+            values = [values] if isinstance(values, str) else [str(value) for value in values]
+            pages = parse_pages(data.get('pages', 1))
+            save = parse_flag(data.get('save', True))
+        else:
+            values = request.form.getlist('keywords')
+            pages = parse_pages(request.form.get('pages') or '1')
+            save = parse_flag(request.form.get('save', '1'))
+        keywords = batch_search.parse_keywords(values)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    logger.debug(f'批量搜索请求: 关键词 {len(keywords)} 个, 页数 {pages}, 保存 {save}')
+    
+    def generate():
+        started = time.monotonic()
+        keyword_results = {}
+        try:
+            yield sse_event('start', {'keywords': keywords, 'pages': pages, 'save': save})
+            # 浏览器断开连接时关闭生成器，取消尚未开始的关键词
+            search = batch_search.iter_search(spider_pool, keywords, pages=pages, concurrency=SPIDER_CONCURRENCY,
+                                              executor=batch_search_executor)
+            try:
+                for report, results in search:
+                    keyword_results[report['keyword']] = results
+                    yield sse_event('keyword', dict(report, done=len(keyword_results), total=len(keywords)))
+            finally:
+                search.close()
+            
+            results = batch_search.merge_results((keyword, keyword_results[keyword]) for keyword in keywords)
+            inserted = merged = 0
+            if save:
+                with db.connection() as conn:
+                    inserted, merged = batch_search.save_results(conn, results)
+            total = sum(len(found) for found in keyword_results.values())
+            seconds = time.monotonic() - started
+            logger.info(f'批量搜索完成: 关键词 {len(keywords)} 个, 结果 {total} 条, 去重后 {len(results)} 条, '
+                        f'新增 {inserted} 条, 用时 {seconds:.1f}s')
+            yield sse_event('done', {'total': total, 'unique': len(results), 'inserted': inserted, 'merged': merged,
+                                     'seconds': round(seconds, 3), 'results': results})
+        except Exception as e:
+            logger.exception(f'批量搜索失败: {str(e)}')
+            yield sse_event('failed', {'error': str(e)})
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 # 批量保存数据到数据库
 @app.route('/save_data', methods=['POST'], endpoint='save_data')
 @login_required
-def save_data():
+@with_db_connection
+def save_data(cursor):
     selected_ids = request.form.getlist('selected_items')
-    search_results = session.get('search_results', [])
-    keywords = session.get('current_keywords', '')
     
     if not selected_ids:
         flash('请选择要保存的数据', 'error')
         return redirect(url_for('index'))
     
+    stored = result_store.get(session.get('search_id'))
+    if not stored:
+        flash('搜索结果已过期，请重新搜索', 'error')
+        return redirect(url_for('index'))
+    search_results = stored['results']
+    keywords = stored['keywords']
+    
     try:
         # 将字符串ID转换为整数
         selected_indices = [int(id) for id in selected_ids]
         
-        # 保存选中的数据到数据库
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        # 批量保存选中的数据到数据库，已存在的URL只合并关键词
+        items = [search_results[idx] for idx in selected_indices if 0 <= idx < len(search_results)]
+        inserted, merged = save_items(cursor.connection, items, keywords)
         
-        saved_count = 0
-        for idx in selected_indices:
-            if idx < len(search_results):
-                result = search_results[idx]
-                cursor.execute('''
-                    INSERT INTO data_warehouse (title, source, url, content, keywords)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (result['title'], result['source'], result['url'], result['content'], keywords))
-                saved_count += 1
-        
-        conn.commit()
-        conn.close()
-        
-        flash(f'成功保存 {saved_count} 条数据到数据仓库', 'success')
+        if merged:
+            flash(f'成功保存 {inserted} 条数据到数据仓库，{merged} 条已存在的数据已合并关键词', 'success')
+        else:
+            flash(f'成功保存 {inserted} 条数据到数据仓库', 'success')
     except Exception as e:
+        cursor.connection.rollback()
         flash(f'保存数据失败: {str(e)}', 'error')
-        logging.error(f'保存数据到仓库失败: {str(e)}')
+        logger.error(f'保存数据到仓库失败: {str(e)}')
     
     return redirect(url_for('index'))
 
+# 搜索结果缓存命中统计
+@app.route('/search_cache/stats', methods=['GET'], endpoint='search_cache_stats')
+@login_required
+def search_cache_stats():
+    return jsonify(search_cache.stats())
+
 # 数据仓库页面
 @app.route('/data_warehouse', methods=['GET'], endpoint='data_warehouse')
 @login_required
-def data_warehouse():
+@with_db_connection
+def data_warehouse(cursor):
     keywords = request.args.get('keywords', '')
     date = request.args.get('date', '')
+    text = request.args.get('q', '')
+    after = request.args.get('after', '')
+    page_size = request.args.get('page_size', WAREHOUSE_PAGE_SIZE, type=int)
+    page_size = max(1, min(page_size, WAREHOUSE_MAX_PAGE_SIZE))
+    stream = request.args.get('stream', '') == '1'
+    collapse = request.args.get('collapse', '') == '1'
     
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    pdf_job = request.args.get('pdf_job', '')
     
-    query = 'SELECT * FROM data_warehouse WHERE 1=1'
-    params = []
+    context = dict(keywords=keywords, date=date, q=text, after=after, page_size=page_size, stream=stream,
+                   collapse=collapse, pdf_job=pdf_job)
     
-    if keywords:
-        query += ' AND keywords LIKE ?'
-        params.append(f'%{keywords}%')
+    # 键集分页：按 (crawled_at, id) 倒序从游标位置开始取一页，多取一行用于判断是否有下一页；
+    # 热数据取不满一页时继续按时间从新到旧查询归档分区。
+    # 合并相似报道时每组只显示最早保存的一条，并统计同组其他报道条数
+    if stream:
+        # 流式渲染在视图函数返回后才逐行读取，此时池内连接已归还，改用独立的只读连接，响应结束时关闭
+        conn = db.open_readonly()
+        conn.row_factory = sqlite3.Row
+    else:
+        conn = cursor.connection
+    try:
+        rows = warehouse_archive.select_page(conn, keywords, date, text, after, limit=page_size + 1, collapse=collapse)
+    except ValueError:
+        if stream:
+            conn.close()
+        flash('检索条件格式错误，日期请使用 YYYY-MM-DD', 'error')
+        return render_template('data_warehouse.html', data=[], **context)
+    page = KeysetPage(rows, page_size)
     
-    if date:
-        query += ' AND DATE(crawled_at) = ?'
-        params.append(date)
+    if stream:
+        # 流式渲染：边读取边输出，首批数据无需等待整页查询完成
+        response = Response(stream_template('data_warehouse.html', data=page, **context))
+        response.call_on_close(conn.close)
+        return response
     
-    query += ' ORDER BY crawled_at DESC'
+    return render_template('data_warehouse.html', data=page.load(), **context)
+
+# 关键词趋势统计：只读取保存数据时累加的汇总表
+def analytics_context(conn, keyword, days):
+    keywords = analytics.top_keywords(conn, days, ANALYTICS_TOP_KEYWORDS)
+    keyword = keyword or (keywords[0]['keyword'] if keywords else '')
+    return dict(
+        keyword=keyword,
+        days=days,
+        keywords=keywords,
+        trend=analytics.keyword_trend(conn, keyword, days) if keyword else [],
+        sources=analytics.top_sources(conn, keyword, ANALYTICS_TOP_SOURCES) if keyword else [],
+    )
+
+# 关键词趋势页面
+@app.route('/analytics', methods=['GET'], endpoint='analytics')
+@login_required
+@with_db_connection
+def analytics_page(cursor):
+    keyword = request.args.get('keyword', '').strip()
+    days = max(1, min(request.args.get('days', ANALYTICS_DAYS, type=int), analytics.MAX_DAYS))
+    context = analytics_context(cursor.connection, keyword, days)
+    peak = max([day['articles'] for day in context['trend']] + [1])
+    return render_template('analytics.html', peak=peak, **context)
+
+# 关键词趋势数据（JSON）
+@app.route('/analytics/data', methods=['GET'], endpoint='analytics_data')
+@login_required
+@with_db_connection
+def analytics_data(cursor):
+    keyword = request.args.get('keyword', '').strip()
+    days = max(1, min(request.args.get('days', ANALYTICS_DAYS, type=int), analytics.MAX_DAYS))
+    return jsonify(analytics_context(cursor.connection, keyword, days))
+
+# 按检索条件流式导出数据仓库（CSV / JSON Lines / Parquet）
+@app.route('/data_warehouse/export', methods=['GET'], endpoint='export_data')
+@login_required
+def export_data():
+    fmt = request.args.get('format', 'csv')
+    keywords = request.args.get('keywords', '')
+    date = request.args.get('date', '')
+    text = request.args.get('q', '')
+    # 客户端支持时对响应做gzip实时压缩
+    compress = 'gzip' in request.accept_encodings and fmt != 'parquet'
     
-    cursor.execute(query, params)
-    data = cursor.fetchall()
-    conn.close()
+    # 导出使用独立的只读连接，长时间读取不占用请求线程的池内连接
+    conn = db.open_readonly()
+    try:
+        body = export_stream(conn, fmt, keywords, date, text, compress=compress)
+    except (ValueError, ImportError) as e:
+        conn.close()
+        return jsonify({'error': str(e)}), 400
     
-    return render_template('data_warehouse.html', data=data, keywords=keywords, date=date)
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    filename = f"data_warehouse_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    response = Response(body, content_type=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['Vary'] = 'Accept-Encoding'
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.call_on_close(conn.close)
+    logger.info(f'开始导出数据仓库: 格式 {fmt}, 关键词 {keywords}, 日期 {date}, 检索 {text}')
+    return response
+
+# 按ID获取数据仓库中的数据（包括已归档的记录）
+@with_db_connection
+def fetch_warehouse_rows(cursor, ids):
+    return warehouse_archive.fetch_rows(cursor.connection, ids)
 
-# 生成PDF报告
+# 生成PDF文件（在后台任务线程中执行）
+def render_pdf_report(ids, progress):
+    # 从数据库获取选中的数据
+    data = fetch_warehouse_rows(ids)
+    
+    if not data:
+        raise ValueError('没有找到选中的数据')
+    
+    # 相同数据和模板的报告已经生成过时直接返回缓存的文件
+    cache_key = report_cache.key(data)
+    cached = report_cache.get(cache_key)
+    if cached:
+        PDF_RENDER_SECONDS.labels('cached').observe(0)
+        return cached
+    progress(20)
+    started = time.perf_counter()
+    
+    now = datetime.datetime.now()
+    
+    # 生成HTML内容（后台线程中没有请求上下文，需要手动推入应用上下文）
+    def render_html(**context):
+        with app.app_context():
+            return render_template('pdf_template.html', now=now, enumerate=enumerate, **context)
+    
+    # 生成PDF，先写入临时文件，完成后再放入缓存
+    pdf_path = report_cache.temp_path(cache_key)
+    try:
+        # 第一次生成报告时才导入 pdfkit
+        import pdfkit
+        if len(data) >= PDF_CHUNK_THRESHOLD and pdf_chunks.is_available():
+            # 大报告：分块并行渲染，合并后带目录和连续页码
+            mode = 'chunked'
+            pdf_chunks.render_chunked(
+                data, pdf_path, render_html, pdfkit.from_string,
+                workers=PDF_CHUNK_WORKERS, chunk_size=PDF_CHUNK_SIZE,
+                progress=lambda percent: progress(20 + percent * 0.75),
+            )
+        else:
+            mode = 'single'
+            html_content = render_html(data=data)
+            progress(40)
+            pdfkit.from_string(html_content, pdf_path)
+        PDF_RENDER_SECONDS.labels(mode).observe(time.perf_counter() - started)
+        return report_cache.put(cache_key, pdf_path)
+    finally:
+        if os.path.exists(pdf_path):
+            os.remove(pdf_path)
+
+# PDF报告任务队列
+pdf_jobs = PdfJobQueue(db, render_pdf_report, REPORTS_DIR, max_workers=PDF_WORKERS)
+
+# 提交PDF报告生成任务
 @app.route('/generate_pdf', methods=['POST'], endpoint='generate_pdf')
 @login_required
 def generate_pdf():
@@ -275,52 +600,88 @@ def generate_pdf():
     
     try:
         selected_ids = [int(id) for id in selected_ids]
+        if request.form.get('collapse_duplicates'):
+            # 合并选中数据中的相似报道，每组只保留一条
+            with db.connection() as conn:
+                selected_ids = near_dup.collapse_ids(conn, selected_ids)
+        job_id = pdf_jobs.submit(selected_ids)
         
-        # 从数据库获取选中的数据
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        placeholders = ','.join(['?'] * len(selected_ids))
-        cursor.execute(f'SELECT * FROM data_warehouse WHERE id IN ({placeholders})', selected_ids)
-        data = cursor.fetchall()
-        conn.close()
-        
-        if not data:
-            flash('没有找到选中的数据', 'error')
-            return redirect(url_for('data_warehouse'))
-        
-        # 生成HTML内容
-        html_content = render_template('pdf_template.html', data=data)
-        
-        # 生成PDF文件名
-        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-        pdf_filename = f'report_{timestamp}.pdf'
-        pdf_path = os.path.join('static', 'reports', pdf_filename)
-        
-        # 确保reports目录存在
-        os.makedirs(os.path.dirname(pdf_path), exist_ok=True)
-        
-        # 生成PDF
-        pdfkit.from_string(html_content, pdf_path)
-        
-        flash('PDF报告生成成功', 'success')
-        return redirect(url_for('data_warehouse', pdf=pdf_filename))
+        flash('PDF报告已开始生成，完成后可在页面上方下载', 'success')
+        return redirect(url_for('data_warehouse', pdf_job=job_id))
     except Exception as e:
-        flash(f'生成PDF失败: {str(e)}', 'error')
-        logging.error(f'生成PDF报告失败: {str(e)}')
+        flash(f'提交PDF任务失败: {str(e)}', 'error')
+        logger.error(f'提交PDF报告任务失败: {str(e)}')
         return redirect(url_for('data_warehouse'))
 
-# 初始化应用
+# 查询PDF任务状态
+@app.route('/pdf_jobs/<job_id>', methods=['GET'], endpoint='pdf_job_status')
+@login_required
+def pdf_job_status(job_id):
+    job = pdf_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': '任务不存在'}), 404
+    
+    if job['status'] == STATUS_DONE:
+        job['download_url'] = url_for('download_pdf', job_id=job_id)
+    return jsonify(job)
+
+# 下载生成好的PDF报告
+@app.route('/pdf_jobs/<job_id>/download', methods=['GET'], endpoint='download_pdf')
+@login_required
+def download_pdf(job_id):
+    job = pdf_jobs.get(job_id)
+    if not job or job['status'] != STATUS_DONE:
+        abort(404)
+    return send_from_directory(REPORTS_DIR, job['filename'], as_attachment=True)
+
+# Prometheus 指标抓取接口
+@app.route('/metrics', methods=['GET'], endpoint='metrics')
+def metrics_endpoint():
+    if METRICS_TOKEN and request.headers.get('Authorization', '') != f'Bearer {METRICS_TOKEN}':
+        abort(401)
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+# 应用工厂是否已完成启动
+_app_started = False
+_app_lock = threading.Lock()
+
+def create_app():
+    """
+    应用工厂：WSGI服务器和开发服务器的入口
+    
+    第一次调用时配置日志、检查数据库结构、恢复中断的PDF任务，并在后台线程中预热
+    爬虫会话；之后的调用直接返回同一个应用。直接使用模块级的 app（如
+    gunicorn app:app、flask --app app run）时，由 ensure_started 在第一个请求前完成启动。
+    
+    返回:
+        Flask: 应用实例
+    """
+    global _app_started
+    with _app_lock:
+        if not _app_started:
+            setup_logging(LOG_PROFILE, LOG_LEVELS)
+            logger.info("应用启动开始")
+            init_db()
+            logger.info("数据库初始化完成")
+            pdf_jobs.recover()
+            threading.Thread(target=spider_pool.warm, args=(SPIDER_POOL_WARM,), name='spider-pool-warm', daemon=True).start()
+            _app_started = True
+    return app
+
+# 没有经过应用工厂启动时（WSGI服务器直接加载 app），在处理第一个请求前完成启动
+@app.before_request
+def ensure_started():
+    if not _app_started:
+        create_app()
+
+# 启动开发服务器
 if __name__ == '__main__':
-    print("正在初始化应用...")
-    logging.info("应用启动开始")
+    debug = LOG_PROFILE != 'production'
     try:
-        init_db()
-        logging.info("数据库初始化完成")
-        print("正在启动Flask服务器...")
-        logging.info("Flask服务器启动中")
-        app.run(debug=True, host='127.0.0.1', port=5000)
+        # 调试模式下重载器的监视进程只负责重启，由实际提供服务的子进程完成启动
+        if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+            create_app()
+            logger.info("Flask服务器启动中")
+        app.run(debug=debug, host='127.0.0.1', port=5000)
     except Exception as e:
-        print(f"应用启动失败: {str(e)}")
-        logging.error(f"应用启动失败: {str(e)}", exc_info=True)
+        logger.error(f"应用启动失败: {str(e)}", exc_info=True)
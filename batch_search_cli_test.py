@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量搜索命令行测试：在只有最初的 users / data_warehouse 表结构的数据库上运行
+python -m utils.batch_search，检查建表迁移后结果能正常保存
+
+在本地桩服务器上运行，不访问外网:
+    python batch_search_cli_test.py
+"""
+
+import functools
+import os
+import sqlite3
+import sys
+import tempfile
+import urllib.parse
+
+from benchmarks.stub_baidu import StubBaiduServer
+from utils import batch_search, spider_pool
+from utils.baidu_spider import BaiduSpider
+from utils.schema import SCHEMA_VERSION
+
+# 最初版本的表结构（没有 url_norm 列，也没有其他模块的表）
+BASELINE_SCHEMA = '''
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE data_warehouse (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        source TEXT,
+        url TEXT NOT NULL,
+        content TEXT,
+        keywords TEXT NOT NULL,
+        crawled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+'''
+
+
+def test_batch_search_cli_on_baseline_schema():
+    with StubBaiduServer(latency=0) as server, tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'data.db')
+        conn = sqlite3.connect(path)
+        conn.executescript(BASELINE_SCHEMA)
+        # 已保存过的结果：迁移后应合并关键词而不是重复插入
+        existing_url = f"http://www.baidu.com/link?url=stub-{urllib.parse.quote('命令行一')}-0"
+        conn.execute('INSERT INTO data_warehouse (title, source, url, content, keywords) VALUES (?, ?, ?, ?, ?)',
+                     ('旧标题', '旧来源', existing_url, '旧内容', '旧关键词'))
+        conn.commit()
+        conn.close()
+
+        original_factory = spider_pool._create_baidu_spider
+        spider_pool._create_baidu_spider = functools.partial(BaiduSpider, base_url=server.base_url,
+                                                             delay_range=(0, 0))
+        try:
+            code = batch_search.main(['--db', path, '命令行一,命令行二', '--workers', '2'])
+        finally:
+            spider_pool._create_baidu_spider = original_factory
+        assert code == 0
+
+        conn = sqlite3.connect(path)
+        try:
+            assert conn.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION
+            total, normalized = conn.execute('SELECT COUNT(*), COUNT(url_norm) FROM data_warehouse').fetchone()
+            assert total == normalized == 20, (total, normalized)
+            keywords = conn.execute('SELECT keywords FROM data_warehouse WHERE url = ?', (existing_url,)).fetchone()[0]
+            assert keywords == '旧关键词,命令行一', keywords
+            signatures = conn.execute('SELECT COUNT(*) FROM near_dup_signatures').fetchone()[0]
+            assert signatures == 19, signatures
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    test_batch_search_cli_on_baseline_schema()
+    print('批量搜索命令行测试通过')
+    sys.exit(0)
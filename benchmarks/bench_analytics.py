@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+关键词趋势统计基准：汇总表查询 与 在 data_warehouse 上直接 GROUP BY 的对比
+
+数据仓库逐步增长到各个规模，每个规模下分别计时趋势页面的三个查询（热门关键词、
+每日文章数、主要来源），以及一次保存20条新数据（含累加汇总表）的耗时:
+    python -m benchmarks.bench_analytics --sizes 10000,100000,1000000
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_warehouse_fts import KEYWORDS, SOURCES
+from utils import analytics, near_dup, warehouse_archive
+from utils.warehouse import init_url_dedup, save_items
+from utils.warehouse_search import init_search_index
+
+DAYS = 30
+
+# 直接在数据仓库上统计（按关键词子串匹配，与页面检索的 LIKE 条件一致）：热门关键词、每日文章数、主要来源
+LIVE_QUERIES = (
+    'SELECT keywords, COUNT(*) AS total FROM data_warehouse WHERE crawled_at >= ? '
+    'GROUP BY keywords ORDER BY total DESC LIMIT 20',
+    'SELECT DATE(crawled_at), COUNT(*) FROM data_warehouse WHERE keywords LIKE ? AND crawled_at >= ? '
+    'GROUP BY DATE(crawled_at)',
+    'SELECT source, COUNT(*) AS total FROM data_warehouse WHERE keywords LIKE ? '
+    'GROUP BY source ORDER BY total DESC LIMIT 10',
+)
+
+
+def create_schema(conn):
+    conn.execute('''
+        CREATE TABLE data_warehouse (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            source TEXT,
+            url TEXT NOT NULL,
+            content TEXT,
+            keywords TEXT NOT NULL,
+            crawled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            url_norm TEXT
+        )
+    ''')
+    init_url_dedup(conn)
+    init_search_index(conn)
+    warehouse_archive.init_table(conn)
+    near_dup.init_table(conn)
+    analytics.init_table(conn)
+
+
+def generate_rows(start, count, rng):
+    """最近一年内保存的合成数据"""
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    for i in range(start, start + count):
+        keyword = rng.choice(KEYWORDS)
+        crawled_at = now - datetime.timedelta(seconds=rng.randrange(0, 365 * 24 * 3600))
+        yield (f'{keyword}行业动态第{i}期', rng.choice(SOURCES), f'http://example.com/bench-{i}',
+               f'关于{keyword}的摘要内容，编号{i}。', keyword, crawled_at.strftime('%Y-%m-%d %H:%M:%S'),
+               f'http://example.com/bench-{i}')
+
+
+def grow(conn, start, count, rng):
+    """直接批量插入数据并按保存时的方式累加汇总表（跳过相似报道签名以缩短准备时间）"""
+    rows = list(generate_rows(start, count, rng))
+    conn.executemany('INSERT INTO data_warehouse (title, source, url, content, keywords, crawled_at, url_norm) '
+                     'VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+    analytics.record(conn, ((row[4], row[5][:10], row[1]) for row in rows))
+    conn.commit()
+
+
+def best_of(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='关键词趋势统计基准测试')
+    parser.add_argument('--sizes', default='10000,100000,300000', help='逐步增长到的数据仓库规模，逗号分隔')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    rng = random.Random(42)
+    since = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=DAYS - 1)).strftime('%Y-%m-%d')
+    keyword = KEYWORDS[0]
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, 'analytics.db'))
+        conn.execute('PRAGMA journal_mode=WAL')
+        create_schema(conn)
+
+        print(f'{"规模":>9} {"直接统计 ms":>12} {"汇总表 ms":>10} {"保存20条 ms":>12} {"重建 s":>8}')
+        total = 0
+        for size in sizes:
+            grow(conn, total, size - total, rng)
+            total = size
+
+            live = sum(best_of(lambda sql=sql, params=params: conn.execute(sql, params).fetchall(), 3)
+                       for sql, params in zip(LIVE_QUERIES,
+                                              ([since], [f'%{keyword}%', since], [f'%{keyword}%'])))
+            rollup = best_of(lambda: (analytics.top_keywords(conn, DAYS), analytics.keyword_trend(conn, keyword, DAYS),
+                                      analytics.top_sources(conn, keyword)))
+
+            items = [{'title': f'新保存的报道{total}-{i}', 'source': rng.choice(SOURCES),
+                      'url': f'http://example.com/new-{total}-{i}', 'content': f'新保存的摘要{i}'} for i in range(20)]
+            start = time.perf_counter()
+            save_items(conn, items, keyword)
+            conn.commit()
+            save = time.perf_counter() - start
+
+            expected = analytics.top_keywords(conn, DAYS)
+            start = time.perf_counter()
+            analytics.rebuild(conn)
+            conn.commit()
+            rebuild = time.perf_counter() - start
+            assert analytics.top_keywords(conn, DAYS) == expected, '增量累加的汇总与重建结果不一致'
+            total += len(items)
+
+            print(f'{size:>9} {live * 1000:>12.1f} {rollup * 1000:>10.2f} {save * 1000:>12.1f} {rebuild:>8.1f}')
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据仓库归档基准：全部数据在热数据表中 与 较早的数据按月归档压缩后 的大小和查询耗时对比
+
+生成保存时间分布在最近 --months 个月内的合成数据（摘要由词表按齐夫分布组成），
+先在全部是热数据时计时数据仓库页面的几种查询和PDF报告读取，然后把早于
+--older-than 天的记录归档并整理数据库，再计时同样的查询:
+    python -m benchmarks.bench_archive --rows 200000
+    python -m benchmarks.bench_archive --rows 1000000 --months 36 --older-than 90
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_analytics import create_schema
+from benchmarks.bench_near_dup import Corpus
+from benchmarks.bench_warehouse_fts import KEYWORDS, SOURCES
+from utils import warehouse_archive
+from utils.warehouse_search import KeysetPage
+
+PAGE_SIZE = 50
+
+
+def populate(conn, rows, months, seed=42):
+    """直接批量插入合成数据（跳过相似报道签名和关键词统计以缩短准备时间）"""
+    rng = random.Random(seed)
+    corpus = Corpus(0.0, seed)
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    span = months * 30 * 24 * 3600
+    batch = []
+    for i in range(rows):
+        keyword = rng.choice(KEYWORDS)
+        crawled_at = now - datetime.timedelta(seconds=rng.randrange(span))
+        url = f'http://example.com/archive-{i}'
+        batch.append((f'{keyword}：{corpus._sentence(6)}', rng.choice(SOURCES), url,
+                      f'{keyword}{corpus._sentence(rng.randint(20, 60))}', keyword,
+                      crawled_at.strftime('%Y-%m-%d %H:%M:%S'), url))
+        if len(batch) == 10000:
+            insert(conn, batch)
+            batch = []
+    insert(conn, batch)
+    conn.commit()
+
+
+def insert(conn, rows):
+    conn.executemany('INSERT INTO data_warehouse (title, source, url, content, keywords, crawled_at, url_norm) '
+                     'VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+
+
+def storage_bytes(conn):
+    """
+    热数据表、归档分区（各自连同索引）和全文索引占用的字节数
+
+    返回:
+        tuple: (热数据表, 归档分区, 全文索引)
+    """
+    hot = partitions = fts = 0
+    for name, size in conn.execute('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name'):
+        name = name.removeprefix('idx_')
+        if '_fts' in name:
+            fts += size
+        elif name.startswith(warehouse_archive.PARTITION_PREFIX):
+            partitions += size
+        elif name == 'data_warehouse' or name.startswith('data_warehouse_crawled_at') or \
+                name.startswith('data_warehouse_url_norm'):
+            hot += size
+    return hot, partitions, fts
+
+
+def best_of(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def page(conn, **criteria):
+    return KeysetPage(warehouse_archive.select_page(conn, limit=PAGE_SIZE + 1, **criteria), PAGE_SIZE).load()
+
+
+def measure(conn, old_day, old_cursor, ids):
+    """数据仓库页面的几种查询和PDF报告读取的耗时（毫秒）"""
+    cases = {
+        '最新一页': lambda: page(conn),
+        '关键词检索首页': lambda: page(conn, keywords=KEYWORDS[0]),
+        '全文检索首页': lambda: page(conn, text=KEYWORDS[1][:3]),
+        '一年前的一页': lambda: page(conn, after=old_cursor),
+        '按一年前的日期': lambda: page(conn, date=old_day),
+        '读取50条旧记录': lambda: warehouse_archive.fetch_rows(conn, ids),
+    }
+    return {name: best_of(func) * 1000 for name, func in cases.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数据仓库归档基准测试')
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--months', type=int, default=24, help='合成数据的保存时间跨度（月）')
+    parser.add_argument('--older-than', type=int, default=warehouse_archive.ARCHIVE_AFTER_DAYS,
+                        help='保存时间早于该天数的记录被归档')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'archive.db')
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        create_schema(conn)
+        start = time.perf_counter()
+        populate(conn, args.rows, args.months)
+        print(f'已生成 {args.rows} 条数据，用时 {time.perf_counter() - start:.1f}s')
+
+        one_year_ago = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=365))
+        old_day = one_year_ago.strftime('%Y-%m-%d')
+        old_cursor = f"{one_year_ago.strftime('%Y-%m-%d %H:%M:%S')}|{args.rows + 1}"
+        ids = [row[0] for row in conn.execute(
+            'SELECT id FROM data_warehouse WHERE crawled_at < ? ORDER BY random() LIMIT 50',
+            (one_year_ago.strftime('%Y-%m-%d %H:%M:%S'),))]
+        expected = {'最新一页': list(page(conn)), '一年前的一页': list(page(conn, after=old_cursor))}
+
+        conn.execute('VACUUM')
+        sizes = [(os.path.getsize(path),) + storage_bytes(conn)]
+        timings = [measure(conn, old_day, old_cursor, ids)]
+
+        start = time.perf_counter()
+        archived = warehouse_archive.archive(conn, args.older_than)
+        archive_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        warehouse_archive.compact(conn)
+        compact_seconds = time.perf_counter() - start
+        print(f'归档 {archived} 条用时 {archive_seconds:.1f}s，整理数据库用时 {compact_seconds:.1f}s')
+        assert list(page(conn)) == expected['最新一页'], '归档后最新一页的结果不一致'
+        assert list(page(conn, after=old_cursor)) == expected['一年前的一页'], '归档后一年前的一页结果不一致'
+
+        sizes.append((os.path.getsize(path),) + storage_bytes(conn))
+        timings.append(measure(conn, old_day, old_cursor, ids))
+
+        info = warehouse_archive.status(conn)
+        raw = sum(partition['raw_bytes'] for partition in info['partitions'])
+        stored = sum(partition['stored_bytes'] for partition in info['partitions'])
+        conn.close()
+
+    print(f'\n{"":<16} {"文件 MB":>9} {"热数据表 MB":>11} {"归档分区 MB":>11} {"全文索引 MB":>11}')
+    for label, (file_size, hot, partitions, fts) in zip(('全部热数据', '归档后'), sizes):
+        print(f'{label:<16} {file_size / 1e6:>9.1f} {hot / 1e6:>11.1f} {partitions / 1e6:>11.1f} {fts / 1e6:>11.1f}')
+    print(f'归档内容压缩: {raw / 1e6:.1f} MB -> {stored / 1e6:.1f} MB（{stored / max(raw, 1):.0%}），'
+          f'{len(info["partitions"])} 个分区，热数据 {info["hot_rows"]} 条')
+
+    print(f'\n{"查询（ms）":<16} {"全部热数据":>10} {"归档后":>10}')
+    for name in timings[0]:
+        print(f'{name:<16} {timings[0][name]:>10.2f} {timings[1][name]:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
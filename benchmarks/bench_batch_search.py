@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量关键词搜索基准：逐个关键词搜索并保存 与 批量并发搜索、合并后一次保存 的对比
+
+逐个方式模拟分析员在首页一次提交一个关键词：顺序搜索，每个关键词的结果单独保存并
+提交一次事务；批量方式按 --workers 中的各个工作线程数并发搜索，合并后在一个事务中
+保存。在本地桩服务器上运行，不访问外网:
+    python -m benchmarks.bench_batch_search --keywords 24 --pages 2 --workers 1,4,8
+"""
+
+import argparse
+import functools
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.makedirs('logs', exist_ok=True)
+
+from benchmarks.bench_analytics import create_schema
+from benchmarks.stub_baidu import StubBaiduServer
+from utils import batch_search
+from utils.baidu_spider import BaiduSpider
+from utils.spider_pool import SpiderPool
+from utils.warehouse import save_items
+
+
+def one_by_one(pool, conn, keywords, pages):
+    """逐个关键词搜索，每个关键词的结果单独保存并提交"""
+    inserted = 0
+    for keyword in keywords:
+        with pool.spider() as spider:
+            results = spider.search(keyword, pages=pages)
+        inserted += save_items(conn, results, keyword)[0]
+        conn.commit()
+    return inserted
+
+
+def batched(pool, conn, keywords, pages, workers):
+    """批量并发搜索，合并后在一个事务中保存"""
+    results, _ = batch_search.search(pool, keywords, pages, workers)
+    inserted, _ = batch_search.save_results(conn, results)
+    conn.commit()
+    return inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量关键词搜索基准测试')
+    parser.add_argument('--keywords', type=int, default=24, help='关键词个数')
+    parser.add_argument('--pages', type=int, default=2)
+    parser.add_argument('--workers', default='1,4,8', help='批量搜索的工作线程数，逗号分隔')
+    parser.add_argument('--latency', type=float, default=0.1, help='桩服务器每个请求的延迟（秒）')
+    args = parser.parse_args()
+    workers = [int(value) for value in args.workers.split(',')]
+
+    runs = [('逐个搜索并保存', None)] + [(f'批量搜索 {count} 线程', count) for count in workers]
+    print(f'{"":<16} {"总耗时 s":>9} {"新增条数":>9} {"请求数":>7}')
+    for round_index, (label, count) in enumerate(runs):
+        # 每轮使用不同的关键词，避免命中搜索结果缓存或URL已保存
+        keywords = [f'批量关键词{round_index}-{i}' for i in range(args.keywords)]
+        with StubBaiduServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as tmp:
+            conn = sqlite3.connect(os.path.join(tmp, 'batch.db'))
+            conn.execute('PRAGMA journal_mode=WAL')
+            create_schema(conn)
+            pool = SpiderPool(functools.partial(BaiduSpider, base_url=server.base_url, delay_range=(0, 0)),
+                              max_size=count or 1)
+            start = time.perf_counter()
+            if count is None:
+                inserted = one_by_one(pool, conn, keywords, args.pages)
+            else:
+                inserted = batched(pool, conn, keywords, args.pages, count)
+            elapsed = time.perf_counter() - start
+            pool.close()
+            conn.close()
+            print(f'{label:<16} {elapsed:>9.2f} {inserted:>9} {server.request_count:>7}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
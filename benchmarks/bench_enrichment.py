@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+落地页补全流水线基准：吞吐量、每个域名的并发上限和中断后继续
+
+临时数据库中的记录指向本地百度桩服务器的跳转链接，跳转到若干个本地新闻站点，
+不访问外网:
+    python -m benchmarks.bench_enrichment --rows 400 --sites 4 --workers 16 --per-domain 2
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import urllib.parse
+from contextlib import ExitStack
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_warehouse_fts import create_schema
+from benchmarks.stub_baidu import StubBaiduServer
+from benchmarks.stub_sites import StubSiteServer
+from utils import enrichment
+from utils.db import ConnectionPool
+from utils.rate_limiter import AdaptiveRateLimiter
+
+
+def seed(path, rows, baidu, sites):
+    conn = sqlite3.connect(path)
+    create_schema(conn)
+    enrichment.init_table(conn)
+    conn.executemany(
+        'INSERT INTO data_warehouse (title, source, url, content, keywords) VALUES (?, ?, ?, ?, ?)',
+        ((f'新闻 {i}', '桩站点', f'{baidu.base_url}/link?url=' +
+          urllib.parse.quote(f'{sites[i % len(sites)].base_url}/article/{i}', safe=''), '摘要', '人工智能')
+         for i in range(rows))
+    )
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='落地页补全流水线基准测试')
+    parser.add_argument('--rows', type=int, default=400)
+    parser.add_argument('--sites', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--per-domain', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=0.05, help='新闻站点每个请求的处理时间（秒）')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp, ExitStack() as stack:
+        baidu = stack.enter_context(StubBaiduServer(latency=0))
+        sites = [stack.enter_context(StubSiteServer(latency=args.latency)) for _ in range(args.sites)]
+        path = os.path.join(tmp, 'enrich.db')
+        seed(path, args.rows, baidu, sites)
+        db = ConnectionPool(path)
+        limiter = AdaptiveRateLimiter(rate=1000, max_rate=1000)
+
+        def pipeline():
+            return enrichment.EnrichmentPipeline(db, workers=args.workers, per_domain=args.per_domain,
+                                                 resolve_limiter=limiter)
+
+        # 先处理一半后中断，再次运行应只处理剩下的记录
+        start = time.perf_counter()
+        first = pipeline().run(limit=args.rows // 2)
+        second = pipeline().run()
+        elapsed = time.perf_counter() - start
+        third = pipeline().run()
+
+        with db.connection() as conn:
+            row = conn.execute('SELECT COUNT(*), SUM(text_length), SUM(LENGTH(text_zlib)), '
+                               'COUNT(published_at) FROM page_content WHERE status = ?', ('done',)).fetchone()
+            sample = enrichment.load_content(conn, 1)
+        done, chars, stored, dated = row
+        ideal = args.rows / (args.sites * args.per_domain) * args.latency
+        print(f'{args.rows} 条记录，{args.sites} 个站点，并发 {args.workers}，每个域名 {args.per_domain}')
+        print(f'第一次运行(中断) {first}  第二次运行(继续) {second}  第三次运行 {third}')
+        print(f'总耗时 {elapsed:.2f}s（按每个域名并发上限的理论下限 {ideal:.2f}s），{args.rows / elapsed:.0f} 条/s')
+        print(f'完成 {done} 条，含发布时间 {dated} 条，正文 {chars} 字，压缩后 {stored} 字节')
+        print(f'各站点同时处理的请求数峰值: {[site.max_in_flight for site in sites]}')
+        print(f'示例: {sample["final_url"]}  {sample["published_at"]}  {sample["text"][:40]}...')
+        ok = (done == args.rows and third['done'] == 0
+              and all(site.max_in_flight <= args.per_domain for site in sites))
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据仓库导出基准：各格式的导出速度，以及导出期间Python内存峰值是否随行数增长
+
+在临时数据库中生成合成数据后分别导出到空输出:
+    python -m benchmarks.bench_export --rows 100000 1000000
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_warehouse_fts import populate
+from utils.db import ConnectionPool
+from utils.warehouse_export import EXPORT_FORMATS, export_stream
+
+
+def available_formats():
+    formats = ['csv', 'ndjson']
+    try:
+        import pyarrow.parquet  # noqa: F401
+        formats.append('parquet')
+    except ImportError:
+        pass
+    return [fmt for fmt in formats if fmt in EXPORT_FORMATS]
+
+
+def run_export(pool, fmt, compress):
+    conn = pool.open_readonly()
+    try:
+        tracemalloc.start()
+        start = time.perf_counter()
+        written = 0
+        for part in export_stream(conn, fmt, compress=compress):
+            written += len(part)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        conn.close()
+    return elapsed, written, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数据仓库导出基准测试')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f'export_{rows}.db')
+            conn = sqlite3.connect(path)
+            conn.execute('PRAGMA journal_mode = WAL')
+            populate(conn, rows, with_index=True)
+            conn.close()
+
+            pool = ConnectionPool(path)
+            print(f'== {rows} 行 ==')
+            for fmt in available_formats():
+                for compress in ([False, True] if fmt != 'parquet' else [False]):
+                    elapsed, written, peak = run_export(pool, fmt, compress)
+                    label = fmt + ('+gzip' if compress else '')
+                    print(f'{label:12s} {elapsed:7.2f}s  {rows / elapsed:10.0f} 行/s  '
+                          f'输出 {written / 1024 / 1024:8.1f} MB  Python内存峰值 {peak / 1024 / 1024:6.1f} MB')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
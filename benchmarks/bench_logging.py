@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志基准：同步文件+控制台处理器 与 QueueHandler/QueueListener 异步日志的对比
+
+多个线程同时写日志，统计调用方线程中每次 logger.info() 的耗时:
+    python -m benchmarks.bench_logging --threads 8 --records 5000
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import log_config
+
+
+def setup_sync(log_dir):
+    """原有方式：根日志直接挂文件和控制台处理器，在调用线程中同步写入"""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    formatter = logging.Formatter(log_config.LOG_FORMAT)
+    file_handler = logging.FileHandler(os.path.join(log_dir, 'sync.log'), encoding='utf-8')
+    console = logging.StreamHandler(open(os.devnull, 'w'))
+    for handler in (file_handler, console):
+        handler.setFormatter(formatter)
+        root.addHandler(handler)
+    root.setLevel(logging.DEBUG)
+
+
+def run(threads, records):
+    logger = logging.getLogger('bench.logging')
+    latencies = [[] for _ in range(threads)]
+    barrier = threading.Barrier(threads)
+
+    def worker(index):
+        barrier.wait()
+        out = latencies[index]
+        for i in range(records):
+            start = time.perf_counter()
+            logger.info(f'线程 {index} 第 {i} 条日志: 爬取百度搜索第 {i % 10 + 1} 页完成')
+            out.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    samples = sorted(value for values in latencies for value in values)
+    return elapsed, statistics.median(samples), samples[int(len(samples) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='同步日志与队列日志基准测试')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--records', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_sync(tmp)
+        elapsed, p50, p99 = run(args.threads, args.records)
+        print(f'同步处理器  总耗时 {elapsed:6.2f}s  单次调用 p50 {p50 * 1e6:7.1f}us  p99 {p99 * 1e6:8.1f}us')
+
+        listener = log_config.setup_logging('production', {'bench': 'INFO'}, log_dir=tmp, console=False)
+        elapsed, p50, p99 = run(args.threads, args.records)
+        drain = time.perf_counter()
+        log_config.shutdown_logging()
+        drain = time.perf_counter() - drain
+        print(f'队列处理器  总耗时 {elapsed:6.2f}s  单次调用 p50 {p50 * 1e6:7.1f}us  p99 {p99 * 1e6:8.1f}us  '
+              f'(后台线程写完剩余日志 {drain:.2f}s)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+指标开销基准：记录一次指标的耗时，以及计时连接相对普通 sqlite3 连接的额外开销
+
+    python -m benchmarks.bench_metrics --queries 200000
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import metrics
+from utils.db import TimedConnection
+
+
+def per_call(func, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    return (time.perf_counter() - start) / count
+
+
+def query_cost(factory, count):
+    conn = sqlite3.connect(':memory:', factory=factory)
+    conn.execute('CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)')
+    conn.executemany('INSERT INTO t (v) VALUES (?)', [(str(i),) for i in range(1000)])
+    cursor = conn.cursor()
+    cost = per_call(lambda: cursor.execute('SELECT v FROM t WHERE id = ?', (500,)).fetchone(), count)
+    conn.close()
+    return cost
+
+
+def main():
+    parser = argparse.ArgumentParser(description='运行指标开销基准测试')
+    parser.add_argument('--queries', type=int, default=200000)
+    args = parser.parse_args()
+
+    histogram = metrics.Histogram('bench_seconds', '基准测试', ['label'])
+    counter = metrics.Counter('bench_total', '基准测试', ['label'])
+    child = histogram.labels('x')
+    print(f'直方图 observe（已取得子指标）  {per_call(lambda: child.observe(0.01), args.queries) * 1e9:7.0f} ns')
+    print(f'直方图 labels().observe()       {per_call(lambda: histogram.labels("x").observe(0.01), args.queries) * 1e9:7.0f} ns')
+    print(f'计数器 labels().inc()           {per_call(lambda: counter.labels("x").inc(), args.queries) * 1e9:7.0f} ns')
+
+    plain = query_cost(sqlite3.Connection, args.queries)
+    timed = query_cost(TimedConnection, args.queries)
+    print(f'主键查询 普通连接 {plain * 1e6:6.2f} us  计时连接 {timed * 1e6:6.2f} us  '
+          f'额外开销 {(timed - plain) * 1e6:5.2f} us/条')
+
+    start = time.perf_counter()
+    text = metrics.render()
+    print(f'输出全部指标 {(time.perf_counter() - start) * 1000:.2f} ms，{len(text)} 字节')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+相似报道检测基准：签名计算速度、随数据量增长的索引/查找耗时和检出效果
+
+生成带有人工转载副本（改写少量字词、截断摘要、换网站名后缀）的合成新闻，
+按批写入签名索引，记录每批的平均耗时和每次查找的候选记录数，最后统计
+转载副本的检出率和误合并的记录数:
+    python -m benchmarks.bench_near_dup --rows 100000
+    python -m benchmarks.bench_near_dup --rows 1000000 --batch 50000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_warehouse_fts import create_schema
+from utils import near_dup
+
+CHARACTERS = ('的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可也能下过子说产种面而方后'
+              '多定行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性'
+              '好应开它合还因由其些然前外天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但'
+              '质气第向道命此变条只没结解问意建月公无系军很情者最立代想已通并提直题党程展五果料象员革位入常文总次')
+SITE_SUFFIXES = ('_新浪财经', ' - 网易新闻', '|凤凰网', '_腾讯新闻', '——澎湃新闻', '')
+
+
+class Corpus:
+    """合成新闻：由词表按齐夫分布组成，部分记录是已有报道的转载副本"""
+
+    def __init__(self, duplicate_ratio=0.2, seed=42):
+        self.rng = random.Random(seed)
+        self.duplicate_ratio = duplicate_ratio
+        self.words = [''.join(self.rng.choice(CHARACTERS) for _ in range(self.rng.randint(2, 4)))
+                      for _ in range(5000)]
+        self.weights = [1 / (rank + 1) for rank in range(len(self.words))]
+        self.stories = []
+
+    def _sentence(self, count):
+        return ''.join(self.rng.choices(self.words, self.weights, k=count))
+
+    def _rewrite(self, text, ratio=0.05):
+        chars = list(text)
+        for _ in range(max(1, int(len(chars) * ratio))):
+            chars[self.rng.randrange(len(chars))] = self.rng.choice(CHARACTERS)
+        return ''.join(chars)
+
+    def generate(self, count):
+        """
+        返回:
+            list: (title, content, 原报道序号)，原创记录的原报道序号为自身序号
+        """
+        rows = []
+        for _ in range(count):
+            if self.stories and self.rng.random() < self.duplicate_ratio:
+                story = self.rng.randrange(len(self.stories))
+                title, content = self.stories[story]
+                content = self._rewrite(content)[:self.rng.randint(len(content) * 3 // 4, len(content))]
+                rows.append((title + self.rng.choice(SITE_SUFFIXES), content, story))
+            else:
+                story = len(self.stories)
+                self.stories.append((self._sentence(6), self._sentence(25)))
+                title, content = self.stories[story]
+                rows.append((title + self.rng.choice(SITE_SUFFIXES), content, story))
+        return rows
+
+
+def jaccard(a, b):
+    a, b = near_dup._shingles(a), near_dup._shingles(b)
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='相似报道检测基准测试')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--batch', type=int, default=10000, help='每批写入索引的记录数')
+    parser.add_argument('--duplicates', type=float, default=0.2, help='转载副本占比')
+    parser.add_argument('--sample', type=int, default=500, help='统计候选数和估计误差的抽样查找次数')
+    args = parser.parse_args()
+
+    corpus = Corpus(args.duplicates)
+    rows = corpus.generate(args.rows)
+
+    start = time.perf_counter()
+    for title, content, _ in rows[:10000]:
+        near_dup.signature_of(title, content)
+    per_signature = (time.perf_counter() - start) / min(len(rows), 10000)
+    print(f'签名计算: {per_signature * 1e6:.0f} µs/条，{1 / per_signature:.0f} 条/s')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, 'near_dup.db'))
+        conn.execute('PRAGMA journal_mode=WAL')
+        create_schema(conn)
+        near_dup.init_table(conn)
+
+        print(f'{"已索引":>10} {"本批 µs/条":>12} {"候选数/次":>10}')
+        for offset in range(0, len(rows), args.batch):
+            batch = rows[offset:offset + args.batch]
+            conn.executemany('INSERT INTO data_warehouse (id, title, source, url, content, keywords) '
+                             'VALUES (?, ?, ?, ?, ?, ?)',
+                             [(offset + i + 1, title, '桩站点', f'http://example.com/{offset + i}', content, '基准')
+                              for i, (title, content, _) in enumerate(batch)])
+            start = time.perf_counter()
+            near_dup.index_rows(conn, [(offset + i + 1, title, content) for i, (title, content, _) in enumerate(batch)])
+            conn.commit()
+            elapsed = time.perf_counter() - start
+
+            # 抽样统计每次查找从桶中取出的候选记录数
+            sample = random.Random(offset).sample(batch, min(args.sample, len(batch)))
+            candidates = 0
+            for title, content, _ in sample:
+                signature = near_dup.signature_of(title, content)
+                candidates += len(conn.execute(near_dup._CANDIDATES_SQL, near_dup.band_keys(signature)).fetchall())
+            print(f'{offset + len(batch):>10} {elapsed / len(batch) * 1e6:>12.0f} {candidates / len(sample):>10.1f}')
+
+        clusters = dict(conn.execute('SELECT warehouse_id, cluster_id FROM near_dup_signatures'))
+        size = os.path.getsize(os.path.join(tmp, 'near_dup.db'))
+        conn.close()
+
+    # 转载副本应与原报道归入同一组；不同报道的记录被合并到一起视为误合并
+    first_of_story = {}
+    detected = duplicates = false_merges = 0
+    cluster_story = {}
+    for index, (_, _, story) in enumerate(rows):
+        warehouse_id = index + 1
+        cluster_id = clusters.get(warehouse_id, warehouse_id)
+        if story in first_of_story:
+            duplicates += 1
+            detected += clusters.get(first_of_story[story], first_of_story[story]) == cluster_id
+        else:
+            first_of_story[story] = warehouse_id
+        cluster_story.setdefault(cluster_id, set()).add(story)
+    false_merges = sum(len(stories) - 1 for stories in cluster_story.values())
+
+    # 估计相似度与按片段精确计算的 Jaccard 相似度比较
+    rng = random.Random(0)
+    errors = []
+    for _ in range(args.sample):
+        a, b = rng.sample(range(len(rows)), 2)
+        if rng.random() < 0.5:
+            story = rows[a][2]
+            b = first_of_story[story] - 1
+        text_a = f'{near_dup._TITLE_SUFFIX_PATTERN.sub("", rows[a][0])} {rows[a][1]}'
+        text_b = f'{near_dup._TITLE_SUFFIX_PATTERN.sub("", rows[b][0])} {rows[b][1]}'
+        estimate = near_dup.similarity(near_dup.pack(near_dup.minhash(text_a)), near_dup.pack(near_dup.minhash(text_b)))
+        errors.append(abs(estimate - jaccard(text_a, text_b)))
+
+    print(f'转载副本 {duplicates} 条，检出 {detected} 条（{detected / max(duplicates, 1):.1%}），'
+          f'误合并的不同报道 {false_merges} 组')
+    print(f'估计相似度的平均绝对误差: {sum(errors) / len(errors):.3f}')
+    print(f'数据库大小: {size / 1e6:.1f} MB（{size / len(rows):.0f} 字节/条）')
+
+
+if __name__ == '__main__':
+    main()
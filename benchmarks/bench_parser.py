@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+百度结果页解析基准：比较各解析后端的速度，并检查输出是否完全一致
+
+默认使用生成的结果页语料，也可以指定保存下来的真实结果页目录:
+    python -m benchmarks.bench_parser --pages 200
+    python -m benchmarks.bench_parser --corpus-dir saved_pages/
+
+另外用一组标签嵌套错误的结果页检查各后端与 html.parser（默认后端）的输出差异：
+selectolax 和 lxml 会修复文档树，这类页面上的输出差异只列出、不计为失败。
+"""
+
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.result_parser import available_backends, parse_result_page
+
+HEAD = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{kw}_百度搜索</title>
+<style>.c-container{{margin:0}} .t a{{color:#00c}}</style>
+<script>var bds={{comm:{{qid:"{n}",sid:"1_2_3"}}}};window.__async_strategy=2;</script>
+</head><body>
+<div id="head"><form id="form"><input name="wd" value="{kw}"></form>
+<div class="s_tab"><a href="/s?tn=news">资讯</a><a href="/s?tn=video">视频</a></div></div>
+<div id="container"><div id="content_left">
+'''
+
+TAIL = '''</div>
+<div id="page"><a href="/s?wd={kw}&pn=10">下一页&gt;</a></div>
+<!-- 页面统计 --><script>bds.comm.ready();</script>
+</div></body></html>'''
+
+
+def render_item(rng, kw, n):
+    """随机生成几种不同结构的结果容器"""
+    kind = rng.randrange(6)
+    link = f'http://www.baidu.com/link?url=corpus-{n}-{rng.randrange(10 ** 9)}'
+    if kind == 0:
+        return f'''
+<div class="result c-container new-pmd" id="{n}" srcid="1599" tpl="se_com_default">
+  <h3 class="t c-title"><a href="{link}" target="_blank"><em>{kw}</em>行业最新动态 第{n}期 &amp; 深度解读</a></h3>
+  <div class="c-row"><div class="c-span-last c-span9">
+    <span class="c-color-gray2">2024年6月18日&nbsp;</span>
+    <div class="c-abstract">本文介绍了<em>{kw}</em>在各行业的应用进展，<!-- 高亮 -->涉及政策、资本与技术三个层面。</div>
+    <div class="c-row"><span class="c-showurl c-color-gray">www.news{n % 13}.com.cn/</span></div>
+  </div></div>
+</div>'''
+    if kind == 1:
+        return f'''
+<div class="result-op c-container xpath-log" id="{n}" tpl="news-realtime">
+  <div class="result-op-title"><a href="{link}">{kw}资讯：第{n}条 实时新闻</a></div>
+  <div class="content">  权威媒体报道：{kw}相关领域迎来新突破。<script>log({n})</script></div>
+  <div class="result-op-source">澎湃新闻</div>
+</div>'''
+    if kind == 2:
+        return f'''
+<div class="result-tts" id="{n}">
+  <div class="tts-title"><a href="{link}" class="tts-link">{kw} 百科 — 第{n}条</a></div>
+  <p class="tts-content">{kw}是指……<b>定义</b>与发展历程。</p>
+  <p class="tts-content"></p>
+  <span class="tts-source">百度百科</span>
+</div>'''
+    if kind == 3:
+        # 没有来源信息的结果
+        return f'''
+<div class="result c-container" id="{n}">
+  <h3 class="t"><a href="{link}">{kw}问答 {n}</a></h3>
+  <div class="op_exactqa_s_answer">答：{kw}主要包括以下几类……</div>
+</div>'''
+    if kind == 4:
+        # 标题中没有链接的结果，应被跳过
+        return f'''
+<div class="result c-container" id="{n}">
+  <h3 class="t">{kw}相关搜索</h3>
+  <div class="c-abstract">相关搜索词推荐</div>
+</div>'''
+    return f'''
+<div class="result-game-item" id="{n}">
+  <div class="result-title"><a href="{link}">{kw}小游戏 {n}</a></div>
+  <div class="result-game-desc">  休闲 · 益智  </div>
+  <div class="result-game-desc">评分 4.{n % 10}</div>
+</div>'''
+
+
+def build_corpus(count, seed=7):
+    rng = random.Random(seed)
+    keywords = ['人工智能', '新能源汽车', '半导体', '低空经济', '量子计算']
+    pages = []
+    for i in range(count):
+        kw = rng.choice(keywords)
+        items = ''.join(render_item(rng, kw, i * 10 + j) for j in range(10))
+        pages.append(HEAD.format(kw=kw, n=i) + items + TAIL.format(kw=kw))
+    return pages
+
+
+# 标签嵌套错误的结果容器：(说明, 结果容器HTML)
+MALFORMED_ITEMS = (
+    ('<p> 中嵌套 <div>', '<div class="result c-container"><h3 class="t"><a href="{link}">{kw}标题</a></h3>'
+                         '<p class="content">p1<div>d</div>p2</p></div>'),
+    ('<p> 没有结束标签', '<div class="result c-container"><h3 class="t"><a href="{link}">{kw}标题</a></h3>'
+                       '<p class="content">摘要开头<div class="c-abstract">摘要主体</div></div>'),
+    ('多余的结束标签', '<div class="result c-container"><h3 class="t"><a href="{link}">{kw}标题</a></h3>'
+                    '<div class="c-abstract">摘要</span>内容</b></div>'
+                    '<span class="c-showurl">来源</span></div>'),
+    ('<a> 中嵌套 <h3>', '<div class="result c-container"><a href="{link}"><h3 class="t">{kw}标题</h3></a>'
+                       '<div class="c-abstract">摘要</div></div>'),
+    ('表格中的结果', '<table><tr><div class="result c-container"><h3 class="t"><a href="{link}">{kw}标题</a></h3>'
+                  '<div class="c-abstract">摘要</div></div></tr></table>'),
+)
+
+
+def build_malformed_corpus(seed=7):
+    """每种嵌套错误生成一页，每页10个相同结构的结果容器"""
+    rng = random.Random(seed)
+    pages = []
+    for i, (label, item) in enumerate(MALFORMED_ITEMS):
+        items = ''.join(item.format(kw='人工智能', link=f'http://www.baidu.com/link?url=bad-{i}-{j}-{rng.randrange(10 ** 6)}')
+                        for j in range(10))
+        pages.append((label, HEAD.format(kw='人工智能', n=i) + items + TAIL.format(kw='人工智能')))
+    return pages
+
+
+def load_corpus(directory):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.html'))):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            pages.append(f.read())
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description='百度结果页解析后端基准测试')
+    parser.add_argument('--pages', type=int, default=200, help='生成的语料页数')
+    parser.add_argument('--corpus-dir', help='保存的真实结果页目录（*.html）')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus_dir) if args.corpus_dir else build_corpus(args.pages)
+    print(f'语料: {len(corpus)} 页, 平均 {sum(len(p) for p in corpus) // max(len(corpus), 1)} 字符/页')
+
+    backends = available_backends()
+    reference = None
+    baseline = None
+    ok = True
+    for backend in reversed(backends):
+        outputs = [parse_result_page(html, backend) for html in corpus]
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for html in corpus:
+                parse_result_page(html, backend)
+            best = min(best, time.perf_counter() - start)
+
+        if reference is None:
+            reference, baseline = outputs, best
+            same = True
+        else:
+            same = outputs == reference
+            ok = ok and same
+        items = sum(len(page or []) for page in outputs)
+        print(f'{backend:12s} {best * 1000 / len(corpus):7.2f} ms/页  加速 {baseline / best:5.1f}x  '
+              f'结果 {items} 条  与 html.parser 输出一致: {same}')
+
+    print('\n标签嵌套错误的页面（与 html.parser 输出不同的仅列出，不计为失败）:')
+    malformed = build_malformed_corpus()
+    reference = [parse_result_page(html, 'html.parser') for _, html in malformed]
+    for backend in backends:
+        if backend == 'html.parser':
+            continue
+        for (label, html), expected in zip(malformed, reference):
+            actual = parse_result_page(html, backend)
+            if actual == expected:
+                print(f'  {backend:12s} {label}: 一致')
+                continue
+            if len(actual or []) != len(expected or []):
+                print(f'  {backend:12s} {label}: 不同  结果条数 {len(actual or [])}，html.parser {len(expected or [])}')
+                continue
+            item, reference_item = next((a, e) for a, e in zip(actual, expected) if a != e)
+            field = next(key for key in reference_item if item[key] != reference_item[key])
+            print(f'  {backend:12s} {label}: 不同  {field} {item[field]!r}，html.parser {reference_item[field]!r}')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
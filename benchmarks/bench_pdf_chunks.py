@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF报告渲染基准：单次 wkhtmltopdf 渲染 与 分块并行渲染+合并 的对比
+
+需要安装 wkhtmltopdf 和 pypdf:
+    python -m benchmarks.bench_pdf_chunks --rows 100 1000 10000
+"""
+
+import argparse
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jinja2
+import pdfkit
+
+from benchmarks.bench_warehouse_fts import generate_rows
+from utils import pdf_chunks
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
+
+
+def make_rows(count):
+    rows = []
+    for i, (title, source, url, content, keywords, crawled_at) in enumerate(generate_rows(count), start=1):
+        rows.append({'id': i, 'title': title, 'source': source, 'url': url,
+                     'content': content * 3, 'keywords': keywords, 'crawled_at': crawled_at})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PDF报告分块并行渲染基准测试')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=pdf_chunks.CHUNK_SIZE)
+    parser.add_argument('--skip-single-above', type=int, default=10000,
+                        help='超过该行数时跳过单次渲染（可能耗时过长或失败）')
+    args = parser.parse_args()
+
+    if shutil.which('wkhtmltopdf') is None:
+        print('未找到 wkhtmltopdf，无法运行基准测试')
+        return 1
+    if not pdf_chunks.is_available():
+        print('未安装 pypdf，无法运行分块渲染')
+        return 1
+
+    template = jinja2.Environment(loader=jinja2.FileSystemLoader(TEMPLATES_DIR),
+                                  autoescape=True).get_template('pdf_template.html')
+    now = datetime.datetime.now()
+
+    def render_html(**context):
+        return template.render(now=now, enumerate=enumerate, **context)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.rows:
+            rows = make_rows(count)
+            print(f'== {count} 条 ==')
+
+            if count <= args.skip_single_above:
+                path = os.path.join(tmp, f'single_{count}.pdf')
+                start = time.perf_counter()
+                try:
+                    pdfkit.from_string(render_html(data=rows), path)
+                    print(f'单次渲染      {time.perf_counter() - start:8.1f}s  {os.path.getsize(path) / 1024 / 1024:7.1f} MB')
+                except Exception as e:
+                    print(f'单次渲染失败  {time.perf_counter() - start:8.1f}s  {str(e)[:80]}')
+            else:
+                print('单次渲染      跳过')
+
+            path = os.path.join(tmp, f'chunked_{count}.pdf')
+            start = time.perf_counter()
+            pages = pdf_chunks.render_chunked(rows, path, render_html, pdfkit.from_string,
+                                              workers=args.workers, chunk_size=args.chunk_size)
+            print(f'分块并行渲染  {time.perf_counter() - start:8.1f}s  {os.path.getsize(path) / 1024 / 1024:7.1f} MB  '
+                  f'{pages} 页  ({args.workers} 进程, 每块 {args.chunk_size} 条)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
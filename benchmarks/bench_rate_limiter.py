@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应限速与重试的故障注入测试
+
+在本地桩服务器上按不同故障场景运行多线程搜索，统计获取到的结果、重试次数、
+被服务器拒绝的请求数和限速器最终的速率，不访问外网:
+    python -m benchmarks.bench_rate_limiter --searches 12 --threads 3 --pages 5
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.makedirs('logs', exist_ok=True)
+
+from benchmarks.stub_baidu import StubBaiduServer
+from utils.baidu_spider import BaiduSpider
+from utils.rate_limiter import AdaptiveRateLimiter, RetryPolicy
+
+# 场景名称 -> 桩服务器参数
+SCENARIOS = {
+    '无故障': {},
+    '随机故障': {'faults': {'429': 0.05, '500': 0.05, '503': 0.05, 'captcha': 0.03, 'drop': 0.03}},
+    '服务器限流': {'max_rps': 8},
+    '响应变慢': {'faults': {'slow': 0.3}, 'slow_latency': 0.3},
+    '某页持续失败': {'broken_pages': {20}},
+}
+
+
+def run_scenario(options, args):
+    with StubBaiduServer(latency=args.latency, retry_after=None, **options) as server:
+        # 所有线程的爬虫共享同一个限速器，与生产环境按站点共享一致
+        limiter = AdaptiveRateLimiter(rate=args.rate, max_rate=args.max_rate, latency_target=0.2,
+                                      cooldown=0.5, max_cooldown=4)
+        retry = RetryPolicy(max_retries=3, base=0.1, cap=1.0)
+        totals = {'results': 0, 'partial': 0}
+        lock = threading.Lock()
+
+        def worker(index):
+            spider = BaiduSpider(base_url=server.base_url, rate_limiter=limiter, retry=retry)
+            try:
+                for i in range(index, args.searches, args.threads):
+                    results = spider.search(f'关键词{i}', pages=args.pages)
+                    with lock:
+                        totals['results'] += len(results)
+                        totals['partial'] += spider.last_error is not None
+            finally:
+                spider.close()
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        return elapsed, totals, server.request_count - server.init_count, dict(server.fault_counts), limiter.rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description='自适应限速与重试故障注入测试')
+    parser.add_argument('--searches', type=int, default=12)
+    parser.add_argument('--threads', type=int, default=3)
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.02, help='桩服务器每个请求的延迟（秒）')
+    parser.add_argument('--rate', type=float, default=10.0, help='限速器初始速率（次/秒）')
+    parser.add_argument('--max-rate', type=float, default=40.0, help='限速器最高速率（次/秒）')
+    args = parser.parse_args()
+
+    # 重试和部分结果的警告日志很多，只看汇总
+    logging.disable(logging.WARNING)
+    expected = args.searches * args.pages * 10
+    print(f'{args.searches} 次搜索 × {args.pages} 页，{args.threads} 个线程，完整结果 {expected} 条')
+    for name, options in SCENARIOS.items():
+        elapsed, totals, requests, faults, rate = run_scenario(options, args)
+        print(f'{name:<8} 耗时 {elapsed:6.2f}s  结果 {totals["results"]:4d} 条  部分结果的搜索 {totals["partial"]:2d} 次  '
+              f'结果页请求 {requests:4d} 次  注入故障 {faults}  最终速率 {rate:5.1f}/s')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
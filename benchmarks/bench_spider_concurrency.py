@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BaiduSpider 顺序抓取与并发抓取的对比基准
+
+在本地桩服务器上运行，不访问外网:
+    python -m benchmarks.bench_spider_concurrency --pages 10 --concurrency 4
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.makedirs('logs', exist_ok=True)
+
+from benchmarks.stub_baidu import StubBaiduServer
+from utils.baidu_spider import BaiduSpider
+
+
+def run_once(base_url, pages, concurrency, delay_range):
+    spider = BaiduSpider(base_url=base_url, delay_range=delay_range)
+    try:
+        start = time.perf_counter()
+        results = spider.search('人工智能', pages=pages, concurrency=concurrency)
+        return time.perf_counter() - start, results
+    finally:
+        spider.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='BaiduSpider 并发抓取基准测试')
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.5, help='桩服务器每个请求的延迟（秒）')
+    parser.add_argument('--min-delay', type=float, default=0.1)
+    parser.add_argument('--max-delay', type=float, default=0.3)
+    args = parser.parse_args()
+
+    delay_range = (args.min_delay, args.max_delay)
+    with StubBaiduServer(latency=args.latency) as server:
+        seq_time, seq_results = run_once(server.base_url, args.pages, 1, delay_range)
+        con_time, con_results = run_once(server.base_url, args.pages, args.concurrency, delay_range)
+
+    same = [r['url'] for r in seq_results] == [r['url'] for r in con_results]
+    print(f'页数: {args.pages}, 延迟: {args.latency}s, 礼貌延迟: {delay_range}')
+    print(f'顺序抓取: {seq_time:.2f}s, {len(seq_results)} 条结果')
+    print(f'并发抓取(并发={args.concurrency}): {con_time:.2f}s, {len(con_results)} 条结果')
+    print(f'加速比: {seq_time / con_time:.2f}x, 结果一致: {same}')
+    return 0 if same else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
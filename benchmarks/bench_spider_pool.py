@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+每次搜索新建 BaiduSpider 与从爬虫会话池借用的对比基准
+
+多个线程模拟并发的搜索请求，在本地桩服务器上运行，不访问外网:
+    python -m benchmarks.bench_spider_pool --searches 40 --threads 4 --connect-latency 0.05
+"""
+
+import argparse
+import functools
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.makedirs('logs', exist_ok=True)
+
+from benchmarks.stub_baidu import StubBaiduServer
+from utils.baidu_spider import BaiduSpider
+from utils.spider_pool import SpiderPool
+
+
+def cold_search(factory, keywords, pages):
+    spider = factory()
+    try:
+        return spider.search(keywords, pages=pages)
+    finally:
+        spider.close()
+
+
+def pooled_search(pool, keywords, pages):
+    with pool.spider() as spider:
+        return spider.search(keywords, pages=pages)
+
+
+def run(search, searches, threads, pages):
+    latencies = [[] for _ in range(threads)]
+
+    def worker(index):
+        for i in range(index, searches, threads):
+            start = time.perf_counter()
+            search(f'关键词{i}', pages)
+            latencies[index].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    samples = sorted(value for values in latencies for value in values)
+    return elapsed, statistics.median(samples), samples[int(len(samples) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='爬虫会话池基准测试')
+    parser.add_argument('--searches', type=int, default=40)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--pages', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0.02, help='桩服务器每个请求的延迟（秒）')
+    parser.add_argument('--connect-latency', type=float, default=0.05, help='桩服务器每条新连接的握手延迟（秒）')
+    args = parser.parse_args()
+
+    for name in ('cold', 'pooled'):
+        with StubBaiduServer(latency=args.latency, connect_latency=args.connect_latency) as server:
+            factory = functools.partial(BaiduSpider, base_url=server.base_url, delay_range=(0, 0))
+            if name == 'cold':
+                search = functools.partial(cold_search, factory)
+                label = '每次新建爬虫'
+            else:
+                pool = SpiderPool(factory, max_size=args.threads)
+                search = functools.partial(pooled_search, pool)
+                label = '爬虫会话池  '
+            elapsed, p50, p99 = run(search, args.searches, args.threads, args.pages)
+            if name == 'pooled':
+                pool.close()
+            print(f'{label} 总耗时 {elapsed:6.2f}s  单次搜索 p50 {p50 * 1000:7.1f}ms  p99 {p99 * 1000:7.1f}ms  '
+                  f'首页初始化 {server.init_count:3d} 次  新建连接 {server.connection_count:3d} 条')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+应用冷启动基准：导入 app 的耗时（python -X importtime）和应用工厂的启动耗时
+
+每次在新的 Python 进程中导入 app 并调用 create_app()（不预热爬虫会话）：第一次
+使用全新的数据库（需要建表），之后复用同一个数据库（结构已是当前版本，跳过建表）。
+同时检查复用数据库启动时没有加载爬虫、结果页解析和PDF渲染相关的模块:
+    python -m benchmarks.bench_startup --runs 10
+    python -m benchmarks.bench_startup --budget 300     # 导入耗时中位数超过300ms时返回1
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 导入 app 时不应加载的模块：只在第一次搜索、保存落地页或生成PDF时才需要
+LAZY_MODULES = ('requests', 'bs4', 'lxml', 'selectolax', 'pdfkit', 'pypdf',
+                'utils.baidu_spider', 'utils.result_parser', 'utils.article_extractor',
+                'utils.monitor', 'utils.enrichment')
+
+# 子进程中执行：计时导入和应用工厂，输出一行JSON
+CHILD_SCRIPT = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.spider_pool.warm = lambda count=None: 0
+app.create_app()
+created = time.perf_counter()
+print(json.dumps({'import': imported - started, 'create_app': created - imported,
+                  'loaded': [name for name in %r if name in sys.modules]}))
+''' % (LAZY_MODULES,)
+
+
+def run_child(workdir, importtime=False):
+    """在新进程中启动一次应用，返回计时结果和 -X importtime 的输出"""
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', CHILD_SCRIPT]
+    env = dict(os.environ, PYTHONPATH=ROOT, LOG_PROFILE='production')
+    result = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def parse_importtime(output):
+    """
+    解析 -X importtime 的输出
+
+    返回:
+        list: (累计耗时 µs, 自身耗时 µs, 模块名)
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((int(cumulative_us), int(self_us), name.strip()))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description='应用冷启动基准测试')
+    parser.add_argument('--runs', type=int, default=10, help='复用数据库时的启动次数')
+    parser.add_argument('--top', type=int, default=15, help='列出累计导入耗时最多的模块数')
+    parser.add_argument('--budget', type=float, default=0, help='导入 app 耗时中位数的上限（毫秒），0 表示不检查')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        first, _ = run_child(workdir)
+        runs = [run_child(workdir)[0] for _ in range(args.runs)]
+        _, output = run_child(workdir, importtime=True)
+
+    modules = parse_importtime(output)
+    # 解释器启动时（site 及之前）导入的模块不计入
+    names = [name for _, _, name in modules]
+    if 'site' in names:
+        modules = modules[names.index('site') + 1:]
+    total = next(cumulative for cumulative, _, name in modules if name == 'app')
+    print(f'{"累计 ms":>9} {"自身 ms":>9}  模块（导入 app 共 {total / 1000:.1f} ms）')
+    for cumulative, self_us, name in sorted(modules, reverse=True)[1:args.top + 1]:
+        print(f'{cumulative / 1000:>9.1f} {self_us / 1000:>9.1f}  {name}')
+
+    imports = [run['import'] for run in runs]
+    creates = [run['create_app'] for run in runs]
+    print(f'导入 app: 中位数 {statistics.median(imports) * 1000:.1f} ms，最大 {max(imports) * 1000:.1f} ms')
+    print(f'create_app()（新数据库，建表）: {first["create_app"] * 1000:.1f} ms')
+    print(f'create_app()（已有数据库）: 中位数 {statistics.median(creates) * 1000:.1f} ms')
+
+    # 新数据库建表时会导入监控和内容补全模块，只检查复用数据库时的启动
+    loaded = sorted(set().union(*(run['loaded'] for run in runs)))
+    if loaded:
+        print(f'导入 app 或启动时加载了应延迟导入的模块: {", ".join(loaded)}')
+        return 1
+    if args.budget and statistics.median(imports) * 1000 > args.budget:
+        print(f'导入耗时超过上限 {args.budget:.0f} ms')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据仓库检索基准：LIKE 全表扫描 与 FTS5/日期索引 的对比
+
+在临时数据库中生成合成数据后分别计时:
+    python -m benchmarks.bench_warehouse_fts --rows 1000000
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.warehouse_search import init_search_index, build_filters
+
+KEYWORDS = ['人工智能', '新能源汽车', '半导体', '低空经济', '数据要素', '量子计算', '机器人', '生物医药']
+SOURCES = ['新华网', '人民网', '央视网', '澎湃新闻', '财新网', '36氪', '界面新闻']
+
+
+def create_schema(conn):
+    conn.execute('''
+        CREATE TABLE data_warehouse (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            source TEXT,
+            url TEXT NOT NULL,
+            content TEXT,
+            keywords TEXT NOT NULL,
+            crawled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def generate_rows(count, seed=42):
+    rng = random.Random(seed)
+    start = datetime.datetime(2024, 1, 1)
+    for i in range(count):
+        keyword = rng.choice(KEYWORDS)
+        crawled_at = start + datetime.timedelta(seconds=rng.randrange(0, 365 * 24 * 3600))
+        yield (
+            f'{keyword}行业动态第{i}期：{rng.choice(KEYWORDS)}相关进展',
+            rng.choice(SOURCES),
+            f'http://www.baidu.com/link?url=bench-{i}',
+            f'关于{keyword}的摘要内容，编号{i}，涉及{rng.choice(KEYWORDS)}与{rng.choice(KEYWORDS)}。',
+            keyword,
+            crawled_at.strftime('%Y-%m-%d %H:%M:%S'),
+        )
+
+
+def populate(conn, rows, with_index):
+    create_schema(conn)
+    if with_index:
+        init_search_index(conn)
+    conn.executemany(
+        'INSERT INTO data_warehouse (title, source, url, content, keywords, crawled_at) VALUES (?, ?, ?, ?, ?, ?)',
+        generate_rows(rows)
+    )
+    conn.commit()
+
+
+def timed(conn, sql, params, repeat):
+    best = float('inf')
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(conn.execute(sql, params).fetchall())
+        best = min(best, time.perf_counter() - start)
+    return best, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数据仓库 LIKE 与 FTS 检索基准测试')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = sqlite3.connect(os.path.join(tmp, 'plain.db'))
+        indexed = sqlite3.connect(os.path.join(tmp, 'indexed.db'))
+
+        start = time.perf_counter()
+        populate(plain, args.rows, with_index=False)
+        plain_load = time.perf_counter() - start
+        start = time.perf_counter()
+        populate(indexed, args.rows, with_index=True)
+        indexed_load = time.perf_counter() - start
+        print(f'数据量: {args.rows} 行, 写入耗时 无索引 {plain_load:.1f}s / 有索引 {indexed_load:.1f}s')
+
+        cases = [
+            ('关键词过滤', {'keywords': '新能源汽车'}),
+            ('日期过滤', {'date': '2024-06-18'}),
+            ('关键词+日期', {'keywords': '半导体', 'date': '2024-06-18'}),
+            ('全文检索（高频词）', {'text': '低空经济'}),
+            ('全文检索（低频词）', {'text': '编号99999'}),
+        ]
+        for name, kwargs in cases:
+            # 旧实现：LIKE 与 DATE() 全表扫描
+            like_sql = 'SELECT * FROM data_warehouse WHERE 1=1'
+            like_params = []
+            if 'keywords' in kwargs:
+                like_sql += ' AND keywords LIKE ?'
+                like_params.append(f"%{kwargs['keywords']}%")
+            if 'text' in kwargs:
+                like_sql += ' AND (title LIKE ? OR content LIKE ? OR source LIKE ? OR keywords LIKE ?)'
+                like_params.extend([f"%{kwargs['text']}%"] * 4)
+            if 'date' in kwargs:
+                like_sql += ' AND DATE(crawled_at) = ?'
+                like_params.append(kwargs['date'])
+            like_sql += ' ORDER BY crawled_at DESC'
+            like_time, like_count = timed(plain, like_sql, like_params, args.repeat)
+
+            filters, params = build_filters(**kwargs)
+            fts_sql = 'SELECT * FROM data_warehouse WHERE 1=1' + filters + ' ORDER BY crawled_at DESC'
+            fts_time, fts_count = timed(indexed, fts_sql, params, args.repeat)
+
+            print(f'{name}: LIKE {like_time * 1000:.1f}ms ({like_count} 行) | '
+                  f'索引 {fts_time * 1000:.1f}ms ({fts_count} 行) | 加速 {like_time / fts_time:.1f}x')
+
+        plain.close()
+        indexed.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+端到端压测：离线运行完整的 Flask 应用，测量各接口的吞吐量和延迟分位数
+
+应用在子进程中以多线程WSGI服务器运行，使用独立的工作目录（数据库、报告目录、
+日志都在其中），爬虫指向本地百度桩服务器，不访问外网。数据仓库预先填充指定
+条数的合成数据；指定 --data-dir 时填充好的数据库会保留下来，下次直接复用。
+
+每个数据规模、每个并发数下依次压测:
+    login           登录（每次新建会话）
+    search          搜索1页（关键词从固定词表中随机选取，部分请求命中搜索缓存）
+    save_data       保存最近一次搜索中随机选取的5条结果
+    data_warehouse  数据仓库首页，随机组合关键词/全文/日期检索条件
+    generate_pdf    提交20条数据的PDF报告任务（只计提交请求；报告渲染另计为 pdf_report）
+
+结果以JSON输出，包含版本号和每项的吞吐量、p50/p90/p99 延迟，可以与之前保存的
+结果对比:
+    python -m benchmarks.load_test run --sizes 10000,100000 --concurrency 1,8 --output results.json
+    python -m benchmarks.load_test run --sizes 1000000 --data-dir /var/tmp/load_test
+    python -m benchmarks.load_test run --compare results.json
+    python -m benchmarks.load_test record --keywords 人工智能 --pages 3 --out recorded/   # 录制真实结果页（访问百度）
+    python -m benchmarks.load_test run --recorded recorded/
+"""
+
+import argparse
+import datetime
+import functools
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import requests
+
+from benchmarks.bench_warehouse_fts import KEYWORDS, generate_rows
+from benchmarks.stub_baidu import StubBaiduServer, load_recorded_pages
+
+OPERATIONS = ('login', 'search', 'save_data', 'data_warehouse', 'generate_pdf')
+
+# 搜索关键词词表：压测中重复出现的关键词会命中搜索缓存
+SEARCH_KEYWORDS = KEYWORDS + [f'{keyword}{suffix}' for keyword in KEYWORDS for suffix in ('政策', '融资', '出口')]
+
+# 填充数据仓库时每批插入的条数
+SEED_BATCH = 20000
+
+# 对比时延迟或吞吐量变差超过该比例视为性能回退
+REGRESSION_THRESHOLD = 0.2
+
+
+def percentile(values, fraction):
+    """最近秩法分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def git_version():
+    """当前代码的版本号（git describe），不在git仓库中时返回None"""
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# ---------------------------------------------------------------- 应用子进程
+
+def prepare_workdir(workdir):
+    """
+    准备应用的工作目录：模板目录和静态资源链接到仓库中的文件，
+    数据库、报告目录和日志写在工作目录中，不污染仓库
+    """
+    os.makedirs(os.path.join(workdir, 'static'), exist_ok=True)
+    links = [('templates', 'templates')] + [(os.path.join('static', name), os.path.join('static', name))
+                                           for name in os.listdir(os.path.join(ROOT, 'static')) if name != 'reports']
+    for source, target in links:
+        target = os.path.join(workdir, target)
+        if not os.path.lexists(target):
+            os.symlink(os.path.join(ROOT, source), target)
+
+
+def seed_warehouse(appmod, rows):
+    """把数据仓库补充到 rows 条合成数据，并重建关键词统计汇总表"""
+    from utils import analytics
+    from utils.warehouse import normalize_url
+
+    with appmod.db.connection() as conn:
+        existing = conn.execute('SELECT COUNT(*) FROM data_warehouse').fetchone()[0]
+    if existing >= rows:
+        return existing
+
+    start = time.perf_counter()
+    generated = generate_rows(rows)
+    for _ in range(existing):
+        next(generated)
+    batch = []
+    for title, source, url, content, keyword, crawled_at in generated:
+        batch.append((title, source, url, content, keyword, crawled_at, normalize_url(url)))
+        if len(batch) >= SEED_BATCH:
+            with appmod.db.connection() as conn:
+                conn.executemany('INSERT OR IGNORE INTO data_warehouse '
+                                 '(title, source, url, content, keywords, crawled_at, url_norm) '
+                                 'VALUES (?, ?, ?, ?, ?, ?, ?)', batch)
+            batch = []
+    with appmod.db.connection() as conn:
+        if batch:
+            conn.executemany('INSERT OR IGNORE INTO data_warehouse '
+                             '(title, source, url, content, keywords, crawled_at, url_norm) '
+                             'VALUES (?, ?, ?, ?, ?, ?, ?)', batch)
+        analytics.rebuild(conn)
+    print(f'数据仓库已填充 {rows} 条数据，用时 {time.perf_counter() - start:.1f}s', flush=True)
+    return rows
+
+
+def serve(args):
+    """在工作目录中启动应用（由 run 在子进程中调用）"""
+    prepare_workdir(args.workdir)
+    os.chdir(args.workdir)
+    os.environ.setdefault('LOG_PROFILE', 'production')
+    import app as appmod
+    from werkzeug.serving import make_server
+
+    appmod.init_db()
+    seed_warehouse(appmod, args.rows)
+    # 复用数据目录时清空上次留下的搜索缓存，每次压测的缓存命中情况相同
+    appmod.search_cache.clear()
+    appmod.spider_pool.factory = functools.partial(appmod.spider_pool.factory, base_url=args.baidu_url,
+                                                   delay_range=(0, 0.01))
+    server = make_server('127.0.0.1', args.port, appmod.create_app(), threaded=True)
+    print('READY', flush=True)
+    server.serve_forever()
+
+
+class AppProcess:
+    """在子进程中运行的应用，应用日志写入工作目录中的 server.log"""
+
+    def __init__(self, workdir, rows, baidu_url):
+        os.makedirs(workdir, exist_ok=True)
+        self.port = free_port()
+        self.base_url = f'http://127.0.0.1:{self.port}'
+        self.log_path = os.path.join(workdir, 'server.log')
+        self._log = open(self.log_path, 'w', encoding='utf-8')
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'benchmarks.load_test', 'serve', '--workdir', workdir, '--rows', str(rows),
+             '--port', str(self.port), '--baidu-url', baidu_url],
+            cwd=ROOT, stdout=subprocess.PIPE, stderr=self._log, text=True)
+        # 填充大数据量时启动可能需要较长时间，期间转发子进程的进度信息
+        for line in self.process.stdout:
+            if line.strip() == 'READY':
+                return
+            print(line.rstrip(), file=sys.stderr, flush=True)
+        self.stop()
+        raise RuntimeError(f'应用进程启动失败，详见 {self.log_path}')
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait(timeout=30)
+        self._log.close()
+
+
+# ---------------------------------------------------------------- 压测客户端
+
+class Client:
+    """一个已登录的浏览器会话"""
+
+    def __init__(self, base_url, rng):
+        self.base_url = base_url
+        self.rng = rng
+        self.session = requests.Session()
+        self.login()
+        self.search()
+
+    def login(self, session=None):
+        response = (session or self.session).post(f'{self.base_url}/login',
+                                                  data={'username': 'admin', 'password': 'admin888'},
+                                                  allow_redirects=False)
+        return response.status_code == 302 and 'login' not in response.headers.get('Location', '')
+
+    def search(self):
+        response = self.session.post(f'{self.base_url}/',
+                                     data={'keywords': self.rng.choice(SEARCH_KEYWORDS), 'pages': 1})
+        return response.status_code == 200 and 'data-item' in response.text
+
+    def save_data(self):
+        selected = [str(index) for index in self.rng.sample(range(10), 5)]
+        response = self.session.post(f'{self.base_url}/save_data', data={'selected_items': selected},
+                                     allow_redirects=False)
+        return response.status_code == 302
+
+    def data_warehouse(self):
+        params = {}
+        roll = self.rng.random()
+        if roll < 0.3:
+            params['keywords'] = self.rng.choice(KEYWORDS)
+        elif roll < 0.6:
+            params['q'] = self.rng.choice(KEYWORDS)
+        elif roll < 0.8:
+            day = datetime.date(2024, 1, 1) + datetime.timedelta(days=self.rng.randrange(365))
+            params['date'] = day.isoformat()
+        response = self.session.get(f'{self.base_url}/data_warehouse', params=params)
+        return response.status_code == 200
+
+    def generate_pdf(self, max_id, jobs):
+        ids = [str(self.rng.randint(1, max_id)) for _ in range(20)]
+        response = self.session.post(f'{self.base_url}/generate_pdf', data={'selected_data': ids},
+                                     allow_redirects=False)
+        location = response.headers.get('Location', '')
+        if response.status_code != 302 or 'pdf_job=' not in location:
+            return False
+        jobs.append((location.split('pdf_job=')[1].split('&')[0], time.perf_counter()))
+        return True
+
+
+def run_operation(base_url, operation, concurrency, total, max_id, seed):
+    """
+    用 concurrency 个并发会话共发起 total 次请求
+
+    返回:
+        dict: 请求数、错误数、吞吐量和延迟分位数（毫秒）
+    """
+    clients = [Client(base_url, random.Random(seed + i)) for i in range(concurrency)]
+    latencies = []
+    errors = 0
+    jobs = []
+    lock = threading.Lock()
+    remaining = [total]
+
+    def worker(client):
+        nonlocal errors
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            start = time.perf_counter()
+            try:
+                if operation == 'login':
+                    ok = client.login(requests.Session())
+                elif operation == 'generate_pdf':
+                    ok = client.generate_pdf(max_id, jobs)
+                else:
+                    ok = getattr(client, operation)()
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                errors += not ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, clients))
+    elapsed = time.perf_counter() - start
+
+    results = [summarize(operation, concurrency, latencies, errors, elapsed)]
+    if jobs:
+        results.append(wait_pdf_jobs(clients[0].session, base_url, jobs, concurrency))
+    return results
+
+
+def summarize(operation, concurrency, latencies, errors, elapsed):
+    return {
+        'operation': operation,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 2) if latencies else None,
+        'p90_ms': round(percentile(latencies, 0.9) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+    }
+
+
+def wait_pdf_jobs(session, base_url, jobs, concurrency, timeout=600):
+    """等待提交的PDF任务结束，统计从提交到完成的时间（未安装 wkhtmltopdf 时任务全部失败）"""
+    start = time.perf_counter()
+    latencies = []
+    errors = 0
+    pending = list(jobs)
+    deadline = time.monotonic() + timeout
+    while pending and time.monotonic() < deadline:
+        still_pending = []
+        for job_id, submitted in pending:
+            job = session.get(f'{base_url}/pdf_jobs/{job_id}').json()
+            if job.get('status') == 'done':
+                latencies.append(time.perf_counter() - submitted)
+            elif job.get('status') == 'failed' or job.get('error'):
+                errors += 1
+            else:
+                still_pending.append((job_id, submitted))
+        pending = still_pending
+        if pending:
+            time.sleep(0.2)
+    errors += len(pending)
+    result = summarize('pdf_report', concurrency, latencies, errors, time.perf_counter() - start)
+    result['requests'] = len(jobs)
+    return result
+
+
+# ---------------------------------------------------------------- 运行与对比
+
+def compare(results, baseline_path):
+    """与之前保存的结果对比，返回性能回退的项目"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    previous = {(item['rows'], item['operation'], item['concurrency']): item for item in baseline['results']}
+    regressions = []
+    for item in results:
+        old = previous.get((item['rows'], item['operation'], item['concurrency']))
+        if not old:
+            continue
+        for key, worse_if_higher in (('p50_ms', True), ('p99_ms', True), ('throughput_rps', False)):
+            if not old.get(key) or item.get(key) is None:
+                continue
+            change = item[key] / old[key] - 1
+            if (change if worse_if_higher else -change) > REGRESSION_THRESHOLD:
+                regressions.append(f"{item['operation']} 规模 {item['rows']} 并发 {item['concurrency']}: "
+                                   f"{key} {old[key]} -> {item[key]} ({change:+.0%})")
+    return baseline.get('version'), regressions
+
+
+def run(args):
+    sizes = [int(size) for size in args.sizes.split(',')]
+    levels = [int(level) for level in args.concurrency.split(',')]
+    operations = args.operations.split(',') if args.operations else list(OPERATIONS)
+    recorded = load_recorded_pages(args.recorded) if args.recorded else None
+
+    report = {
+        'version': git_version(),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {'sizes': sizes, 'concurrency': levels, 'requests': args.requests, 'operations': operations,
+                   'stub_latency': args.stub_latency, 'recorded_pages': len(recorded or [])},
+        'results': [],
+    }
+    with StubBaiduServer(latency=args.stub_latency, recorded_pages=recorded) as baidu, \
+            tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            workdir = os.path.join(args.data_dir or tmp, f'rows_{rows}')
+            app = AppProcess(workdir, rows, baidu.base_url)
+            try:
+                for concurrency in levels:
+                    for operation in operations:
+                        for item in run_operation(app.base_url, operation, concurrency, args.requests, rows, args.seed):
+                            item['rows'] = rows
+                            report['results'].append(item)
+                            print(f"{rows:>8} {item['operation']:<15} 并发 {concurrency:>3}  "
+                                  f"{item['throughput_rps'] or 0:>8.1f} 次/s  p50 {item['p50_ms'] or 0:>8.1f}ms  "
+                                  f"p99 {item['p99_ms'] or 0:>8.1f}ms  错误 {item['errors']}/{item['requests']}",
+                                  file=sys.stderr, flush=True)
+            finally:
+                app.stop()
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        version, regressions = compare(report['results'], args.compare)
+        print(f'与 {version or args.compare} 对比: ' + ('未发现性能回退' if not regressions else
+                                                    f'{len(regressions)} 项性能回退'), file=sys.stderr)
+        for line in regressions:
+            print(f'  {line}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+def record(args):
+    """从百度录制真实的结果页，供 --recorded 使用（会访问外网）"""
+    import urllib.parse
+    from utils.baidu_spider import BaiduSpider
+
+    os.makedirs(args.out, exist_ok=True)
+    spider = BaiduSpider()
+    try:
+        spider._initialize()
+        encoded = urllib.parse.quote(args.keywords)
+        for page in range(args.pages):
+            html = spider._fetch_page(encoded, page)
+            path = os.path.join(args.out, f'page_{page:03d}.html')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(html)
+            print(f'已录制第 {page + 1} 页: {path}')
+    finally:
+        spider.close()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='离线端到端压测')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = sub.add_parser('run', help='运行压测')
+    run_parser.add_argument('--sizes', default='10000,100000,1000000', help='数据仓库的数据条数，逗号分隔')
+    run_parser.add_argument('--concurrency', default='1,8', help='并发会话数，逗号分隔')
+    run_parser.add_argument('--requests', type=int, default=200, help='每项每个并发数下的请求总数')
+    run_parser.add_argument('--operations', default='', help=f'只压测部分接口，逗号分隔（{",".join(OPERATIONS)}）')
+    run_parser.add_argument('--stub-latency', type=float, default=0.05, help='百度桩服务器每个请求的延迟（秒）')
+    run_parser.add_argument('--recorded', help='录制的结果页目录（代替生成的假数据）')
+    run_parser.add_argument('--data-dir', help='保留填充好的数据库的目录，下次运行直接复用')
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--output', help='结果JSON的输出文件，默认输出到标准输出')
+    run_parser.add_argument('--compare', help='与之前保存的结果JSON对比，有性能回退时退出码为1')
+
+    serve_parser = sub.add_parser('serve', help='（内部使用）在工作目录中启动应用')
+    serve_parser.add_argument('--workdir', required=True)
+    serve_parser.add_argument('--rows', type=int, required=True)
+    serve_parser.add_argument('--port', type=int, required=True)
+    serve_parser.add_argument('--baidu-url', required=True)
+
+    record_parser = sub.add_parser('record', help='从百度录制真实结果页（访问外网）')
+    record_parser.add_argument('--keywords', required=True)
+    record_parser.add_argument('--pages', type=int, default=3)
+    record_parser.add_argument('--out', required=True)
+
+    args = parser.parse_args(argv)
+    if args.command == 'serve':
+        serve(args)
+        return 0
+    return run(args) if args.command == 'run' else record(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
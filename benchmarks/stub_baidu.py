@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地百度桩服务器 - 供基准测试离线使用
+
+按照百度搜索结果页的结构返回固定的假数据，不访问外网。可以按概率向结果页
+请求注入故障（429、5xx、验证码页面、断开连接、慢响应），也可以模拟服务器端
+限流（每秒请求数超过上限时返回429），用于检验爬虫的限速和重试。/link?url=...
+模拟百度跳转链接，302跳转到 url 参数指定的地址。
+
+传入录制的真实结果页（load_recorded_pages）时，按页码轮流返回录制的页面，
+代替按模板生成的假数据。
+"""
+
+import glob
+import os
+import random
+import threading
+import time
+from collections import deque
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+CAPTCHA_PAGE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>百度安全验证</title></head>
+<body><div class="passMod_dialog-body">请完成下方验证后继续操作</div></body></html>'''
+
+# 可注入的故障类型
+FAULTS = ('429', '500', '503', 'captcha', 'drop', 'slow')
+
+
+def render_result_page(keywords, pn, per_page=10):
+    """生成一页与百度结果页结构相同的HTML"""
+    items = []
+    for i in range(per_page):
+        n = pn + i
+        items.append(f'''
+        <div class="result c-container" id="{n + 1}">
+            <h3 class="t"><a href="http://www.baidu.com/link?url=stub-{urllib.parse.quote(keywords)}-{n}" target="_blank">{keywords} 相关新闻标题 {n}</a></h3>
+            <div class="c-abstract">这是关于{keywords}的第 {n} 条摘要内容，用于离线基准测试。</div>
+            <span class="c-showurl c-color-gray">stub-source-{n % 7}.example.com</span>
+        </div>''')
+    return f'''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{keywords}_百度搜索</title></head>
+<body><div id="content_left">{''.join(items)}
+</div></body></html>'''
+
+
+def load_recorded_pages(directory):
+    """读取目录中按文件名排序的 *.html 录制结果页"""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.html'))):
+        with open(path, encoding='utf-8') as f:
+            pages.append(f.read())
+    if not pages:
+        raise ValueError(f'目录中没有录制的结果页: {directory}')
+    return pages
+
+
+class StubBaiduServer:
+    """
+    在后台线程中运行的百度桩服务器
+
+    参数:
+        latency: 每个请求的模拟网络延迟（秒）
+        total_results: 关键词的结果总数，超过后返回不足10条的最后一页
+        connect_latency: 每条新连接的模拟握手延迟（秒），连接保持复用时只付一次
+        cookie_max_age: 首页下发的Cookie有效期（秒），None 表示会话Cookie
+        faults: 结果页请求的故障注入概率，例如 {'429': 0.05, '503': 0.1, 'captcha': 0.02}，
+                故障类型见 FAULTS；'slow' 表示额外等待 slow_latency 秒后正常返回
+        max_rps: 服务器端限流，最近1秒内的结果页请求数超过该值时返回429
+        retry_after: 限流和429故障响应中 Retry-After 的秒数，None 表示不发送
+        broken_pages: 总是返回500的 pn 值集合，用于模拟某一页持续失败
+        seed: 故障注入的随机种子，相同种子得到相同的故障序列
+        recorded_pages: 录制的结果页HTML列表，第 pn//10 页返回其中第 (pn//10) % len 个
+    """
+
+    def __init__(self, latency=0.2, total_results=1000, host='127.0.0.1', port=0,
+                 connect_latency=0, cookie_max_age=None, faults=None, max_rps=None,
+                 retry_after=1, broken_pages=(), slow_latency=2.0, seed=0, recorded_pages=None):
+        self.latency = latency
+        self.total_results = total_results
+        self.connect_latency = connect_latency
+        self.cookie_max_age = cookie_max_age
+        self.request_count = 0
+        self.connection_count = 0
+        self.init_count = 0
+        self.faults = dict(faults or {})
+        unknown = set(self.faults) - set(FAULTS)
+        if unknown:
+            raise ValueError(f'未知的故障类型: {sorted(unknown)}')
+        self.max_rps = max_rps
+        self.retry_after = retry_after
+        self.broken_pages = set(broken_pages)
+        self.slow_latency = slow_latency
+        self.recorded_pages = list(recorded_pages or [])
+        self.fault_counts = {}
+        self._random = random.Random(seed)
+        self._recent = deque()
+        self._count_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 支持 keep-alive，同一连接上可以处理多个请求
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                with stub._count_lock:
+                    stub.connection_count += 1
+                if stub.connect_latency:
+                    time.sleep(stub.connect_latency)
+
+            def send_body(self, status, body, headers=()):
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def inject_fault(self, pn):
+                """按配置注入故障；已经发送了故障响应时返回True"""
+                fault = stub._choose_fault(pn)
+                if fault is None:
+                    return False
+                retry_after = [] if stub.retry_after is None else [('Retry-After', str(stub.retry_after))]
+                if fault == 'slow':
+                    time.sleep(stub.slow_latency)
+                    return False
+                if fault == 'drop':
+                    # 不发送任何响应直接断开连接
+                    self.close_connection = True
+                elif fault == 'captcha':
+                    # 与百度一样重定向到验证码页面
+                    self.send_response(302)
+                    self.send_header('Location', '/static/captcha/index.html')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                elif fault in ('429', 'limit'):
+                    self.send_body(429, 'Too Many Requests', retry_after)
+                else:
+                    self.send_body(int(fault), 'Server Error', retry_after if fault == '503' else [])
+                return True
+
+            def do_GET(self):
+                with stub._count_lock:
+                    stub.request_count += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                parsed = urllib.parse.urlparse(self.path)
+                if parsed.path == '/s':
+                    query = urllib.parse.parse_qs(parsed.query)
+                    if self.inject_fault(int(query.get('pn', ['0'])[0])):
+                        return
+                if parsed.path.startswith('/static/captcha/'):
+                    self.send_body(200, CAPTCHA_PAGE)
+                    return
+                if parsed.path == '/link':
+                    # 跳转链接：url 参数即落地页地址
+                    target = urllib.parse.parse_qs(parsed.query).get('url', [''])[0]
+                    self.send_response(302)
+                    self.send_header('Location', target)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if parsed.path == '/s':
+                    query = urllib.parse.parse_qs(parsed.query)
+                    keywords = query.get('wd', [''])[0]
+                    pn = int(query.get('pn', ['0'])[0])
+                    per_page = max(0, min(10, stub.total_results - pn))
+                    if stub.recorded_pages:
+                        body = stub.recorded_pages[(pn // 10) % len(stub.recorded_pages)]
+                    else:
+                        body = render_result_page(keywords, pn, per_page)
+                else:
+                    body = '<html><body>stub baidu</body></html>'
+                    with stub._count_lock:
+                        stub.init_count += 1
+
+                headers = []
+                if parsed.path != '/s':
+                    cookie = f'BAIDUID=stub{stub.init_count}; Path=/'
+                    if stub.cookie_max_age is not None:
+                        cookie += f'; Max-Age={stub.cookie_max_age}'
+                    headers.append(('Set-Cookie', cookie))
+                self.send_body(200, body, headers)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _choose_fault(self, pn):
+        """决定本次结果页请求注入的故障，返回故障类型或None"""
+        with self._count_lock:
+            fault = None
+            if pn in self.broken_pages:
+                fault = '500'
+            if fault is None and self.max_rps is not None:
+                now = time.monotonic()
+                while self._recent and now - self._recent[0] > 1.0:
+                    self._recent.popleft()
+                if len(self._recent) >= self.max_rps:
+                    fault = 'limit'
+                else:
+                    self._recent.append(now)
+            if fault is None:
+                roll = self._random.random()
+                for name, probability in self.faults.items():
+                    if roll < probability:
+                        fault = name
+                        break
+                    roll -= probability
+            if fault is not None:
+                self.fault_counts[fault] = self.fault_counts.get(fault, 0) + 1
+            return fault
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    with StubBaiduServer(port=8765) as server:
+        print(f'百度桩服务器运行中: {server.base_url}，按 Ctrl+C 退出')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地新闻站点桩服务器 - 供落地页补全的基准测试离线使用
+
+/article/<n> 返回一篇带导航、正文段落和发布时间的新闻页面；记录同时在处理的
+请求数峰值，用于检验每个域名的并发上限。
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def render_article(site, n):
+    """生成一篇新闻页面的HTML"""
+    paragraphs = ''.join(
+        f'<p>{site} 第 {n} 篇报道的第 {i + 1} 段正文：人工智能与新能源汽车行业持续发展，相关企业加快布局。</p>'
+        for i in range(8)
+    )
+    return f'''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{site} 新闻 {n}</title>
+<meta property="article:published_time" content="2024-{n % 12 + 1:02d}-{n % 28 + 1:02d}T08:30:00+08:00">
+<link rel="canonical" href="/article/{n}"></head>
+<body><nav><a href="/">首页</a><a href="/tech">科技</a></nav>
+<div class="main"><h1>{site} 新闻 {n}</h1><div class="article-content">{paragraphs}</div></div>
+<footer><p>版权所有 © {site} 保留所有权利，未经授权不得转载。</p></footer></body></html>'''
+
+
+class StubSiteServer:
+    """
+    在后台线程中运行的新闻站点桩服务器
+
+    参数:
+        latency: 每个请求的模拟处理时间（秒）
+    """
+
+    def __init__(self, latency=0.05, host='127.0.0.1', port=0):
+        self.latency = latency
+        self.request_count = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._count_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with stub._count_lock:
+                    stub.request_count += 1
+                    stub._in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub._in_flight)
+                try:
+                    if stub.latency:
+                        time.sleep(stub.latency)
+                    if self.path.startswith('/article/'):
+                        status, body = 200, render_article(stub.base_url, int(self.path.rsplit('/', 1)[1]))
+                    else:
+                        status, body = 404, 'Not Found'
+                finally:
+                    # 在发出响应之前减少计数：客户端收到响应后立即发起的下一个请求不应被算作重叠
+                    with stub._count_lock:
+                        stub._in_flight -= 1
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -56,6 +56,146 @@ function generatePDFReport() {
     }
 }
 
+// 轮询PDF报告任务状态，完成后显示下载链接
+function pollPDFJob(panel) {
+    const message = panel.querySelector('.pdf-job-message');
+    
+    fetch(panel.dataset.statusUrl)
+        .then(response => response.json())
+        .then(job => {
+            if (job.status === 'done') {
+                message.innerHTML = '';
+                const link = document.createElement('a');
+                link.href = job.download_url;
+                link.className = 'btn btn-pdf';
+                link.textContent = '下载PDF报告';
+                message.appendChild(link);
+            } else if (job.status === 'failed' || job.error) {
+                message.textContent = `报告生成失败: ${job.error || '未知错误'}`;
+            } else {
+                message.textContent = `报告生成中，进度 ${job.progress}% ...`;
+                setTimeout(() => pollPDFJob(panel), 1000);
+            }
+        })
+        .catch(() => {
+            setTimeout(() => pollPDFJob(panel), 3000);
+        });
+}
+
+// 逐页推送的搜索：正在接收的 EventSource 和搜索ID
+let activeSearch = null;
+
+// 按页面模板的结构生成一条搜索结果
+function renderResultItem(result, index) {
+    const item = document.createElement('li');
+    item.className = 'data-item';
+    
+    const checkboxGroup = document.createElement('div');
+    checkboxGroup.className = 'checkbox-group';
+    const checkbox = document.createElement('input');
+    checkbox.type = 'checkbox';
+    checkbox.name = 'selected_items';
+    checkbox.value = index;
+    checkboxGroup.appendChild(checkbox);
+    item.appendChild(checkboxGroup);
+    
+    const title = document.createElement('h3');
+    const titleLink = document.createElement('a');
+    titleLink.href = result.url;
+    titleLink.target = '_blank';
+    titleLink.textContent = result.title;
+    title.appendChild(titleLink);
+    item.appendChild(title);
+    
+    const meta = document.createElement('div');
+    meta.className = 'data-meta';
+    const source = document.createElement('span');
+    source.textContent = `来源: ${result.source}`;
+    const urlSpan = document.createElement('span');
+    const urlLink = document.createElement('a');
+    urlLink.href = result.url;
+    urlLink.target = '_blank';
+    urlLink.textContent = result.url;
+    urlSpan.appendChild(urlLink);
+    meta.appendChild(source);
+    meta.appendChild(urlSpan);
+    item.appendChild(meta);
+    
+    if (result.content) {
+        const content = document.createElement('div');
+        content.className = 'data-content';
+        content.textContent = result.content;
+        item.appendChild(content);
+    }
+    return item;
+}
+
+// 结束逐页推送：关闭连接（否则 EventSource 会自动重连并重新搜索）
+function finishStreamingSearch(message) {
+    if (activeSearch) {
+        activeSearch.source.close();
+        activeSearch = null;
+    }
+    document.getElementById('search_status').textContent = message;
+    document.getElementById('cancel_search').hidden = true;
+}
+
+// 通过 Server-Sent Events 逐页接收搜索结果并追加到列表
+function startStreamingSearch(form) {
+    if (activeSearch) {
+        cancelStreamingSearch();
+    }
+    
+    const keywords = document.getElementById('keywords').value.trim();
+    const pages = document.getElementById('pages').value || 1;
+    const list = document.getElementById('result_list');
+    const count = document.getElementById('result_count');
+    list.innerHTML = '';
+    count.textContent = 0;
+    document.getElementById('select_all').checked = false;
+    document.getElementById('results_card').hidden = false;
+    document.getElementById('search_progress').hidden = false;
+    document.getElementById('cancel_search').hidden = false;
+    document.getElementById('search_status').textContent = `正在搜索 “${keywords}” ...`;
+    
+    const params = new URLSearchParams({keywords: keywords, pages: pages});
+    const source = new EventSource(`${form.dataset.streamUrl}?${params}`);
+    activeSearch = {source: source, searchId: null, cancelUrl: form.dataset.cancelUrl};
+    
+    source.addEventListener('start', e => {
+        activeSearch.searchId = JSON.parse(e.data).search_id;
+    });
+    source.addEventListener('page', e => {
+        const data = JSON.parse(e.data);
+        data.results.forEach((result, i) => list.appendChild(renderResultItem(result, data.offset + i)));
+        count.textContent = data.offset + data.results.length;
+        document.getElementById('search_status').textContent = `已获取第 ${data.page} 页，正在继续搜索...`;
+    });
+    source.addEventListener('done', e => {
+        const data = JSON.parse(e.data);
+        finishStreamingSearch(data.error
+            ? `部分页面获取失败，仅显示已获取的 ${data.total} 条结果: ${data.error}`
+            : `搜索完成，共 ${data.total} 条结果`);
+    });
+    source.addEventListener('failed', e => {
+        finishStreamingSearch(`获取数据失败: ${JSON.parse(e.data).error}`);
+    });
+    source.onerror = () => {
+        finishStreamingSearch('与服务器的连接已断开，仅显示已获取的结果');
+    };
+}
+
+// 取消逐页推送的搜索，已显示的结果保留
+function cancelStreamingSearch() {
+    if (!activeSearch) {
+        return;
+    }
+    if (activeSearch.searchId) {
+        fetch(activeSearch.cancelUrl.replace('__search_id__', activeSearch.searchId), {method: 'POST'});
+    }
+    finishStreamingSearch('搜索已取消，仅显示已获取的结果');
+}
+
 // 下载PDF文件
 function downloadPDF(pdfUrl) {
     window.open(pdfUrl, '_blank');
@@ -80,9 +220,20 @@ document.addEventListener('DOMContentLoaded', function() {
                 e.preventDefault();
                 return;
             }
+            
+            // 支持 Server-Sent Events 时逐页显示结果，否则按普通表单提交
+            if (window.EventSource && searchForm.dataset.streamUrl) {
+                e.preventDefault();
+                startStreamingSearch(searchForm);
+            }
         });
     }
     
+    const cancelSearchButton = document.getElementById('cancel_search');
+    if (cancelSearchButton) {
+        cancelSearchButton.addEventListener('click', cancelStreamingSearch);
+    }
+    
     // 为数据仓库搜索表单添加提交处理
     const warehouseSearchForm = document.getElementById('warehouse_search_form');
     if (warehouseSearchForm) {
@@ -111,6 +262,12 @@ document.addEventListener('DOMContentLoaded', function() {
     if (selectAllWarehouseCheckbox) {
         selectAllWarehouseCheckbox.addEventListener('change', toggleSelectAllWarehouse);
     }
+    
+    // 如果页面上有进行中的PDF任务，开始轮询任务状态
+    const pdfJobPanel = document.getElementById('pdf_job_status');
+    if (pdfJobPanel) {
+        pollPDFJob(pdfJobPanel);
+    }
 });
 
 // 显示消息提示（可选，用于增强用户体验）
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+关键词趋势统计模块
+
+数据仓库保存数据时（页面保存和后台监控进程都经过 utils.warehouse.save_items）
+同步累加两张汇总表，统计页面只读取汇总表，不扫描 data_warehouse:
+    analytics_daily    每个关键词每天保存的文章数（按保存日期，UTC）
+    analytics_sources  每个关键词各来源的文章数
+
+一篇文章带有多个关键词时分别计入每个关键词；已保存的文章被新的关键词再次
+保存时计入新关键词。汇总表与数据仓库不一致时（例如直接修改了数据库）可以重建:
+    python -m utils.analytics rebuild
+    python -m utils.analytics top --days 30
+"""
+
+import argparse
+import collections
+import datetime
+import logging
+import sqlite3
+import sys
+import time
+
+from utils import warehouse_archive
+
+logger = logging.getLogger(__name__)
+
+# 关键词之间的分隔符（与 utils.warehouse.KEYWORD_SEPARATOR 一致）
+KEYWORD_SEPARATOR = ','
+
+# 来源为空的文章在统计中的来源名称
+UNKNOWN_SOURCE = '未知来源'
+
+# 重建汇总表时每批读取的记录数
+REBUILD_BATCH = 5000
+
+# 趋势查询允许的最大天数
+MAX_DAYS = 366
+
+_DAILY_UPSERT_SQL = '''
+    INSERT INTO analytics_daily (keyword, day, articles) VALUES (?, ?, ?)
+    ON CONFLICT (keyword, day) DO UPDATE SET articles = articles + excluded.articles
+'''
+_SOURCES_UPSERT_SQL = '''
+    INSERT INTO analytics_sources (keyword, source, articles) VALUES (?, ?, ?)
+    ON CONFLICT (keyword, source) DO UPDATE SET articles = articles + excluded.articles
+'''
+
+
+def split_keywords(value):
+    """把关键词列表字符串拆分为去重后的关键词"""
+    keywords = []
+    for keyword in (value or '').split(KEYWORD_SEPARATOR):
+        keyword = keyword.strip()
+        if keyword and keyword not in keywords:
+            keywords.append(keyword)
+    return keywords
+
+
+def init_table(conn):
+    """
+    创建汇总表（如果不存在）
+
+    第一次创建时从数据仓库中的已有数据生成汇总。
+    """
+    created = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'analytics_daily'").fetchone() is None
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS analytics_daily (
+            keyword TEXT NOT NULL,
+            day TEXT NOT NULL,
+            articles INTEGER NOT NULL,
+            PRIMARY KEY (keyword, day)
+        ) WITHOUT ROWID
+    ''')
+    # 按时间窗口统计各关键词的文章数
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_analytics_daily_day ON analytics_daily (day, keyword, articles)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS analytics_sources (
+            keyword TEXT NOT NULL,
+            source TEXT NOT NULL,
+            articles INTEGER NOT NULL,
+            PRIMARY KEY (keyword, source)
+        ) WITHOUT ROWID
+    ''')
+    if created:
+        rebuild(conn)
+
+
+def record(conn, entries):
+    """
+    累加新保存文章的统计
+
+    参数:
+        conn: 数据库连接，事务由调用方提交
+        entries: 可迭代的 (关键词, 保存日期 YYYY-MM-DD, 来源)，每项计一篇文章
+    """
+    daily = collections.Counter()
+    sources = collections.Counter()
+    for keyword, day, source in entries:
+        daily[keyword, day] += 1
+        sources[keyword, source or UNKNOWN_SOURCE] += 1
+    if daily:
+        conn.executemany(_DAILY_UPSERT_SQL, [(keyword, day, count) for (keyword, day), count in daily.items()])
+        conn.executemany(_SOURCES_UPSERT_SQL, [(keyword, source, count) for (keyword, source), count in sources.items()])
+
+
+def rebuild(conn, batch_size=REBUILD_BATCH):
+    """
+    清空汇总表并按数据仓库（包括各归档分区）中的全部数据重新统计
+
+    返回:
+        int: 统计的文章数
+    """
+    start = time.perf_counter()
+    conn.execute('DELETE FROM analytics_daily')
+    conn.execute('DELETE FROM analytics_sources')
+    total = 0
+    for table in ['data_warehouse'] + [partition[0] for partition in warehouse_archive.list_partitions(conn)]:
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                f'SELECT id, keywords, DATE(crawled_at), source FROM {table} WHERE id > ? ORDER BY id LIMIT ?',
+                (last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            record(conn, ((keyword, day, source) for _, keywords, day, source in rows
+                          for keyword in split_keywords(keywords)))
+            total += len(rows)
+            last_id = rows[-1][0]
+    logger.info(f'关键词统计汇总表已重建: {total} 条数据，用时 {time.perf_counter() - start:.1f}s')
+    return total
+
+
+def _since(days, today=None):
+    days = max(1, min(int(days), MAX_DAYS))
+    today = today or datetime.datetime.now(datetime.timezone.utc).date()
+    return today - datetime.timedelta(days=days - 1), today
+
+
+def top_keywords(conn, days=30, limit=20):
+    """
+    最近 days 天保存文章最多的关键词
+
+    返回:
+        list: [{'keyword': ..., 'articles': ...}]
+    """
+    start, _ = _since(days)
+    rows = conn.execute('''
+        SELECT keyword, SUM(articles) AS total FROM analytics_daily WHERE day >= ?
+        GROUP BY keyword ORDER BY total DESC, keyword LIMIT ?
+    ''', (start.isoformat(), limit))
+    return [{'keyword': keyword, 'articles': total} for keyword, total in rows]
+
+
+def keyword_trend(conn, keyword, days=30):
+    """
+    关键词最近 days 天每天保存的文章数，没有数据的日期记为0
+
+    返回:
+        list: [{'day': 'YYYY-MM-DD', 'articles': ...}]，按日期升序
+    """
+    start, end = _since(days)
+    counts = dict(conn.execute('SELECT day, articles FROM analytics_daily WHERE keyword = ? AND day >= ? AND day <= ?',
+                               (keyword, start.isoformat(), end.isoformat())))
+    trend = []
+    day = start
+    while day <= end:
+        trend.append({'day': day.isoformat(), 'articles': counts.get(day.isoformat(), 0)})
+        day += datetime.timedelta(days=1)
+    return trend
+
+
+def top_sources(conn, keyword, limit=10):
+    """
+    关键词下保存文章最多的来源
+
+    返回:
+        list: [{'source': ..., 'articles': ...}]
+    """
+    rows = conn.execute('''
+        SELECT source, articles FROM analytics_sources WHERE keyword = ?
+        ORDER BY articles DESC, source LIMIT ?
+    ''', (keyword, limit))
+    return [{'source': source, 'articles': articles} for source, articles in rows]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='关键词趋势统计')
+    parser.add_argument('--db', default='data.db', help='数据库文件路径')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('rebuild', help='按数据仓库中的全部数据重建汇总表')
+    top = sub.add_parser('top', help='列出最近保存文章最多的关键词')
+    top.add_argument('--days', type=int, default=30)
+    top.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        # 本模块是 utils.schema 的依赖，在函数内导入避免循环导入
+        from utils import schema
+        schema.init_schema(conn)
+        conn.commit()
+        if args.command == 'rebuild':
+            total = rebuild(conn)
+            conn.commit()
+            print(f'汇总表已重建: {total} 条数据')
+        else:
+            for row in top_keywords(conn, args.days, args.limit):
+                sources = '、'.join(source['source'] for source in top_sources(conn, row['keyword'], 3))
+                print(f"{row['keyword']}\t{row['articles']}\t{sources}")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+落地页正文提取模块
+
+从新闻/文章页面的HTML中提取标题、正文、发布时间和规范URL。正文按段落文本
+密度选取：去掉脚本、导航、页眉页脚等元素后，把每个段落的文本长度累加到其父元素，
+得分最高的元素即正文容器。发布时间依次从 meta 标签、<time> 元素、JSON-LD
+和页面开头的日期文本中查找。
+"""
+
+import json
+import re
+import urllib.parse
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# 提取正文前删除的元素
+REMOVE_TAGS = ('script', 'style', 'noscript', 'template', 'iframe', 'nav', 'header', 'footer', 'aside',
+               'form', 'button', 'select', 'svg')
+
+# 计入正文得分的段落元素及最短长度（字符数）
+PARAGRAPH_TAGS = ('p', 'pre', 'blockquote', 'li')
+MIN_PARAGRAPH_CHARS = 10
+
+# 最佳容器的得分低于该值时，认为没有明显的正文结构，退回整页文本
+MIN_ARTICLE_SCORE = 80
+
+# 保存的正文最大字符数
+MAX_TEXT_CHARS = 200000
+
+# 表示发布时间的 meta 标签（属性名, 属性值），按优先级排列
+PUBLISH_META = (
+    ('property', 'article:published_time'),
+    ('itemprop', 'datePublished'),
+    ('name', 'pubdate'),
+    ('name', 'publishdate'),
+    ('name', 'publish_time'),
+    ('name', 'PubDate'),
+    ('property', 'og:release_date'),
+    ('name', 'og:time'),
+    ('name', 'weibo: article:create_at'),
+    ('name', 'date'),
+)
+
+# 日期时间文本，如 2024-05-01 10:20、2024/5/1、2024年5月1日 10:20:30、2024-05-01T10:20:30+08:00
+DATE_PATTERN = re.compile(
+    r'((?:19|20)\d{2})\s*[-/.年]\s*(\d{1,2})\s*[-/.月]\s*(\d{1,2})\s*日?'
+    r'(?:[\sT]*(\d{1,2})\s*[:：时]\s*(\d{2})(?:\s*[:：分]\s*(\d{2}))?)?'
+)
+JSON_LD_DATE = re.compile(r'"datePublished"\s*:\s*"([^"]+)"')
+
+# 正文开头中查找发布时间的范围（字符数）
+DATE_SEARCH_CHARS = 3000
+
+
+def normalize_datetime(value):
+    """
+    把各种格式的日期时间文本规范为 "YYYY-MM-DD HH:MM:SS" 或 "YYYY-MM-DD"
+
+    返回:
+        str 或 None: 无法识别时返回None
+    """
+    match = DATE_PATTERN.search(value or '')
+    if not match:
+        return None
+    year, month, day, hour, minute, second = match.groups()
+    month, day = int(month), int(day)
+    if not (1 <= month <= 12 and 1 <= day <= 31):
+        return None
+    date = f'{year}-{month:02d}-{day:02d}'
+    if hour is None or int(hour) > 23 or int(minute) > 59:
+        return date
+    return f'{date} {int(hour):02d}:{minute}:{second or "00"}'
+
+
+def _clean_text(text):
+    return re.sub(r'[ \t\r\f\v　\xa0]+', ' ', text).strip()
+
+
+def _find_publish_time(soup, html):
+    for attr, name in PUBLISH_META:
+        tag = soup.find('meta', attrs={attr: name})
+        if tag is not None:
+            value = normalize_datetime(tag.get('content'))
+            if value:
+                return value
+    for tag in soup.find_all('time', limit=5):
+        value = normalize_datetime(tag.get('datetime') or tag.get_text())
+        if value:
+            return value
+    match = JSON_LD_DATE.search(html)
+    if match:
+        value = normalize_datetime(match.group(1))
+        if value:
+            return value
+    return None
+
+
+def _find_title(soup):
+    tag = soup.find('meta', attrs={'property': 'og:title'})
+    if tag is not None and tag.get('content'):
+        return _clean_text(tag['content'])
+    if soup.title is not None and soup.title.string:
+        return _clean_text(soup.title.string)
+    tag = soup.find('h1')
+    return _clean_text(tag.get_text()) if tag is not None else None
+
+
+def _find_canonical(soup, url):
+    for tag in soup.find_all('link', href=True, limit=50):
+        rel = tag.get('rel') or []
+        if 'canonical' in (rel if isinstance(rel, list) else rel.split()):
+            canonical = urllib.parse.urljoin(url, tag['href'].strip())
+            if urllib.parse.urlparse(canonical).scheme in ('http', 'https'):
+                return canonical
+    return None
+
+
+def _directly_within(tag, container):
+    """tag 是否在 container 内，且不嵌套在另一个段落元素中（避免列表项等重复计入）"""
+    for parent in tag.parents:
+        if parent is container:
+            return True
+        if parent.name in PARAGRAPH_TAGS:
+            return False
+    return False
+
+
+def _find_article_text(soup):
+    body = soup.body or soup
+    nodes = {}
+    scores = {}
+    paragraphs = []
+    for tag in body.find_all(PARAGRAPH_TAGS):
+        text = _clean_text(tag.get_text(' '))
+        if len(text) < MIN_PARAGRAPH_CHARS:
+            continue
+        paragraphs.append((tag, text))
+        # 段落文本计入父元素，一半计入祖父元素，正文常被多层容器包裹
+        parent = tag.parent
+        for node, weight in ((parent, 1), (parent.parent if parent is not None else None, 0.5)):
+            if node is not None:
+                nodes[id(node)] = node
+                scores[id(node)] = scores.get(id(node), 0) + len(text) * weight
+
+    if scores:
+        best_id = max(scores, key=scores.get)
+        if scores[best_id] >= MIN_ARTICLE_SCORE:
+            best = nodes[best_id]
+            inside = [text for tag, text in paragraphs if _directly_within(tag, best)]
+            if inside:
+                return '\n'.join(inside)
+
+    lines = (_clean_text(line) for line in body.get_text('\n').splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def extract_article(html, url=None):
+    """
+    提取落地页的标题、正文、发布时间和规范URL
+
+    参数:
+        html: 页面HTML文本
+        url: 页面地址，用于把相对的 canonical 链接转为绝对地址
+
+    返回:
+        dict: 包含 title, text, published_at, canonical_url；无法识别的字段为None
+    """
+    soup = BeautifulSoup(html, HTML_PARSER)
+    title = _find_title(soup)
+    canonical = _find_canonical(soup, url) if url else None
+    published_at = _find_publish_time(soup, html)
+
+    for tag in soup.find_all(REMOVE_TAGS):
+        tag.decompose()
+    text = _find_article_text(soup)[:MAX_TEXT_CHARS]
+
+    if published_at is None:
+        published_at = normalize_datetime(text[:DATE_SEARCH_CHARS])
+    return {
+        'title': title,
+        'text': text,
+        'published_at': published_at,
+        'canonical_url': canonical,
+    }
+
+
+def find_meta_redirect(html):
+    """
+    查找页面中的 meta refresh 或 JavaScript 跳转地址（百度跳转页在部分情况下返回200和跳转脚本）
+
+    返回:
+        str 或 None: 跳转目标地址
+    """
+    match = re.search(r'''<meta[^>]+http-equiv=["']?refresh["']?[^>]*content=["'][^"']*url=([^"'>\s]+)''', html, re.I)
+    if match:
+        return match.group(1).strip()
+    match = re.search(r'''(?:window\.)?location\.(?:replace|assign)\(\s*["']([^"']+)["']''', html)
+    if match is None:
+        match = re.search(r'''(?:window\.)?location(?:\.href)?\s*=\s*["']([^"']+)["']''', html)
+    if match:
+        try:
+            # 跳转脚本中的地址可能是JSON转义的字符串
+            return json.loads(f'"{match.group(1)}"')
+        except ValueError:
+            return match.group(1)
+    return None
@@ -5,24 +5,77 @@
 """
 
 import requests
-from bs4 import BeautifulSoup
 import time
-import random
 import logging
 import urllib.parse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import metrics
+from utils.rate_limiter import RetryPolicy, get_rate_limiter, parse_retry_after
+from utils.result_parser import get_parser, get_process_pool, parse_result_page
+
+logger = logging.getLogger(__name__)
+
+# 爬虫指标
+PAGE_FETCH_SECONDS = metrics.histogram('baidu_spider_page_fetch_seconds', '下载一页搜索结果的耗时（秒）', ['outcome'])
+PAGE_PARSE_SECONDS = metrics.histogram('baidu_spider_page_parse_seconds', '解析一页搜索结果的耗时（秒）', ['backend'])
+PAGE_RESULTS = metrics.histogram('baidu_spider_page_results', '每页解析出的结果条数', buckets=(0, 1, 2, 5, 8, 10, 15, 20, 50))
+PAGES_TOTAL = metrics.counter('baidu_spider_pages_total', '获取的结果页数，按来源和是否解析出结果分组', ['source', 'status'])
+FETCH_RETRIES = metrics.counter('baidu_spider_fetch_retries_total', '下载结果页时的重试次数，按失败原因分组', ['outcome'])
+RESULTS_TOTAL = metrics.counter('baidu_spider_results_total', '去重后返回的搜索结果条数')
+
+class PageFetchError(Exception):
+    """一页搜索结果在重试后仍未能下载，或搜索已被取消"""
+
+    def __init__(self, page, reason, throttled=False, cancelled=False):
+        super().__init__(f'第 {page+1} 页下载失败: {reason}')
+        self.page = page
+        self.reason = reason
+        self.throttled = throttled
+        self.cancelled = cancelled
+
+
+def is_captcha(response):
+    """响应是否为百度安全验证（验证码）页面"""
+    parsed = urllib.parse.urlparse(response.url)
+    if parsed.netloc.startswith('wappass.') or 'captcha' in parsed.path:
+        return True
+    return '<title>百度安全验证</title>' in response.text[:2048]
 
-# 配置日志
-logging.basicConfig(
-    filename='logs/spider.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 
 class BaiduSpider:
     """百度搜索爬虫类"""
     
-    def __init__(self):
+    # 并发抓取的页数达到该值时，把解析放到进程池中执行
+    PROCESS_PARSE_MIN_PAGES = 4
+    
+    def __init__(self, base_url='https://www.baidu.com', delay_range=(1, 3), cache=None, parser_backend=None,
+                 cookie_ttl=1800, pool_maxsize=4, rate_limiter=None, retry=None):
+        """
+        参数:
+            base_url: 百度站点根地址，测试或基准测试时可指向本地桩服务器
+            delay_range: 相邻两次请求的间隔范围（秒），用于创建该站点共享的限速器：
+                         初始间隔取平均值，服务器响应正常时逐渐缩短到下限
+            cache: 可选的搜索结果缓存（utils.search_cache.SearchCache），按关键词和页码缓存解析结果
+            parser_backend: 结果页解析后端（selectolax / lxml / html.parser），默认 html.parser；
+                            C实现的后端更快，但标签嵌套错误的页面上摘要可能不同（见 utils.result_parser）
+            cookie_ttl: 会话Cookie的最长使用时间（秒），超过后或Cookie过期时在下次搜索前重新初始化
+            pool_maxsize: 每个主机保持的keep-alive连接数，应不小于并发抓取的页数
+            rate_limiter: 限速器（utils.rate_limiter.AdaptiveRateLimiter），默认使用目标站点共享的限速器
+            retry: 单页请求的重试策略（utils.rate_limiter.RetryPolicy）
+        """
+        self.base_url = base_url.rstrip('/')
+        self.delay_range = delay_range
+        self.cache = cache
+        self.parser_backend = parser_backend or get_parser().name
+        self.cookie_ttl = cookie_ttl
+        self.rate_limiter = rate_limiter or get_rate_limiter(urllib.parse.urlparse(self.base_url).netloc, delay_range)
+        self.retry = retry or RetryPolicy()
+        # 最近一次搜索中断的原因；为None表示所有页面都已获取
+        self.last_error = None
         self.session = requests.Session()
+        self._mount_adapter(pool_maxsize)
         self.headers = {
             'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
             'accept-encoding': 'gzip, deflate, br, zstd',
@@ -33,31 +86,233 @@ class BaiduSpider:
             'upgrade-insecure-requests': '1'
         }
         self.initialized = False
+        self.initialized_at = None
+    
+    def _mount_adapter(self, pool_maxsize):
+        """挂载保持长连接的连接适配器，同一会话的各次搜索复用已建立的TCP/TLS连接"""
+        adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.pool_maxsize = pool_maxsize
+    
+    def needs_initialize(self):
+        """会话是否需要（重新）初始化：从未初始化、超过 cookie_ttl 或有Cookie已过期"""
+        if not self.initialized:
+            return True
+        if self.cookie_ttl is not None and time.monotonic() - self.initialized_at > self.cookie_ttl:
+            return True
+        now = time.time()
+        return any(cookie.is_expired(now) for cookie in self.session.cookies)
+    
+    def invalidate(self):
+        """标记会话需要在下次搜索前重新初始化（例如搜索出错、疑似被反爬时）"""
+        self.initialized = False
     
     def _initialize(self):
         """初始化会话，访问百度首页获取必要的Cookie"""
-        if not self.initialized:
+        if self.needs_initialize():
+            if self.initialized:
+                logger.debug('百度爬虫会话Cookie已过期，重新初始化')
+            self.initialized = False
+            self.session.cookies.clear()
             try:
-                response = self.session.get('https://www.baidu.com', headers=self.headers, timeout=10)
+                response = self.session.get(self.base_url, headers=self.headers, timeout=10)
                 if response.status_code == 200:
                     self.initialized = True
-                    logging.info('百度爬虫会话初始化成功')
+                    self.initialized_at = time.monotonic()
+                    logger.debug('百度爬虫会话初始化成功')
                 else:
-                    logging.warning(f'百度爬虫会话初始化失败，状态码: {response.status_code}')
+                    logger.warning(f'百度爬虫会话初始化失败，状态码: {response.status_code}')
             except Exception as e:
-                logging.error(f'百度爬虫会话初始化错误: {str(e)}')
+                logger.error(f'百度爬虫会话初始化错误: {str(e)}')
                 raise
     
-    def search(self, keywords, pages=1):
+    def _page_url(self, encoded_keywords, page):
+        """构造第 page 页（从0开始）的搜索地址"""
+        # 计算百度搜索的pn参数
+        pn = page * 10
+        return f'{self.base_url}/s?wd={encoded_keywords}&pn={pn}'
+    
+    def _fetch_page(self, encoded_keywords, page, cancelled=None):
+        """
+        下载一页搜索结果并返回HTML文本
+        
+        每次请求前从限速器取得令牌，并把请求结果反馈给限速器；遇到429、验证码页面、
+        5xx或网络错误时按重试策略退避后重试。
+        
+        参数:
+            cancelled: 可选的 threading.Event，被设置后不再发起请求或重试
+        
+        异常:
+            PageFetchError: 重试次数用尽、遇到其他4xx错误或搜索已结束
+        """
+        url = self._page_url(encoded_keywords, page)
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            # 等待令牌期间搜索可能已被取消
+            if cancelled is not None and cancelled.is_set():
+                raise PageFetchError(page, '搜索已结束', cancelled=True)
+            logger.debug(f'正在爬取百度搜索第 {page+1} 页: {url}')
+            
+            # 发送请求
+            start = time.perf_counter()
+            retry_after = None
+            retryable = True
+            try:
+                response = self.session.get(url, headers=self.headers, timeout=15)
+            except requests.exceptions.RequestException as e:
+                outcome, reason = 'error', f'网络错误: {str(e)}'
+            else:
+                status = response.status_code
+                if status == 429 or (status == 200 and is_captcha(response)):
+                    outcome = 'throttled'
+                    reason = 'HTTP 429' if status == 429 else '百度安全验证'
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                elif status >= 500:
+                    outcome, reason = 'error', f'HTTP {status}'
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                elif status >= 400:
+                    outcome, reason, retryable = 'error', f'HTTP {status}', False
+                else:
+                    outcome = 'ok'
+            elapsed = time.perf_counter() - start
+            PAGE_FETCH_SECONDS.labels(outcome).observe(elapsed)
+            self.rate_limiter.record(outcome, elapsed, retry_after)
+            
+            if outcome == 'ok':
+                return response.text
+            if outcome == 'throttled':
+                # 被限流时换一组Cookie，下次搜索前重新初始化
+                self.invalidate()
+            
+            attempt += 1
+            if not retryable or attempt > self.retry.max_retries:
+                raise PageFetchError(page, reason, throttled=outcome == 'throttled')
+            if cancelled is not None and cancelled.is_set():
+                raise PageFetchError(page, '搜索已结束', cancelled=True)
+            FETCH_RETRIES.labels(outcome).inc()
+            delay = self.retry.backoff(attempt)
+            logger.warning(f'第 {page+1} 页请求失败（{reason}），{delay:.1f} 秒后第 {attempt} 次重试')
+            time.sleep(delay)
+    
+    def _parse_page(self, html, page):
+        """
+        解析一页搜索结果
+        
+        返回:
+            list 或 None: 本页解析出的结果（未去重）；页面中没有结果容器时返回None
+        """
+        return parse_result_page(html, self.parser_backend)
+    
+    def _parse_page_in_process(self, html, page):
+        """在共享进程池中解析一页结果，避免解析占用抓取线程的GIL"""
+        return get_process_pool().submit(parse_result_page, html, self.parser_backend).result()
+    
+    def _get_page(self, keywords, encoded_keywords, page, parse=None, cancelled=None):
+        """
+        获取一页解析后的结果，优先使用缓存
+        
+        参数:
+            parse: 解析函数，默认在当前线程中解析
+            cancelled: 可选的 threading.Event，被设置后不再重试
+        
+        异常:
+            PageFetchError: 页面下载失败
+        """
+        if self.cache is not None:
+            page_items = self.cache.get(keywords, page)
+            if page_items is not None:
+                logger.debug(f'百度搜索第 {page+1} 页命中缓存')
+                PAGES_TOTAL.labels('cache', 'ok').inc()
+                return page_items
+        
+        try:
+            html = self._fetch_page(encoded_keywords, page, cancelled)
+        except PageFetchError:
+            PAGES_TOTAL.labels('network', 'failed').inc()
+            raise
+        start = time.perf_counter()
+        page_items = (parse or self._parse_page)(html, page)
+        PAGE_PARSE_SECONDS.labels(self.parser_backend).observe(time.perf_counter() - start)
+        PAGES_TOTAL.labels('network', 'empty' if page_items is None else 'ok').inc()
+        PAGE_RESULTS.observe(len(page_items or ()))
+        
+        # 没有结果容器的页面可能是验证码等异常页面，不写入缓存
+        if self.cache is not None and page_items is not None:
+            self.cache.set(keywords, page, page_items)
+        return page_items
+    
+    def _merge_page(self, page, page_items, results, unique_urls, known_urls=None):
+        """
+        按页序把一页结果合并进总结果（跨页URL去重）
+        
+        返回:
+            bool: 是否应该停止处理后续页面
+        """
+        if page_items is None:
+            logger.warning(f'第 {page+1} 页未找到搜索结果')
+            return False
+        
+        # 增量爬取：本页结果全部是已知URL时，后面的页面大概率也已爬取过
+        if known_urls and page_items:
+            known = known_urls([item['url'] for item in page_items])
+            if all(item['url'] in known for item in page_items):
+                logger.info(f'第 {page+1} 页结果均为已知URL，停止后续爬取')
+                return True
+        
+        page_results = 0
+        for item in page_items:
+            # 去重检查
+            if item['url'] in unique_urls:
+                continue
+            unique_urls.add(item['url'])
+            
+            # 添加结果
+            results.append(item)
+            page_results += 1
+        
+        logger.debug(f'第 {page+1} 页爬取完成，获取 {page_results} 条有效结果')
+        
+        # 如果当前页结果少于10条，可能没有更多页了
+        if page_results < 10:
+            logger.info(f'检测到第 {page+1} 页结果不足10条，不再爬取后续页面')
+            return True
+        return False
+    
+    def search(self, keywords, pages=1, concurrency=1, known_urls=None):
         """
         执行百度搜索
         
         参数:
             keywords: 搜索关键词
             pages: 爬取的页数
+            concurrency: 并发抓取的页数上限，1 表示逐页顺序抓取
+            known_urls: 可选的增量爬取回调，接收一页结果的URL列表，返回其中已知URL的集合；
+                        某页结果全部已知时停止翻页（该页结果不再加入返回值）
             
         返回:
-            list: 搜索结果列表，每个元素是包含title, url, source, content的字典
+            list: 搜索结果列表，每个元素是包含title, url, source, content的字典。
+                  某页重试后仍下载失败时返回该页之前各页的结果，失败原因记录在 last_error 中
+        """
+        results = []
+        for _, page_results in self.iter_search(keywords, pages, concurrency, known_urls):
+            results.extend(page_results)
+        return results
+    
+    def iter_search(self, keywords, pages=1, concurrency=1, known_urls=None, cancelled=None):
+        """
+        逐页执行百度搜索的生成器，每解析完一页（按页序）立即产出该页的结果
+        
+        参数与 search 相同，另外:
+            cancelled: 可选的 threading.Event，被设置后不再抓取后续页面（已产出的结果保留）。
+                       并发模式结束时也会设置它，以停止仍在途的页面
+        
+        产出:
+            tuple: (页码（从0开始）, 本页去重后新增的结果列表)
+        
+        提前关闭生成器（close）同样会停止后续页面的抓取。某页重试后仍下载失败时
+        生成器正常结束，失败原因记录在 last_error 中。
         """
         if not keywords:
             raise ValueError('搜索关键词不能为空')
@@ -65,6 +320,7 @@ class BaiduSpider:
         if pages < 1:
             pages = 1
         
+        self.last_error = None
         self._initialize()
         
         # 编码关键词
@@ -72,108 +328,90 @@ class BaiduSpider:
         
         results = []
         unique_urls = set()  # 用于去重
+        if cancelled is None:
+            cancelled = threading.Event()
         
         try:
-            for page in range(pages):
-                # 计算百度搜索的pn参数
-                pn = page * 10
-                url = f'https://www.baidu.com/s?wd={encoded_keywords}&pn={pn}'
-                
-                # 添加随机延迟，避免被反爬
-                if page > 0:
-                    delay = random.uniform(1, 3)
-                    time.sleep(delay)
-                
-                logging.info(f'正在爬取百度搜索第 {page+1} 页: {url}')
-                
-                # 发送请求
-                response = self.session.get(url, headers=self.headers, timeout=15)
-                response.raise_for_status()  # 检查请求是否成功
-                
-                # 解析HTML
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # 查找搜索结果
-                result_containers = soup.find_all(['div', 'div'], class_=['result', 'result-op', 'result-tts', 'result-game-item'])
-                
-                if not result_containers:
-                    logging.warning(f'第 {page+1} 页未找到搜索结果')
-                    continue
-                
-                page_results = 0
-                for idx, container in enumerate(result_containers):
-                    try:
-                        # 提取标题
-                        title_element = container.find(['h3', 'div'], class_=['t', 'result-title', 'result-op-title', 'tts-title'])
-                        if not title_element:
-                            continue
-                        
-                        title = title_element.get_text(strip=True)
-                        
-                        # 提取URL
-                        url_element = title_element.find(['a'], href=True)
-                        if not url_element:
-                            continue
-                        
-                        url = url_element['href']
-                        
-                        # 去重检查
-                        if url in unique_urls:
-                            continue
-                        unique_urls.add(url)
-                        
-                        # 提取来源
-                        source = '未知'
-                        source_element = container.find(['span', 'div'], class_=['c-showurl', 'c-showurl c-color-gray', 'result-op-source', 'tts-source'])
-                        if source_element:
-                            source = source_element.get_text(strip=True)
-                        
-                        # 提取内容摘要
-                        content = ''
-                        content_elements = container.find_all(['div', 'div', 'p'], class_=['c-abstract', 'content', 'op_exactqa_s_answer', 'c-span-last', 'result-game-desc', 'tts-content'])
-                        
-                        for content_elem in content_elements:
-                            content_text = content_elem.get_text(strip=True)
-                            if content_text:
-                                content += content_text + ' '  # 合并所有可能的摘要内容
-                        
-                        content = content.strip()
-                        
-                        # 添加结果
-                        results.append({
-                            'title': title,
-                            'url': url,
-                            'source': source,
-                            'content': content
-                        })
-                        
-                        page_results += 1
-                        
-                    except Exception as e:
-                        logging.error(f'解析第 {page+1} 页第 {idx+1} 条结果时出错: {str(e)}')
-                        continue
-                
-                logging.info(f'第 {page+1} 页爬取完成，获取 {page_results} 条有效结果')
-                
-                # 如果当前页结果少于10条，可能没有更多页了
-                if page_results < 10 and page < pages - 1:
-                    logging.info(f'检测到第 {page+1} 页结果不足10条，停止后续爬取')
-                    break
+            if concurrency > 1 and pages > 1:
+                yield from self._search_concurrent(keywords, encoded_keywords, pages, concurrency, results, unique_urls,
+                                                   known_urls, cancelled)
+            else:
+                yield from self._search_sequential(keywords, encoded_keywords, pages, results, unique_urls,
+                                                   known_urls, cancelled)
         
+        except PageFetchError as e:
+            if e.cancelled:
+                logger.info(f'百度搜索已取消，已获取 {len(results)} 条结果')
+            else:
+                # 保留已获取的部分结果，不让一页的失败丢掉整次搜索
+                self.last_error = str(e)
+                logger.warning(f'{str(e)}，返回前 {e.page} 页的 {len(results)} 条结果')
         except requests.exceptions.RequestException as e:
-            logging.error(f'百度搜索请求错误: {str(e)}')
+            logger.error(f'百度搜索请求错误: {str(e)}')
             raise
         except Exception as e:
-            logging.error(f'百度搜索爬取错误: {str(e)}')
+            logger.error(f'百度搜索爬取错误: {str(e)}')
             raise
         
-        logging.info(f'百度搜索完成，共获取 {len(results)} 条有效结果')
-        return results
+        logger.info(f'百度搜索完成，共获取 {len(results)} 条有效结果')
+        RESULTS_TOTAL.inc(len(results))
+    
+    def _search_sequential(self, keywords, encoded_keywords, pages, results, unique_urls, known_urls, cancelled):
+        """逐页顺序抓取，请求节奏由限速器控制"""
+        for page in range(pages):
+            if cancelled.is_set():
+                logger.info(f'百度搜索已取消，不再爬取第 {page+1} 页及之后的页面')
+                return
+            page_items = self._get_page(keywords, encoded_keywords, page, cancelled=cancelled)
+            
+            start = len(results)
+            stop = self._merge_page(page, page_items, results, unique_urls, known_urls)
+            yield page, results[start:]
+            if stop:
+                break
+    
+    def _search_concurrent(self, keywords, encoded_keywords, pages, concurrency, results, unique_urls, known_urls,
+                           cancelled):
+        """
+        线程池并发抓取
+        
+        所有页面共享同一个限速器，请求发起节奏与顺序模式相同，
+        但各页的网络等待可以重叠。结果按页序合并，保证顺序和去重
+        与顺序模式一致；某页结果不足10条或下载失败时丢弃其后各页的结果。
+        """
+        workers = min(concurrency, pages)
+        
+        # 连接池大小至少要容纳所有并发请求；已足够时保留现有的长连接
+        if workers > self.pool_maxsize:
+            self._mount_adapter(workers)
+        
+        # 同时在途的页面较多时解析会成为CPU瓶颈，改为在进程池中解析
+        parse = self._parse_page_in_process if pages >= self.PROCESS_PARSE_MIN_PAGES else None
+        
+        def fetch_and_parse(page):
+            if cancelled.is_set():
+                raise PageFetchError(page, '搜索已结束', cancelled=True)
+            return self._get_page(keywords, encoded_keywords, page, parse, cancelled)
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='baidu-page') as executor:
+            futures = [executor.submit(fetch_and_parse, page) for page in range(pages)]
+            try:
+                for page, future in enumerate(futures):
+                    page_items = future.result()
+                    start = len(results)
+                    stop = self._merge_page(page, page_items, results, unique_urls, known_urls)
+                    yield page, results[start:]
+                    if stop:
+                        break
+            finally:
+                cancelled.set()
+                for future in futures:
+                    future.cancel()
 
     def close(self):
         """关闭会话"""
         self.session.close()
-        logging.info('百度爬虫会话已关闭')
+        logger.debug('百度爬虫会话已关闭')
 
 if __name__ == '__main__':
     # 测试代码
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量关键词搜索
+
+一次提交一组关键词，在有界的工作线程池中并发执行百度搜索（每个关键词从爬虫
+会话池借出一个爬虫），按规范化URL跨关键词去重合并结果：同一篇文章被多个关键词
+搜到时只保留一条，并记录搜到它的全部关键词（按提交顺序）。合并后的结果在一个
+事务中写入数据仓库，每篇文章的关键词列即搜到它的全部关键词。
+
+用法:
+    python -m utils.batch_search 人工智能 芯片 新能源汽车 --pages 2 --workers 4
+    python -m utils.batch_search --file keywords.txt --no-save --output results.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils import metrics, schema
+from utils.db import ConnectionPool
+from utils.log_config import setup_logging
+from utils.spider_pool import SpiderPool
+from utils.warehouse import KEYWORD_SEPARATOR, normalize_url, save_items
+
+logger = logging.getLogger(__name__)
+
+# 同时搜索的关键词数和一次批量搜索最多的关键词数
+BATCH_WORKERS = 4
+MAX_BATCH_KEYWORDS = 100
+
+# 提交的关键词之间的分隔符：换行、英文或中文逗号
+_KEYWORD_SPLIT = re.compile(r'[\n\r,，]+')
+
+KEYWORD_SECONDS = metrics.histogram('batch_search_keyword_seconds', '批量搜索中单个关键词的搜索耗时（秒）', ['outcome'],
+                                    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120))
+
+
+def parse_keywords(values):
+    """
+    把提交的关键词拆分为去重后的关键词列表
+
+    参数:
+        values: 字符串列表，每个字符串可以包含多个用换行或逗号分隔的关键词
+
+    返回:
+        list: 按提交顺序去重后的关键词
+
+    异常:
+        ValueError: 没有关键词或关键词数超过 MAX_BATCH_KEYWORDS
+    """
+    keywords = []
+    for value in values:
+        for keyword in _KEYWORD_SPLIT.split(value or ''):
+            keyword = keyword.strip()
+            if keyword and keyword not in keywords:
+                keywords.append(keyword)
+    if not keywords:
+        raise ValueError('搜索关键词不能为空')
+    if len(keywords) > MAX_BATCH_KEYWORDS:
+        raise ValueError(f'一次最多搜索 {MAX_BATCH_KEYWORDS} 个关键词，提交了 {len(keywords)} 个')
+    return keywords
+
+
+def _search_keyword(spider_pool, keyword, pages, concurrency, stop):
+    """
+    搜索一个关键词，返回 (报告, 结果列表)；搜索失败时记录错误并返回空结果
+
+    每个关键词使用自己的停止事件：爬虫并发翻页结束时会设置传入的事件，不能在关键词之间共用。
+    """
+    started = time.monotonic()
+    results = []
+    error = None
+    try:
+        if not stop.is_set():
+            with spider_pool.spider() as spider:
+                for _, page_results in spider.iter_search(keyword, pages=pages, concurrency=concurrency,
+                                                          cancelled=stop):
+                    results.extend(page_results)
+                error = spider.last_error
+    except Exception as e:
+        error = str(e)
+        logger.error(f'批量搜索关键词 {keyword} 失败: {error}')
+    seconds = time.monotonic() - started
+    KEYWORD_SECONDS.labels('error' if error else 'ok').observe(seconds)
+    return {'keyword': keyword, 'results': len(results), 'seconds': round(seconds, 3), 'error': error}, results
+
+
+def iter_search(spider_pool, keywords, pages=1, workers=BATCH_WORKERS, concurrency=1, executor=None):
+    """
+    并发搜索一组关键词的生成器，每完成一个关键词立即产出它的报告和结果
+
+    参数:
+        spider_pool: 爬虫会话池（utils.spider_pool.SpiderPool）
+        keywords: 关键词列表
+        pages: 每个关键词爬取的页数
+        workers: 同时搜索的关键词数上限（传入 executor 时由其线程数决定，忽略此参数）
+        concurrency: 每个关键词并发抓取的页数上限
+        executor: 可选的共享线程池（如Web应用中所有批量搜索请求共用的有界线程池），
+                  不传时为本次搜索创建线程池，结束后关闭
+
+    产出:
+        tuple: (报告, 结果列表)，按完成顺序；报告包含 keyword, results（条数）, seconds, error
+
+    提前关闭生成器（例如客户端断开连接）时取消尚未开始的关键词，进行中的搜索停止翻页。
+    """
+    stops = [threading.Event() for _ in keywords]
+    owned = executor is None
+    if owned:
+        executor = ThreadPoolExecutor(max_workers=max(1, min(workers, len(keywords))), thread_name_prefix='batch-search')
+    futures = []
+    try:
+        for keyword, stop in zip(keywords, stops):
+            futures.append(executor.submit(_search_keyword, spider_pool, keyword, pages, concurrency, stop))
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        for stop in stops:
+            stop.set()
+        # 共享的线程池不能关闭，只取消本次搜索中尚未开始的关键词
+        for future in futures:
+            future.cancel()
+        if owned:
+            executor.shutdown(wait=False)
+
+
+def merge_results(keyword_results):
+    """
+    按规范化URL跨关键词去重合并搜索结果
+
+    参数:
+        keyword_results: (关键词, 结果列表) 的列表，按提交顺序
+
+    返回:
+        list: 合并后的结果，按关键词顺序和结果在各自搜索中的排名排列；每条结果
+              多一个 keywords 字段，列出搜到它的全部关键词
+    """
+    merged = {}
+    for keyword, results in keyword_results:
+        for item in results:
+            url_norm = normalize_url(item['url'])
+            entry = merged.get(url_norm)
+            if entry is None:
+                merged[url_norm] = dict(item, keywords=[keyword])
+            elif keyword not in entry['keywords']:
+                entry['keywords'].append(keyword)
+    return list(merged.values())
+
+
+def search(spider_pool, keywords, pages=1, workers=BATCH_WORKERS, concurrency=1, progress=None):
+    """
+    并发搜索一组关键词并合并结果
+
+    参数:
+        progress: 可选的回调，每完成一个关键词调用一次 progress(已完成数, 总数, 报告)
+        其余参数与 iter_search 相同
+
+    返回:
+        tuple: (合并后的结果列表, 按提交顺序排列的各关键词报告列表)
+    """
+    reports = {}
+    results = {}
+    for report, keyword_results in iter_search(spider_pool, keywords, pages, workers, concurrency):
+        reports[report['keyword']] = report
+        results[report['keyword']] = keyword_results
+        if progress:
+            progress(len(reports), len(keywords), report)
+    return merge_results((keyword, results[keyword]) for keyword in keywords), [reports[keyword] for keyword in keywords]
+
+
+def save_results(conn, results):
+    """
+    把合并后的结果写入数据仓库，每条结果的关键词为搜到它的全部关键词
+
+    参数:
+        conn: 数据库连接，事务由调用方提交（全部结果在同一个事务中写入）
+        results: merge_results 返回的结果列表
+
+    返回:
+        tuple: (新插入的条数, 合并到已有记录的条数)
+    """
+    groups = {}
+    for item in results:
+        groups.setdefault(KEYWORD_SEPARATOR.join(item['keywords']), []).append(item)
+    inserted = merged = 0
+    for keywords, items in groups.items():
+        group_inserted, group_merged = save_items(conn, items, keywords)
+        inserted += group_inserted
+        merged += group_merged
+    return inserted, merged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='批量关键词搜索')
+    parser.add_argument('--db', default='data.db', help='数据库文件路径')
+    parser.add_argument('keywords', nargs='*', help='搜索关键词，也可以用逗号分隔')
+    parser.add_argument('--file', help='关键词文件，每行一个关键词')
+    parser.add_argument('--pages', type=int, default=1, help='每个关键词爬取的页数')
+    parser.add_argument('--workers', type=int, default=BATCH_WORKERS, help='同时搜索的关键词数')
+    parser.add_argument('--concurrency', type=int, default=1, help='每个关键词并发抓取的页数')
+    parser.add_argument('--no-save', action='store_true', help='只搜索合并，不写入数据仓库')
+    parser.add_argument('--output', help='把合并后的结果写入JSON文件')
+    args = parser.parse_args(argv)
+
+    values = list(args.keywords)
+    if args.file:
+        with open(args.file, encoding='utf-8') as f:
+            values.append(f.read())
+    try:
+        keywords = parse_keywords(values)
+    except ValueError as e:
+        parser.error(str(e))
+
+    def report_progress(done, total, report):
+        status = f"失败: {report['error']}" if report['error'] else '完成'
+        print(f"[{done}/{total}] {report['keyword']}: {report['results']} 条，用时 {report['seconds']:.1f}s，{status}",
+              flush=True)
+
+    spider_pool = SpiderPool(max_size=args.workers)
+    started = time.monotonic()
+    try:
+        results, reports = search(spider_pool, keywords, args.pages, args.workers, args.concurrency, report_progress)
+    finally:
+        spider_pool.close()
+    total = sum(report['results'] for report in reports)
+    print(f'共 {len(keywords)} 个关键词，{total} 条结果，跨关键词去重后 {len(results)} 条，'
+          f'用时 {time.monotonic() - started:.1f}s')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'keywords': reports, 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f'已写入合并后的结果: {args.output}')
+    if not args.no_save:
+        db = ConnectionPool(args.db)
+        with db.connection() as conn:
+            # 数据库可能还没有被Web应用打开过，先建表和迁移（URL去重、相似报道、趋势汇总、归档等）
+            schema.init_schema(conn)
+            inserted, merged = save_results(conn, results)
+        db.close_all()
+        print(f'已保存到数据仓库: 新增 {inserted} 条，{merged} 条已存在的数据已合并关键词')
+    return 1 if all(report['error'] for report in reports) else 0
+
+
+if __name__ == '__main__':
+    setup_logging(os.environ.get('LOG_PROFILE', 'development'), os.environ.get('LOG_LEVELS', ''))
+    sys.exit(main())
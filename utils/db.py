@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite连接池模块
+
+连接池中保留有限条长连接，使用时借出、用完归还，避免每个请求反复打开、关闭数据库；
+连接统一开启WAL日志模式，读写可以并发进行，并设置繁忙等待时间，减少“database is locked”错误。
+
+连接不绑定线程：按请求新建线程的服务器（如 werkzeug 的多线程开发服务器）或每次调用
+新建线程池的代码不会让连接数随线程数增长。连接都被借出时等待归还，等待超时后临时
+新建一条连接，用完即关闭。
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# 连接建立时设置的PRAGMA，可通过 ConnectionPool(pragmas=...) 覆盖
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',      # WAL模式下NORMAL已能保证数据库不损坏
+    'cache_size': -20000,         # 负数表示KB，即每条连接约20MB页缓存
+    'mmap_size': 268435456,       # 256MB内存映射读取
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,         # 遇到写锁时最多等待5秒
+}
+
+
+# SQL语句执行耗时（不含逐行读取查询结果的时间），按语句类型分组
+QUERY_SECONDS = metrics.histogram('sqlite_query_seconds', 'SQLite语句执行耗时（秒）', ['operation'])
+
+# 作为标签的语句类型，其余语句归为 OTHER，避免标签取值无限增长
+QUERY_OPERATIONS = frozenset(['SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'CREATE', 'DROP', 'ALTER',
+                              'PRAGMA', 'WITH', 'BEGIN', 'COMMIT', 'ROLLBACK', 'VACUUM', 'ANALYZE'])
+
+
+# SQL文本 -> 对应语句类型的直方图，避免每次执行都重新解析语句类型
+_query_histograms = {}
+_QUERY_HISTOGRAM_CACHE_SIZE = 2048
+
+
+def _operation(sql):
+    words = sql.lstrip(' \t\r\n(').split(None, 1)
+    operation = words[0].upper() if words else ''
+    return operation if operation in QUERY_OPERATIONS else 'OTHER'
+
+
+def _query_histogram(sql):
+    histogram = _query_histograms.get(sql)
+    if histogram is None:
+        if len(_query_histograms) >= _QUERY_HISTOGRAM_CACHE_SIZE:
+            _query_histograms.clear()
+        histogram = _query_histograms[sql] = QUERY_SECONDS.labels(_operation(sql))
+    return histogram
+
+
+class TimedCursor(sqlite3.Cursor):
+    """记录每条语句执行耗时的游标"""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _query_histogram(sql).observe(time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _query_histogram(sql).observe(time.perf_counter() - start)
+
+
+class TimedConnection(sqlite3.Connection):
+    """默认使用 TimedCursor 的连接，连接上的 execute/executemany 也会计时"""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class ConnectionPool:
+    """借出/归还式的有界SQLite连接池"""
+
+    def __init__(self, db_path, pragmas=None, cached_statements=256, max_size=16, acquire_timeout=10):
+        """
+        参数:
+            db_path: SQLite数据库文件路径
+            pragmas: 额外的PRAGMA设置，会覆盖 DEFAULT_PRAGMAS 中的同名项
+            cached_statements: 每条连接缓存的预编译语句数量
+            max_size: 池中最多保留的连接数，通常与WSGI服务器的工作线程数相当
+            acquire_timeout: 所有连接都被借出时最多等待的秒数，超时后临时创建额外的连接
+        """
+        self.db_path = db_path
+        self.pragmas = dict(DEFAULT_PRAGMAS, **(pragmas or {}))
+        self.cached_statements = cached_statements
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self._local = threading.local()
+        self._idle = []
+        self._overflow = set()
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def _create(self):
+        # 连接会在线程之间借出归还，同一时刻只被一个线程使用
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.pragmas['busy_timeout'] / 1000,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,
+            factory=TimedConnection,
+        )
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        logger.debug(f'为线程 {threading.current_thread().name} 创建数据库连接')
+        return conn
+
+    def _acquire(self):
+        """借出一条空闲连接；池未满时新建，池满时等待归还，超时后临时新建一条额外的连接"""
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._condition:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f'数据库连接池的 {self.max_size} 条连接都在使用中，临时创建额外的连接')
+                    conn = self._create()
+                    self._overflow.add(conn)
+                    return conn
+                self._condition.wait(remaining)
+        try:
+            return self._create()
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def _release(self, conn):
+        """归还连接；额外创建的连接和连接池关闭后归还的连接直接关闭"""
+        with self._condition:
+            if conn in self._overflow:
+                self._overflow.discard(conn)
+            elif self._closed:
+                self._size -= 1
+            else:
+                self._idle.append(conn)
+                self._condition.notify()
+                return
+        conn.close()
+
+    def open_readonly(self):
+        """
+        打开一条不属于连接池的只读连接，由调用方负责关闭
+
+        用于导出等长时间逐行读取的场景，不占用当前线程的池内连接和事务。
+        """
+        uri = 'file:' + urllib.parse.quote(os.path.abspath(self.db_path)) + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, timeout=self.pragmas['busy_timeout'] / 1000,
+                               check_same_thread=False, factory=TimedConnection)
+        for name, value in self.pragmas.items():
+            # 只读连接不能修改日志模式
+            if name != 'journal_mode':
+                conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """
+        借出一条连接，退出时提交事务并归还，出现异常时回滚
+
+        可以嵌套使用：同一线程内嵌套的调用复用最外层借出的连接，只有最外层退出时才提交和归还。
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        self._local.depth = 1
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._local.depth = 0
+            self._release(conn)
+
+    def stats(self):
+        """返回池的大小和空闲连接数"""
+        with self._condition:
+            return {'size': self._size, 'idle': len(self._idle), 'max_size': self.max_size}
+
+    def close_all(self):
+        """关闭连接池中的所有空闲连接，借出中的连接在归还时关闭"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for conn in idle:
+            conn.close()
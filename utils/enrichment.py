@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+落地页内容补全模块
+
+数据仓库中的 url 是百度跳转链接，content 只有搜索结果摘要。本模块把已保存的
+记录流式地逐批读出：先解析跳转链接得到落地页地址，再并发下载落地页，提取正文和
+发布时间，压缩后写入 page_content 附表。
+
+- 按 data_warehouse.id 顺序分批读取，同时在途的记录数有上限，内存占用与数据量无关；
+  只处理热数据，已移入归档分区的记录（见 utils.warehouse_archive）不补全，补全过程中
+  被归档的记录不写入结果
+- 已完成的记录不会重复处理，进程中断后重新运行即从未完成的记录继续；失败的记录
+  在之后的运行中重试，累计失败 max_attempts 次后不再重试
+- 每个域名同时进行的请求数有上限，百度跳转链接的解析还经过爬虫共享的限速器
+
+用法:
+    python -m utils.enrichment run --workers 16 --per-domain 2
+    python -m utils.enrichment status
+    python -m utils.enrichment show 123
+"""
+
+import argparse
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import urllib.parse
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+
+from utils import metrics, schema, warehouse_archive
+from utils.article_extractor import extract_article, find_meta_redirect
+from utils.db import ConnectionPool
+from utils.log_config import setup_logging
+from utils.rate_limiter import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# 落地页下载限制：超时（秒）、最大字节数和允许的内容类型
+FETCH_TIMEOUT = 15
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+# 正文压缩级别（zlib）
+COMPRESS_LEVEL = 6
+
+# 解析百度跳转链接时使用的请求间隔范围，见 utils.rate_limiter.get_rate_limiter
+RESOLVE_DELAY_RANGE = (0.2, 1)
+
+HEADERS = {
+    'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'accept-language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36 Edg/142.0.0.0',
+}
+
+ENRICHED_TOTAL = metrics.counter('enrichment_pages_total', '补全处理的记录数，按结果分组', ['status'])
+STAGE_SECONDS = metrics.histogram('enrichment_stage_seconds', '补全各阶段单条记录的耗时（秒）', ['stage'])
+
+
+def init_table(conn):
+    """创建落地页内容附表和读取待补全记录时用到的已归档记录索引（如果不存在）"""
+    warehouse_archive.init_table(conn)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS page_content (
+            warehouse_id INTEGER PRIMARY KEY,
+            status TEXT NOT NULL,
+            final_url TEXT,
+            domain TEXT,
+            http_status INTEGER,
+            title TEXT,
+            published_at TEXT,
+            text_zlib BLOB,
+            text_length INTEGER,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            updated_at REAL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_page_content_status ON page_content (status)')
+
+
+def is_redirect_link(url):
+    """是否为百度搜索结果的跳转链接（/link?url=...）"""
+    parsed = urllib.parse.urlparse(url)
+    return parsed.path == '/link' and 'url=' in parsed.query
+
+
+def domain_of(url):
+    return urllib.parse.urlparse(url).netloc.lower()
+
+
+def compress_text(text):
+    return zlib.compress(text.encode('utf-8'), COMPRESS_LEVEL)
+
+
+def decompress_text(data):
+    return zlib.decompress(data).decode('utf-8') if data is not None else None
+
+
+def load_content(conn, warehouse_id):
+    """
+    读取一条记录补全后的落地页内容
+
+    返回:
+        dict 或 None: page_content 中的字段，text_zlib 解压为 text；没有补全记录时返回None
+    """
+    row = conn.execute('SELECT * FROM page_content WHERE warehouse_id = ?', (warehouse_id,)).fetchone()
+    if row is None:
+        return None
+    content = dict(row)
+    content['text'] = decompress_text(content.pop('text_zlib'))
+    return content
+
+
+class FetchFailed(Exception):
+    """落地页无法获取；permanent 为True表示重试也不会成功（4xx、非HTML内容等）"""
+
+    def __init__(self, message, http_status=None, permanent=False):
+        super().__init__(message)
+        self.http_status = http_status
+        self.permanent = permanent
+
+
+class EnrichmentPipeline:
+    """落地页内容补全流水线"""
+
+    def __init__(self, db, workers=16, per_domain=2, batch_size=200, max_pending=None, max_attempts=3,
+                 write_batch=50, resolve_limiter=None):
+        """
+        参数:
+            db: 数据库连接池（utils.db.ConnectionPool）
+            workers: 同时进行的网络请求数上限
+            per_domain: 每个域名同时进行的请求数上限
+            batch_size: 每次从数据库读取的待处理记录数
+            max_pending: 已读出但尚未写回的记录数上限，默认是 workers 的4倍
+            max_attempts: 一条记录累计失败多少次后不再重试
+            write_batch: 累计多少条结果提交一次
+            resolve_limiter: 解析跳转链接使用的限速器，默认使用跳转链接所在站点共享的限速器
+        """
+        self.db = db
+        self.workers = workers
+        self.per_domain = per_domain
+        self.batch_size = batch_size
+        self.max_pending = max_pending or workers * 4
+        self.max_attempts = max_attempts
+        self.write_batch = write_batch
+        self.resolve_limiter = resolve_limiter
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.per_domain)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update(HEADERS)
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def iter_pending(self, limit=None):
+        """按id顺序分批读出待补全的记录（未处理过，或失败次数未达上限）"""
+        last_id = 0
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = self.batch_size if remaining is None else min(self.batch_size, remaining)
+            with self.db.connection() as conn:
+                rows = conn.execute('''
+                    SELECT d.id, d.url FROM data_warehouse d
+                    LEFT JOIN page_content p ON p.warehouse_id = d.id
+                    WHERE d.id > ? AND (p.warehouse_id IS NULL OR (p.status = 'failed' AND p.attempts < ?))
+                      AND NOT EXISTS (SELECT 1 FROM data_warehouse_archived a WHERE a.id = d.id)
+                    ORDER BY d.id LIMIT ?
+                ''', (last_id, self.max_attempts, size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row['id'], row['url']
+            last_id = rows[-1]['id']
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def resolve(self, url):
+        """解析百度跳转链接，返回落地页地址"""
+        limiter = self.resolve_limiter or get_rate_limiter(domain_of(url), RESOLVE_DELAY_RANGE)
+        limiter.acquire()
+        start = time.perf_counter()
+        try:
+            response = self._session().get(url, allow_redirects=False, timeout=FETCH_TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            limiter.record('error', time.perf_counter() - start)
+            raise FetchFailed(f'跳转链接请求失败: {str(e)}')
+        limiter.record('throttled' if response.status_code == 429 else
+                       'error' if response.status_code >= 500 else 'ok', time.perf_counter() - start)
+        STAGE_SECONDS.labels('resolve').observe(time.perf_counter() - start)
+
+        target = None
+        if response.is_redirect:
+            target = response.headers.get('Location')
+        elif response.status_code == 200:
+            target = find_meta_redirect(response.text)
+        if not target:
+            raise FetchFailed(f'跳转链接没有目标地址，状态码 {response.status_code}', response.status_code,
+                              permanent=400 <= response.status_code < 500 and response.status_code != 429)
+        return urllib.parse.urljoin(url, target)
+
+    def fetch(self, url):
+        """
+        下载落地页并提取正文
+
+        返回:
+            dict: final_url, http_status, title, text, published_at
+
+        异常:
+            FetchFailed: 网络错误、非200状态码、非HTML内容或页面过大
+        """
+        start = time.perf_counter()
+        try:
+            with self._session().get(url, timeout=FETCH_TIMEOUT, stream=True) as response:
+                if response.status_code != 200:
+                    raise FetchFailed(f'HTTP {response.status_code}', response.status_code,
+                                      permanent=400 <= response.status_code < 500 and response.status_code != 429)
+                content_type = response.headers.get('Content-Type', '').lower()
+                if content_type and not content_type.startswith(HTML_CONTENT_TYPES):
+                    raise FetchFailed(f'不是HTML页面: {content_type}', 200, permanent=True)
+                body = bytearray()
+                for chunk in response.iter_content(64 * 1024):
+                    body.extend(chunk)
+                    if len(body) > MAX_PAGE_BYTES:
+                        raise FetchFailed(f'页面超过 {MAX_PAGE_BYTES} 字节', 200, permanent=True)
+                final_url = response.url
+                encoding = response.encoding if 'charset' in content_type else None
+        except requests.exceptions.RequestException as e:
+            raise FetchFailed(f'落地页请求失败: {str(e)}')
+        finally:
+            STAGE_SECONDS.labels('fetch').observe(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        html = self._decode(bytes(body), encoding)
+        article = extract_article(html, final_url)
+        STAGE_SECONDS.labels('extract').observe(time.perf_counter() - start)
+        return {
+            'final_url': article['canonical_url'] or final_url,
+            'http_status': 200,
+            'title': article['title'],
+            'text': article['text'],
+            'published_at': article['published_at'],
+        }
+
+    @staticmethod
+    def _decode(body, encoding):
+        """按响应头或页面 meta 中声明的编码解码，都没有时按UTF-8、GB18030依次尝试"""
+        if encoding is None:
+            match = re.search(rb'charset=["\']?([A-Za-z0-9_-]+)', body[:2048])
+            if match:
+                encoding = match.group(1).decode('ascii')
+        candidates = [encoding] if encoding else []
+        candidates += ['utf-8', 'gb18030']
+        for candidate in candidates:
+            try:
+                return body.decode(candidate)
+            except (LookupError, UnicodeDecodeError):
+                continue
+        return body.decode('utf-8', 'replace')
+
+    def process(self, warehouse_id, url, stage):
+        """
+        执行一条记录的一个阶段
+
+        返回:
+            dict: 'resolve' 阶段成功时包含落地页地址 resolved，需要再执行 'fetch' 阶段；
+                  其他情况为写入附表的结果
+        """
+        try:
+            if stage == 'resolve':
+                return {'warehouse_id': warehouse_id, 'resolved': self.resolve(url)}
+            result = self.fetch(url)
+            result.update(status='done', domain=domain_of(result['final_url']), error=None)
+        except FetchFailed as e:
+            result = {'status': 'skipped' if e.permanent else 'failed', 'http_status': e.http_status,
+                      'error': str(e)}
+        except Exception as e:
+            logger.exception(f'补全记录 {warehouse_id} 出错: {str(e)}')
+            result = {'status': 'failed', 'error': str(e)}
+        result['warehouse_id'] = warehouse_id
+        return result
+
+    def write(self, results):
+        """把一批结果写入附表；失败的记录累加尝试次数，补全过程中已被归档的记录跳过"""
+        with self.db.connection() as conn:
+            conn.executemany('''
+                INSERT INTO page_content (warehouse_id, status, final_url, domain, http_status, title,
+                                          published_at, text_zlib, text_length, attempts, error, updated_at)
+                SELECT :warehouse_id, :status, :final_url, :domain, :http_status, :title,
+                       :published_at, :text_zlib, :text_length, 1, :error, :updated_at
+                WHERE NOT EXISTS (SELECT 1 FROM data_warehouse_archived WHERE id = :warehouse_id)
+                ON CONFLICT (warehouse_id) DO UPDATE SET
+                    status = excluded.status, final_url = excluded.final_url, domain = excluded.domain,
+                    http_status = excluded.http_status, title = excluded.title,
+                    published_at = excluded.published_at, text_zlib = excluded.text_zlib,
+                    text_length = excluded.text_length, attempts = page_content.attempts + 1,
+                    error = excluded.error, updated_at = excluded.updated_at
+            ''', [self._row(result) for result in results])
+        for result in results:
+            ENRICHED_TOTAL.labels(result['status']).inc()
+
+    @staticmethod
+    def _row(result):
+        text = result.get('text')
+        return {
+            'warehouse_id': result['warehouse_id'],
+            'status': result['status'],
+            'final_url': result.get('final_url'),
+            'domain': result.get('domain'),
+            'http_status': result.get('http_status'),
+            'title': result.get('title'),
+            'published_at': result.get('published_at'),
+            'text_zlib': compress_text(text) if text is not None else None,
+            'text_length': len(text) if text is not None else None,
+            'error': result.get('error'),
+            'updated_at': time.time(),
+        }
+
+    def run(self, limit=None, progress=None):
+        """
+        处理待补全的记录，直到处理完或调用 stop()
+
+        跳转链接先按跳转链接的域名排队解析，得到落地页地址后再按落地页的域名排队下载。
+        某个域名的在途请求达到 per_domain 时，其余任务留在队列中，工作线程先处理
+        其他域名的任务。
+
+        参数:
+            limit: 本次最多处理的记录数
+            progress: 可选的回调，每提交一批结果后以统计字典调用
+
+        返回:
+            dict: 各结果状态的记录数
+        """
+        stats = {'done': 0, 'failed': 0, 'skipped': 0}
+        queues = {}          # 域名 -> 等待中的 (warehouse_id, url, 阶段)
+        in_flight = {}       # 域名 -> 在途请求数
+        futures = {}         # future -> 域名
+        queued = 0
+        buffer = []
+        rows = self.iter_pending(limit)
+        exhausted = False
+
+        def dispatch(executor):
+            nonlocal queued
+            for domain in list(queues):
+                queue = queues[domain]
+                while queue and len(futures) < self.workers and in_flight.get(domain, 0) < self.per_domain:
+                    task = queue.popleft()
+                    queued -= 1
+                    in_flight[domain] = in_flight.get(domain, 0) + 1
+                    futures[executor.submit(self.process, *task)] = domain
+                if not queue:
+                    del queues[domain]
+                if len(futures) >= self.workers:
+                    break
+
+        def enqueue(warehouse_id, url, stage):
+            nonlocal queued
+            queues.setdefault(domain_of(url), deque()).append((warehouse_id, url, stage))
+            queued += 1
+
+        def flush():
+            if buffer:
+                self.write(buffer)
+                for result in buffer:
+                    stats[result['status']] += 1
+                buffer.clear()
+                if progress:
+                    progress(dict(stats))
+
+        logger.info(f'落地页补全开始，并发 {self.workers}，每个域名 {self.per_domain}')
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='enrich') as executor:
+            while not self._stopping.is_set():
+                # 只在流水线中的记录数低于上限时读取新记录
+                while not exhausted and queued + len(futures) < self.max_pending:
+                    row = next(rows, None)
+                    if row is None:
+                        exhausted = True
+                        break
+                    warehouse_id, url = row
+                    enqueue(warehouse_id, url, 'resolve' if is_redirect_link(url) else 'fetch')
+                dispatch(executor)
+                if not futures:
+                    break
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    domain = futures.pop(future)
+                    in_flight[domain] -= 1
+                    if not in_flight[domain]:
+                        del in_flight[domain]
+                    result = future.result()
+                    if 'resolved' in result:
+                        enqueue(result['warehouse_id'], result['resolved'], 'fetch')
+                    else:
+                        buffer.append(result)
+                if len(buffer) >= self.write_batch:
+                    flush()
+
+            # 停止时等待在途的请求完成并写入，未开始的记录留到下次运行
+            for future in futures:
+                result = future.result()
+                if 'resolved' not in result:
+                    buffer.append(result)
+            flush()
+        self.close()
+        logger.info(f'落地页补全结束: 完成 {stats["done"]} 条，失败 {stats["failed"]} 条，跳过 {stats["skipped"]} 条')
+        return stats
+
+    def stop(self):
+        self._stopping.set()
+
+    def close(self):
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+        self._local = threading.local()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='落地页内容补全')
+    parser.add_argument('--db', default='data.db', help='数据库文件路径')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run = sub.add_parser('run', help='补全未处理的记录，中断后再次运行会从未完成的记录继续')
+    run.add_argument('--workers', type=int, default=16, help='同时进行的网络请求数')
+    run.add_argument('--per-domain', type=int, default=2, help='每个域名同时进行的请求数')
+    run.add_argument('--limit', type=int, help='本次最多处理的记录数')
+    run.add_argument('--max-attempts', type=int, default=3, help='失败的记录最多尝试的次数')
+
+    sub.add_parser('status', help='统计补全进度')
+
+    show = sub.add_parser('show', help='显示一条记录补全后的内容')
+    show.add_argument('id', type=int, help='data_warehouse 中的记录id')
+
+    args = parser.parse_args(argv)
+    db = ConnectionPool(args.db)
+    with db.connection() as conn:
+        schema.init_schema(conn)
+
+    if args.command == 'run':
+        pipeline = EnrichmentPipeline(db, workers=args.workers, per_domain=args.per_domain,
+                                      max_attempts=args.max_attempts)
+        try:
+            stats = pipeline.run(limit=args.limit, progress=lambda stats: print(
+                f"已完成 {stats['done']}，失败 {stats['failed']}，跳过 {stats['skipped']}", end='\r'))
+        except KeyboardInterrupt:
+            pipeline.stop()
+            print('\n已中断，再次运行将从未完成的记录继续')
+            return 130
+        print(f"\n补全完成: 完成 {stats['done']} 条，失败 {stats['failed']} 条，跳过 {stats['skipped']} 条")
+    elif args.command == 'status':
+        with db.connection() as conn:
+            total = conn.execute('SELECT COUNT(*) FROM data_warehouse').fetchone()[0]
+            rows = conn.execute('''
+                SELECT status, COUNT(*) AS n, SUM(text_length) AS chars, SUM(LENGTH(text_zlib)) AS stored
+                FROM page_content GROUP BY status
+            ''').fetchall()
+        print(f'数据仓库记录 {total} 条，未处理 {total - sum(row["n"] for row in rows)} 条')
+        for row in rows:
+            print(f"{row['status']}\t{row['n']} 条\t正文 {row['chars'] or 0} 字\t压缩后 {row['stored'] or 0} 字节")
+    elif args.command == 'show':
+        with db.connection() as conn:
+            content = load_content(conn, args.id)
+        if content is None:
+            print(f'记录 {args.id} 尚未补全')
+            return 1
+        for key in ('status', 'final_url', 'title', 'published_at', 'error'):
+            print(f'{key}: {content[key]}')
+        print()
+        print(content['text'] or '')
+    return 0
+
+
+if __name__ == '__main__':
+    setup_logging(os.environ.get('LOG_PROFILE', 'development'), os.environ.get('LOG_LEVELS', ''))
+    sys.exit(main())
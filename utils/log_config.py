@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志配置模块
+
+所有日志记录先通过 QueueHandler 放入内存队列，由 QueueListener 的后台线程
+统一写入文件和控制台，请求线程和爬虫线程不会因为磁盘或控制台I/O而阻塞。
+日志文件按大小轮转；爬虫相关模块的日志另外写入 spider.log。
+
+提供两套配置:
+    development: 根日志级别DEBUG，控制台输出DEBUG
+    production:  根日志级别INFO，控制台只输出WARNING及以上
+
+还可以通过 "模块名=级别" 的形式单独设置各模块的级别，例如
+    LOG_LEVELS="utils.baidu_spider=DEBUG,utils.db=WARNING"
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(threadName)s - %(levelname)s - %(message)s'
+
+# 日志文件轮转：单个文件大小上限和保留的历史文件数
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+# 日志配置方案：根日志级别、控制台级别和各模块的级别
+PROFILES = {
+    'development': {
+        'level': 'DEBUG',
+        'console': 'DEBUG',
+        'loggers': {
+            'werkzeug': 'INFO',
+            'urllib3': 'INFO',
+        },
+    },
+    'production': {
+        'level': 'INFO',
+        'console': 'WARNING',
+        'loggers': {
+            'werkzeug': 'WARNING',
+            'urllib3': 'WARNING',
+        },
+    },
+}
+
+# 这些模块的日志同时写入 spider.log
+SPIDER_LOGGERS = ('utils.baidu_spider', 'utils.result_parser', 'utils.spider_pool', 'utils.monitor', 'utils.enrichment')
+
+_listener = None
+_lock = threading.Lock()
+
+
+class _NamePrefixFilter(logging.Filter):
+    """只放行指定模块（及其子模块）的日志"""
+
+    def __init__(self, prefixes):
+        super().__init__()
+        self.prefixes = tuple(prefixes)
+
+    def filter(self, record):
+        return any(record.name == prefix or record.name.startswith(prefix + '.') for prefix in self.prefixes)
+
+
+def parse_levels(spec):
+    """
+    解析 "模块名=级别,模块名=级别" 形式的日志级别设置
+
+    返回:
+        dict: 模块名 -> 级别名称
+
+    异常:
+        ValueError: 格式不正确或级别名称无效
+    """
+    levels = {}
+    for part in (spec or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, level = part.partition('=')
+        level = level.strip().upper()
+        if not sep or not name.strip() or not isinstance(logging.getLevelName(level), int):
+            raise ValueError(f'无效的日志级别设置: {part}')
+        levels[name.strip()] = level
+    return levels
+
+
+def _rotating_file(path, level):
+    handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8', delay=True
+    )
+    handler.setLevel(level)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return handler
+
+
+def setup_logging(profile='development', levels=None, log_dir='logs', console=True):
+    """
+    配置基于队列的异步日志
+
+    重复调用时会先停止之前的后台写入线程并替换处理器。
+
+    参数:
+        profile: 配置方案名称，见 PROFILES
+        levels: 额外的模块级别设置（dict，或 "模块名=级别,..." 字符串），覆盖配置方案中的同名项
+        log_dir: 日志文件目录
+        console: 是否输出到控制台
+
+    异常:
+        ValueError: 配置方案不存在或级别设置无效
+    """
+    global _listener
+
+    if profile not in PROFILES:
+        raise ValueError(f'未知的日志配置方案: {profile}')
+    config = PROFILES[profile]
+    module_levels = dict(config['loggers'])
+    module_levels.update(parse_levels(levels) if isinstance(levels, str) else (levels or {}))
+
+    os.makedirs(log_dir, exist_ok=True)
+    handlers = [_rotating_file(os.path.join(log_dir, 'app.log'), logging.DEBUG)]
+    spider_handler = _rotating_file(os.path.join(log_dir, 'spider.log'), logging.DEBUG)
+    spider_handler.addFilter(_NamePrefixFilter(SPIDER_LOGGERS))
+    handlers.append(spider_handler)
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(config['console'])
+        console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handlers.append(console_handler)
+
+    with _lock:
+        shutdown_logging()
+
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+        root.setLevel(config['level'])
+        for name, level in module_levels.items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+
+    logging.getLogger(__name__).debug(f'日志配置完成: {profile}，模块级别 {module_levels}')
+    return _listener
+
+
+def shutdown_logging():
+    """停止后台写入线程，写完队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
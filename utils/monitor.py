@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+关键词监控模块
+
+维护一个持久化的关键词监控列表，在独立的后台进程中按设定的时间间隔
+重新搜索每个关键词，只把数据仓库中还没有的URL写入数据仓库。
+
+用法:
+    python -m utils.monitor add 人工智能 --pages 3 --interval 3600
+    python -m utils.monitor list
+    python -m utils.monitor remove 人工智能
+    python -m utils.monitor run --workers 8
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from utils import schema
+from utils.baidu_spider import BaiduSpider
+from utils.db import ConnectionPool
+from utils.log_config import setup_logging
+from utils.warehouse import normalize_url, find_existing, save_items
+
+logger = logging.getLogger(__name__)
+
+
+def init_table(conn):
+    """创建关键词监控列表（如果不存在）"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS watchlist (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            keyword TEXT UNIQUE NOT NULL,
+            pages INTEGER NOT NULL DEFAULT 1,
+            interval_seconds INTEGER NOT NULL DEFAULT 3600,
+            enabled INTEGER NOT NULL DEFAULT 1,
+            next_run_at REAL NOT NULL DEFAULT 0,
+            last_run_at REAL,
+            last_new_count INTEGER,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # 调度器按下次运行时间取到期的关键词
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_watchlist_due ON watchlist (enabled, next_run_at)')
+
+
+def add_keyword(conn, keyword, pages=1, interval_seconds=3600):
+    """添加或更新一个监控关键词，立即进入待运行状态"""
+    conn.execute('''
+        INSERT INTO watchlist (keyword, pages, interval_seconds, enabled, next_run_at)
+        VALUES (?, ?, ?, 1, 0)
+        ON CONFLICT (keyword) DO UPDATE SET
+            pages = excluded.pages, interval_seconds = excluded.interval_seconds, enabled = 1, next_run_at = 0
+    ''', (keyword, pages, interval_seconds))
+
+
+def remove_keyword(conn, keyword):
+    """从监控列表中删除关键词"""
+    conn.execute('DELETE FROM watchlist WHERE keyword = ?', (keyword,))
+
+
+class Monitor:
+    """关键词监控调度器"""
+
+    def __init__(self, db, max_workers=4, batch_size=None, spider_factory=BaiduSpider):
+        """
+        参数:
+            db: 数据库连接池（utils.db.ConnectionPool）
+            max_workers: 同时爬取的关键词数上限
+            batch_size: 每次从数据库领取的到期关键词数，默认是 max_workers 的4倍
+            spider_factory: 创建爬虫实例的函数，每个工作线程复用一个实例
+        """
+        self.db = db
+        self.max_workers = max_workers
+        self.batch_size = batch_size or max_workers * 4
+        self.spider_factory = spider_factory
+        self._local = threading.local()
+        self._spiders = []
+        self._spiders_lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def _spider(self):
+        spider = getattr(self._local, 'spider', None)
+        if spider is None:
+            spider = self.spider_factory()
+            self._local.spider = spider
+            with self._spiders_lock:
+                self._spiders.append(spider)
+        return spider
+
+    def claim_due(self, limit):
+        """
+        领取到期的关键词，并把它们的下次运行时间推迟到一个间隔之后
+
+        用条件更新领取，多个监控进程同时运行时同一关键词不会被重复领取。
+        """
+        now = time.time()
+        claimed = []
+        with self.db.connection() as conn:
+            rows = conn.execute('''
+                SELECT id, keyword, pages, interval_seconds, next_run_at FROM watchlist
+                WHERE enabled = 1 AND next_run_at <= ?
+                ORDER BY next_run_at LIMIT ?
+            ''', (now, limit)).fetchall()
+            for row in rows:
+                cursor = conn.execute(
+                    'UPDATE watchlist SET next_run_at = ? WHERE id = ? AND next_run_at = ?',
+                    (now + row['interval_seconds'], row['id'], row['next_run_at'])
+                )
+                if cursor.rowcount:
+                    claimed.append(dict(row))
+        return claimed
+
+    def run_keyword(self, job):
+        """爬取一个关键词，只保存新的URL"""
+        keyword = job['keyword']
+        started = time.monotonic()
+
+        def known_urls(urls):
+            with self.db.connection() as conn:
+                existing = find_existing(conn, [normalize_url(url) for url in urls])
+            return {url for url in urls if normalize_url(url) in existing}
+
+        try:
+            results = self._spider().search(keyword, pages=job['pages'], known_urls=known_urls)
+            known = known_urls([item['url'] for item in results])
+            new_items = [item for item in results if item['url'] not in known]
+            with self.db.connection() as conn:
+                inserted, _ = save_items(conn, new_items, keyword)
+                conn.execute('UPDATE watchlist SET last_run_at = ?, last_new_count = ?, last_error = NULL WHERE id = ?',
+                             (time.time(), inserted, job['id']))
+            logger.info(f'监控关键词 {keyword} 完成，新增 {inserted} 条，用时 {time.monotonic() - started:.1f}s')
+            return inserted
+        except Exception as e:
+            with self.db.connection() as conn:
+                conn.execute('UPDATE watchlist SET last_run_at = ?, last_error = ? WHERE id = ?',
+                             (time.time(), str(e), job['id']))
+            logger.error(f'监控关键词 {keyword} 失败: {str(e)}')
+            return 0
+
+    def run_forever(self, poll_interval=10):
+        """持续调度到期关键词，直到调用 stop()"""
+        logger.info(f'关键词监控启动，工作线程 {self.max_workers} 个')
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='monitor') as executor:
+            pending = set()
+            while not self._stopping.is_set():
+                # 只在有空闲工作线程时领取新任务，保证内存中的待处理任务数有界
+                free = self.batch_size - len(pending)
+                if free > 0:
+                    for job in self.claim_due(free):
+                        pending.add(executor.submit(self.run_keyword, job))
+
+                if pending:
+                    done, pending = wait(pending, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                else:
+                    self._stopping.wait(poll_interval)
+        self.close()
+        logger.info('关键词监控已停止')
+
+    def run_once(self):
+        """运行一轮当前所有到期的关键词，返回新增的总条数"""
+        total = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='monitor') as executor:
+            while True:
+                jobs = self.claim_due(self.batch_size)
+                if not jobs:
+                    break
+                total += sum(executor.map(self.run_keyword, jobs))
+        self.close()
+        return total
+
+    def stop(self):
+        self._stopping.set()
+
+    def close(self):
+        with self._spiders_lock:
+            spiders, self._spiders = self._spiders, []
+        for spider in spiders:
+            spider.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='关键词监控')
+    parser.add_argument('--db', default='data.db', help='数据库文件路径')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    add = sub.add_parser('add', help='添加监控关键词')
+    add.add_argument('keyword')
+    add.add_argument('--pages', type=int, default=1)
+    add.add_argument('--interval', type=int, default=3600, help='重新爬取的间隔（秒）')
+
+    remove = sub.add_parser('remove', help='删除监控关键词')
+    remove.add_argument('keyword')
+
+    sub.add_parser('list', help='列出监控关键词')
+
+    run = sub.add_parser('run', help='启动监控进程')
+    run.add_argument('--workers', type=int, default=4)
+    run.add_argument('--poll', type=float, default=10, help='没有到期关键词时的轮询间隔（秒）')
+    run.add_argument('--once', action='store_true', help='只运行一轮到期关键词后退出')
+
+    args = parser.parse_args(argv)
+    db = ConnectionPool(args.db)
+    with db.connection() as conn:
+        schema.init_schema(conn)
+
+    if args.command == 'add':
+        with db.connection() as conn:
+            add_keyword(conn, args.keyword, args.pages, args.interval)
+        print(f'已添加监控关键词: {args.keyword}')
+    elif args.command == 'remove':
+        with db.connection() as conn:
+            remove_keyword(conn, args.keyword)
+        print(f'已删除监控关键词: {args.keyword}')
+    elif args.command == 'list':
+        with db.connection() as conn:
+            rows = conn.execute('SELECT * FROM watchlist ORDER BY keyword').fetchall()
+        for row in rows:
+            print(f"{row['keyword']}\t页数 {row['pages']}\t间隔 {row['interval_seconds']}s\t"
+                  f"上次新增 {row['last_new_count']}\t错误 {row['last_error'] or '-'}")
+    elif args.command == 'run':
+        monitor = Monitor(db, max_workers=args.workers)
+        if args.once:
+            print(f'本轮监控新增 {monitor.run_once()} 条数据')
+        else:
+            try:
+                monitor.run_forever(poll_interval=args.poll)
+            except KeyboardInterrupt:
+                monitor.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    setup_logging(os.environ.get('LOG_PROFILE', 'development'), os.environ.get('LOG_LEVELS', ''))
+    sys.exit(main())
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+相似报道检测模块
+
+同一篇报道被多个网站转载后，会以不同的URL多次保存到数据仓库。本模块在保存时
+为标题和摘要计算 MinHash 签名，估计的 Jaccard 相似度（按3字片段计算）不低于
+SIMILARITY_THRESHOLD 的两条记录视为相似报道，归入同一组（组号为组内最早保存的
+记录id）。
+
+签名按 LSH 分段建立索引：签名切成 BANDS 段，每段的哈希值作为桶号存入
+near_dup_bands 表。查找时只取出至少有一段落在同一桶中的候选记录，再用完整签名
+估计相似度，不需要与全部记录逐一比较。相似度为0.6/0.7/0.8的两条记录成为候选的
+概率约为 89%/98%/99.99%。
+
+用法:
+    python -m utils.near_dup backfill          # 为已有记录补算签名
+    python -m utils.near_dup similar 123       # 列出与某条记录相似的报道
+"""
+
+import argparse
+import array
+import functools
+import hashlib
+import logging
+import random
+import re
+import sqlite3
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# 签名长度（分桶数）和 LSH 分段：BANDS × ROWS_PER_BAND 不超过 SIGNATURE_SIZE
+SIGNATURE_SIZE = 64
+BANDS = 16
+ROWS_PER_BAND = 4
+SIMILARITY_THRESHOLD = 0.5
+
+# 按字符切分的片段长度
+SHINGLE_SIZE = 3
+
+# 补算签名时每批读取的记录数
+BACKFILL_BATCH = 2000
+
+# 计算签名前去掉的字符：空白和标点
+_STRIP_PATTERN = re.compile(r'[\s\W_]+', re.UNICODE)
+
+# 标题末尾的网站名，如 "标题_新浪财经"、"标题 - 网易新闻"、"标题|凤凰网"
+_TITLE_SUFFIX_PATTERN = re.compile(r'\s*(?:[_|｜]|\s-\s|——)\s*[^_|｜]{1,12}$')
+
+_HASH_SPACE = 1 << 64
+_BIN_RANGE = _HASH_SPACE // SIGNATURE_SIZE
+
+# 空桶借用非空桶时的探查顺序：每个桶各自一个固定的随机排列，相邻的空桶通常借用
+# 不同的桶，同一段内的值不会因为借用同一个桶而互相关联（第一次计算签名时生成）
+@functools.lru_cache(maxsize=None)
+def _probes():
+    return [random.Random(index).sample(range(SIGNATURE_SIZE), SIGNATURE_SIZE) for index in range(SIGNATURE_SIZE)]
+
+
+def _shingles(text):
+    text = _STRIP_PATTERN.sub('', (text or '').lower())
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text):
+    """
+    计算文本的 MinHash 签名
+
+    使用单哈希分桶（one permutation hashing）：每个片段只计算一次64位哈希，
+    按哈希值分到 SIGNATURE_SIZE 个桶中各取最小值；空桶按各自固定的随机顺序
+    借用第一个非空桶（加上偏移量以区分），代价与片段数成正比。
+
+    返回:
+        list 或 None: SIGNATURE_SIZE 个整数；文本为空时返回None
+    """
+    shingles = _shingles(text)
+    if not shingles:
+        return None
+    bins = [None] * SIGNATURE_SIZE
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+        index, value = value % SIGNATURE_SIZE, value // SIGNATURE_SIZE
+        current = bins[index]
+        if current is None or value < current:
+            bins[index] = value
+    signature = []
+    probes = _probes()
+    for index, value in enumerate(bins):
+        if value is None:
+            for attempt, donor in enumerate(probes[index]):
+                if bins[donor] is not None:
+                    value = (bins[donor] + (attempt + 1) * _BIN_RANGE) % _HASH_SPACE
+                    break
+        signature.append(value)
+    return signature
+
+
+def signature_of(title, content):
+    """按标题（去掉末尾的网站名）和摘要计算记录的签名"""
+    title = _TITLE_SUFFIX_PATTERN.sub('', title or '')
+    return minhash(f'{title} {content or ""}')
+
+
+def pack(signature):
+    """签名每个值只保存低16位，两个不同值恰好相同的概率可以忽略"""
+    return array.array('H', (value & 0xFFFF for value in signature)).tobytes()
+
+
+def similarity(a, b):
+    """用两个打包后的签名估计 Jaccard 相似度"""
+    a, b = array.array('H', a), array.array('H', b)
+    return sum(1 for x, y in zip(a, b) if x == y) / SIGNATURE_SIZE
+
+
+def band_keys(signature):
+    """签名各段的桶号（段号参与哈希，不同段的桶不会混在一起）"""
+    keys = []
+    for band in range(BANDS):
+        values = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        data = band.to_bytes(1, 'little') + b''.join(value.to_bytes(8, 'little') for value in values)
+        keys.append(int.from_bytes(hashlib.blake2b(data, digest_size=4).digest(), 'little'))
+    return keys
+
+
+_CANDIDATES_SQL = (f'SELECT s.warehouse_id, s.signature, s.cluster_id FROM near_dup_signatures s WHERE s.warehouse_id IN '
+                   f'(SELECT warehouse_id FROM near_dup_bands WHERE band_key IN ({", ".join(["?"] * BANDS)}))')
+
+
+def init_table(conn):
+    """
+    创建签名表、LSH 分段桶表和同步删除的触发器（如果不存在）
+
+    已有数据的旧数据库不会在此时补算签名，没有签名的记录视为没有相似报道，
+    可以用 python -m utils.near_dup backfill 补算。删除触发器引用的已归档记录索引
+    由 utils.warehouse_archive.init_table 一并创建。
+    """
+    # warehouse_archive 导入了本模块，在函数内导入避免循环导入
+    from utils import warehouse_archive
+    warehouse_archive.init_table(conn)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS near_dup_signatures (
+            warehouse_id INTEGER PRIMARY KEY,
+            signature BLOB NOT NULL,
+            cluster_id INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_near_dup_cluster ON near_dup_signatures (cluster_id)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS near_dup_bands (
+            band_key INTEGER NOT NULL,
+            warehouse_id INTEGER NOT NULL,
+            PRIMARY KEY (band_key, warehouse_id)
+        ) WITHOUT ROWID
+    ''')
+    # 删除记录时同步删除签名；删除的是组内最早的记录时，由剩下最早的记录接替组号。
+    # 桶表按桶号组织，不在触发器中逐条删除，没有签名的桶记录在查找时自然被忽略，
+    # 由 backfill 统一清理。移入归档分区的记录（登记在 data_warehouse_archived 中，
+    # 见 utils.warehouse_archive）保留签名和组号
+    trigger = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'near_dup_ad'").fetchone()
+    if trigger and 'data_warehouse_archived' not in trigger[0]:
+        conn.execute('DROP TRIGGER near_dup_ad')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS near_dup_ad AFTER DELETE ON data_warehouse
+        WHEN NOT EXISTS (SELECT 1 FROM data_warehouse_archived WHERE id = old.id) BEGIN
+            DELETE FROM near_dup_signatures WHERE warehouse_id = old.id;
+            UPDATE near_dup_signatures SET cluster_id = (
+                SELECT MIN(warehouse_id) FROM near_dup_signatures WHERE cluster_id = old.id
+            ) WHERE cluster_id = old.id;
+        END
+    ''')
+
+
+def find_similar(conn, signature, threshold=SIMILARITY_THRESHOLD):
+    """
+    查找与签名相似的已保存记录
+
+    返回:
+        list: (warehouse_id, cluster_id, 估计相似度)，按相似度从高到低排序
+    """
+    packed = pack(signature)
+    matches = []
+    for warehouse_id, stored, cluster_id in conn.execute(_CANDIDATES_SQL, band_keys(signature)):
+        score = similarity(packed, stored)
+        if score >= threshold:
+            matches.append((warehouse_id, cluster_id, score))
+    matches.sort(key=lambda match: (-match[2], match[0]))
+    return matches
+
+
+def index_rows(conn, rows):
+    """
+    为新保存的记录计算签名并归入相似报道组
+
+    记录逐条处理，同一批中互相转载的记录也能归入同一组。
+
+    参数:
+        conn: 数据库连接，事务由调用方提交
+        rows: 可迭代的 (id, title, content)
+
+    返回:
+        int: 归入已有相似报道组的记录数
+    """
+    matched = 0
+    for warehouse_id, title, content in rows:
+        signature = signature_of(title, content)
+        if signature is None:
+            continue
+        similar = [match for match in find_similar(conn, signature) if match[0] != warehouse_id]
+        cluster_id = min([warehouse_id] + [match[1] for match in similar])
+        if similar:
+            matched += 1
+        conn.execute('INSERT OR REPLACE INTO near_dup_signatures (warehouse_id, signature, cluster_id) VALUES (?, ?, ?)',
+                     (warehouse_id, pack(signature), cluster_id))
+        conn.executemany('INSERT OR IGNORE INTO near_dup_bands (band_key, warehouse_id) VALUES (?, ?)',
+                         [(key, warehouse_id) for key in band_keys(signature)])
+    return matched
+
+
+def _member_condition(members):
+    """
+    同组记录 g 属于检索结果的SQL条件和参数
+
+    members 为 (表名, 条件SQL, 参数列表) 的列表，条件SQL是以 " AND ..." 形式拼接、
+    列名不带表名的检索条件（见 utils.warehouse_search.build_filters）；为None时
+    不限制（所有有签名的记录都在结果中）。
+    """
+    if members is None:
+        return '', []
+    clauses = []
+    params = []
+    for table, filters, filter_params in members:
+        clauses.append(f'EXISTS (SELECT 1 FROM {table} d WHERE d.id = g.warehouse_id{filters})')
+        params.extend(filter_params)
+    return f" AND ({' OR '.join(clauses) or '0'})", params
+
+
+def collapse_filter(table='data_warehouse', members=None):
+    """
+    每组相似报道只保留检索结果中id最小（最早保存）的记录的SQL条件
+
+    只与同样满足检索条件的同组记录比较：组内最早的记录被检索条件排除时，由结果中
+    剩下最早的记录代表这一组。按主键逐行判断，与分页游标无关，可以和键集分页组合使用
+    （members 中不要包含分页条件）。
+
+    参数:
+        table: 被查询的表名
+        members: 检索结果的组成，见 _member_condition
+
+    返回:
+        tuple: (以 " AND ..." 形式返回的条件SQL, 参数列表)
+    """
+    condition, params = _member_condition(members)
+    return (f' AND NOT EXISTS (SELECT 1 FROM near_dup_signatures f '
+            f'JOIN near_dup_signatures g ON g.cluster_id = f.cluster_id '
+            f'WHERE f.warehouse_id = {table}.id AND g.warehouse_id < f.warehouse_id{condition})'), params
+
+
+def duplicate_count_column(table='data_warehouse', members=None):
+    """
+    检索结果中同组其他相似报道条数的SQL列表达式
+
+    返回:
+        tuple: (SQL列表达式, 参数列表)
+    """
+    condition, params = _member_condition(members)
+    return (f'(SELECT COUNT(*) FROM near_dup_signatures f '
+            f'JOIN near_dup_signatures g ON g.cluster_id = f.cluster_id '
+            f'WHERE f.warehouse_id = {table}.id AND g.warehouse_id != f.warehouse_id{condition}) '
+            f'AS duplicate_count'), params
+
+
+def collapse_ids(conn, ids):
+    """
+    合并一组记录id中的相似报道，每组只保留第一次出现的id
+
+    返回:
+        list: 保持原有顺序的id列表
+    """
+    ids = list(ids)
+    clusters = {}
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        placeholders = ','.join(['?'] * len(chunk))
+        clusters.update(conn.execute(
+            f'SELECT warehouse_id, cluster_id FROM near_dup_signatures WHERE warehouse_id IN ({placeholders})',
+            chunk))
+    kept = []
+    seen = set()
+    for warehouse_id in ids:
+        cluster_id = clusters.get(warehouse_id, warehouse_id)
+        if cluster_id not in seen:
+            seen.add(cluster_id)
+            kept.append(warehouse_id)
+    return kept
+
+
+def backfill(conn, batch_size=BACKFILL_BATCH, progress=None):
+    """
+    按id顺序为还没有签名的记录补算签名，每批提交一次；并清理已删除记录遗留的桶记录
+
+    返回:
+        tuple: (补算的记录数, 归入已有相似报道组的记录数)
+    """
+    conn.execute('DELETE FROM near_dup_bands WHERE warehouse_id NOT IN (SELECT warehouse_id FROM near_dup_signatures)')
+    conn.commit()
+    total = matched = 0
+    last_id = 0
+    while True:
+        rows = conn.execute('''
+            SELECT id, title, content FROM data_warehouse d
+            WHERE id > ? AND NOT EXISTS (SELECT 1 FROM near_dup_signatures f WHERE f.warehouse_id = d.id)
+            ORDER BY id LIMIT ?
+        ''', (last_id, batch_size)).fetchall()
+        if not rows:
+            return total, matched
+        matched += index_rows(conn, rows)
+        conn.commit()
+        total += len(rows)
+        last_id = rows[-1][0]
+        if progress:
+            progress(total, matched)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='相似报道检测')
+    parser.add_argument('--db', default='data.db', help='数据库文件路径')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('backfill', help='为还没有签名的记录补算签名')
+    similar = sub.add_parser('similar', help='列出与某条记录相似的报道')
+    similar.add_argument('id', type=int, help='数据仓库中的记录id（包括已归档的记录）')
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        # 本模块是 utils.schema 和 utils.warehouse_archive 的依赖，在函数内导入避免循环导入
+        from utils import schema, warehouse_archive
+        schema.init_schema(conn)
+        conn.commit()
+        if args.command == 'backfill':
+            start = time.perf_counter()
+            total, matched = backfill(conn, progress=lambda total, matched: print(
+                f'已补算 {total} 条，其中相似报道 {matched} 条', end='\r'))
+            print(f'\n补算完成: {total} 条，其中相似报道 {matched} 条，用时 {time.perf_counter() - start:.1f}s')
+        else:
+            # 签名表同时包含热数据和已归档的记录，记录内容经 warehouse_archive 到所属分区中读取
+            rows = warehouse_archive.fetch_rows(conn, [args.id])
+            if not rows:
+                print(f'记录 {args.id} 不存在')
+                return 1
+            signature = signature_of(rows[0][1], rows[0][4])
+            matches = find_similar(conn, signature) if signature else []
+            titles = {row[0]: row[1] for row in warehouse_archive.fetch_rows(conn, [match[0] for match in matches])}
+            for warehouse_id, cluster_id, score in matches:
+                print(f'{warehouse_id}\t相似度 {score:.2f}\t组 {cluster_id}\t{titles.get(warehouse_id, "")}')
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
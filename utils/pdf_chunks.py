@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大报告分块并行渲染模块
+
+数据条数很多时，单次调用 wkhtmltopdf 渲染整份报告又慢又占内存，甚至会失败。
+这里把数据按模板的分页规则（每3条一页）切成若干块，在线程池中并行启动多个
+wkhtmltopdf 进程分别渲染，再用 pypdf 合并，生成目录页并加上连续页码。
+
+合并依赖 pypdf，没有安装时 is_available() 返回False，由调用方退回单次渲染。
+"""
+
+import logging
+import math
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# 报告模板每页放置的数据条数，分块大小取它的整数倍，使分块边界与原有分页一致
+ITEMS_PER_PAGE = 3
+
+# 每块的数据条数
+CHUNK_SIZE = 300
+
+# 目录页估算每页条目数，只用于第一遍渲染目录前的页数估计
+TOC_ENTRIES_PER_PAGE = 40
+
+# 各部分（分块、目录）的渲染耗时
+PART_RENDER_SECONDS = metrics.histogram('pdf_chunk_render_seconds', '分块渲染时单个部分的渲染耗时（秒）', ['part'],
+                                        buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+MERGE_SECONDS = metrics.histogram('pdf_chunk_merge_seconds', '合并分块并添加页码的耗时（秒）',
+                                  buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120))
+
+# 大纲标题中的数据序号，例如 "12. 标题"
+_OUTLINE_INDEX = re.compile(r'^\s*(\d+)\.')
+
+
+def is_available():
+    """是否安装了合并PDF所需的 pypdf"""
+    try:
+        import pypdf  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def split_chunks(rows, chunk_size=CHUNK_SIZE):
+    """
+    按模板分页规则把数据切块
+
+    返回:
+        list: [(本块第一条数据的序号偏移, 本块数据列表), ...]
+    """
+    chunk_size = max(ITEMS_PER_PAGE, chunk_size // ITEMS_PER_PAGE * ITEMS_PER_PAGE)
+    return [(start, rows[start:start + chunk_size]) for start in range(0, len(rows), chunk_size)]
+
+
+def _outline_pages(reader):
+    """从分块PDF的大纲（wkhtmltopdf 按标题生成）中读取每条数据所在的页（块内从0开始）"""
+    pages = {}
+
+    def walk(items):
+        for item in items:
+            if isinstance(item, list):
+                walk(item)
+                continue
+            match = _OUTLINE_INDEX.match(item.title or '')
+            if match:
+                pages[int(match.group(1))] = reader.get_destination_page_number(item)
+
+    try:
+        walk(reader.outline)
+    except Exception as e:
+        logger.warning(f'读取分块PDF大纲失败，按每页 {ITEMS_PER_PAGE} 条估算页码: {str(e)}')
+    return pages
+
+
+def _stamp_page_numbers(writer):
+    """在每页底部居中加上 "页码 / 总页数"（标准Helvetica字体，无需嵌入）"""
+    from pypdf import PageObject
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    font = DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject('/Helvetica'),
+    })
+    total = len(writer.pages)
+    for number, page in enumerate(writer.pages, start=1):
+        box = page.mediabox
+        width, height = float(box.width), float(box.height)
+        text = f'{number} / {total}'
+        # Helvetica 数字和空格、斜杠的宽度约为字号的一半
+        x = float(box.left) + (width - len(text) * 9 * 0.5) / 2
+        stamp = PageObject.create_blank_page(width=width, height=height)
+        stamp[NameObject('/Resources')] = DictionaryObject({
+            NameObject('/Font'): DictionaryObject({NameObject('/PgNum'): font}),
+        })
+        content = DecodedStreamObject()
+        content.set_data(f'BT /PgNum 9 Tf 0.6 g {x:.1f} {float(box.bottom) + 18:.1f} Td ({text}) Tj ET'.encode('ascii'))
+        stamp.replace_contents(content)
+        page.merge_page(stamp)
+
+
+def render_chunked(rows, output_path, render_html, render_pdf, workers=None,
+                   chunk_size=CHUNK_SIZE, progress=None):
+    """
+    分块并行渲染报告并合并为一个PDF
+
+    参数:
+        rows: 报告数据（按报告中的顺序）
+        output_path: 合并后PDF的输出路径
+        render_html: 渲染报告模板的函数，render_html(**context) 返回HTML字符串，
+                     context 包括 data, index_offset, total, show_header, show_footer, toc
+        render_pdf: 把HTML转换为PDF文件的函数，render_pdf(html, path)
+        workers: 同时运行的渲染进程数，默认为CPU核数
+        chunk_size: 每块的数据条数（会取每页条数的整数倍）
+        progress: 进度回调 progress(percent)，percent 在 0~100 之间
+
+    返回:
+        int: 合并后PDF的总页数
+    """
+    from pypdf import PdfReader, PdfWriter
+
+    chunks = split_chunks(rows, chunk_size)
+    total = len(rows)
+    workers = workers or os.cpu_count() or 1
+    report = progress or (lambda percent: None)
+    tmp_dir = tempfile.mkdtemp(prefix='pdf-chunks-', dir=os.path.dirname(os.path.abspath(output_path)))
+
+    def render_part(name, **context):
+        path = os.path.join(tmp_dir, f'{name}.pdf')
+        start = time.perf_counter()
+        render_pdf(render_html(total=total, **context), path)
+        PART_RENDER_SECONDS.labels('toc' if context.get('toc') else 'chunk').observe(time.perf_counter() - start)
+        return path
+
+    def render_toc(entries, name):
+        return render_part(name, data=[], toc=entries, show_header=True, show_footer=False)
+
+    def toc_entries(item_pages, page_offset):
+        return [{'index': index + 1, 'title': row['title'], 'page': item_pages[index] + page_offset}
+                for index, row in enumerate(rows)]
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pdf-chunk') as executor:
+            # 第一遍目录使用估算的页码，只用来确定目录页数，与各分块同时渲染
+            estimated = [index // ITEMS_PER_PAGE for index in range(total)]
+            toc_guess = math.ceil(total / TOC_ENTRIES_PER_PAGE) + 1
+            toc_future = executor.submit(render_toc, toc_entries(estimated, toc_guess + 1), 'toc-draft')
+            chunk_futures = [
+                executor.submit(render_part, f'chunk-{number:05d}', data=chunk, index_offset=offset,
+                                show_header=False, show_footer=offset + len(chunk) == total)
+                for number, (offset, chunk) in enumerate(chunks)
+            ]
+
+            chunk_paths = []
+            for number, future in enumerate(chunk_futures, start=1):
+                chunk_paths.append(future.result())
+                report(80 * number / len(chunk_futures))
+            toc_pages = len(PdfReader(toc_future.result()).pages)
+
+        # 根据各块的大纲确定每条数据在正文中的页码（从0开始），缺失时按每页3条估算
+        item_pages = []
+        content_pages = 0
+        for (offset, chunk), path in zip(chunks, chunk_paths):
+            reader = PdfReader(path)
+            outline = _outline_pages(reader)
+            local_pages = []
+            for local in range(len(chunk)):
+                page = outline.get(offset + local + 1)
+                if page is None:
+                    page = local_pages[-1] + (local % ITEMS_PER_PAGE == 0) if local_pages else 0
+                local_pages.append(page)
+            item_pages.extend(content_pages + page for page in local_pages)
+            content_pages += len(reader.pages)
+
+        # 用真实页码重新渲染目录；目录页数变化时再渲染一次
+        toc_path = None
+        for attempt in range(3):
+            toc_path = render_toc(toc_entries(item_pages, toc_pages + 1), f'toc-{attempt}')
+            pages = len(PdfReader(toc_path).pages)
+            if pages == toc_pages:
+                break
+            toc_pages = pages
+        else:
+            logger.warning('目录页数未能收敛，目录中的页码可能有偏差')
+        report(90)
+
+        with MERGE_SECONDS.time():
+            writer = PdfWriter()
+            for path in [toc_path] + chunk_paths:
+                writer.append(path)
+            _stamp_page_numbers(writer)
+            with open(output_path, 'wb') as f:
+                writer.write(f)
+        page_count = len(writer.pages)
+        report(100)
+        logger.info(f'分块渲染PDF完成: {total} 条数据，{len(chunks)} 块，共 {page_count} 页')
+        return page_count
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF报告后台任务模块
+
+生成PDF需要启动 wkhtmltopdf 子进程，耗时较长。这里把生成过程放到
+有界线程池中执行，提交后立即返回任务ID；任务状态保存在SQLite中，
+服务重启后未完成的任务会重新排队。
+
+多个工作进程（如 gunicorn -w 4）共用同一个任务表：任务由把状态从 queued 原子地
+改为 running 的进程执行，同一个任务不会被重复生成；执行中的任务定期刷新
+updated_at 作为租约，只有租约过期（执行它的进程已退出）的任务才会重新排队。
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+# 执行中任务的租约（秒）：执行任务的线程每隔 JOB_HEARTBEAT_SECONDS 秒刷新 updated_at，
+# 超过 JOB_LEASE_SECONDS 秒没有刷新的任务视为执行它的进程已退出
+JOB_LEASE_SECONDS = 60
+JOB_HEARTBEAT_SECONDS = 15
+
+# PDF任务从开始执行到完成（或失败）的耗时，不含排队时间
+JOB_SECONDS = metrics.histogram('pdf_job_seconds', 'PDF报告任务执行耗时（秒）', ['status'],
+                                buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800))
+
+
+class PdfJobQueue:
+    """PDF报告生成任务队列"""
+
+    def __init__(self, db, render_func, output_dir, max_workers=2):
+        """
+        参数:
+            db: 数据库连接池（utils.db.ConnectionPool）
+            render_func: 实际生成PDF的函数，签名为 render_func(ids, progress)，
+                         其中 progress(percent) 用于上报进度；返回生成的文件名
+                         （相对于 output_dir）
+            output_dir: PDF文件输出目录
+            max_workers: 同时生成PDF的最大任务数
+        """
+        self.db = db
+        self.render_func = render_func
+        self.output_dir = output_dir
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def init_table(conn):
+        """创建任务表（如果不存在）"""
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS pdf_jobs (
+                id TEXT PRIMARY KEY,
+                ids_key TEXT NOT NULL,
+                ids TEXT NOT NULL,
+                status TEXT NOT NULL,
+                progress INTEGER NOT NULL DEFAULT 0,
+                filename TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        # 同一组数据同时只允许存在一个未完成的任务，重复提交会合并到已有任务
+        conn.execute(f'''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_pdf_jobs_inflight ON pdf_jobs (ids_key)
+            WHERE status IN ('{STATUS_QUEUED}', '{STATUS_RUNNING}')
+        ''')
+        conn.commit()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='pdf-job')
+            return self._executor
+
+    @staticmethod
+    def _ids_key(ids):
+        return ','.join(str(i) for i in sorted(set(ids)))
+
+    def submit(self, ids):
+        """
+        提交PDF生成任务
+
+        返回:
+            str: 任务ID；若相同数据的任务仍在进行中，返回已有任务的ID
+        """
+        ids = sorted(set(int(i) for i in ids))
+        ids_key = self._ids_key(ids)
+        now = time.time()
+        job_id = uuid.uuid4().hex[:16]
+
+        try:
+            with self.db.connection() as conn:
+                conn.execute(
+                    'INSERT INTO pdf_jobs (id, ids_key, ids, status, progress, created_at, updated_at) VALUES (?, ?, ?, ?, 0, ?, ?)',
+                    (job_id, ids_key, json.dumps(ids), STATUS_QUEUED, now, now)
+                )
+        except sqlite3.IntegrityError:
+            with self.db.connection() as conn:
+                row = conn.execute(
+                    'SELECT id FROM pdf_jobs WHERE ids_key = ? AND status IN (?, ?)',
+                    (ids_key, STATUS_QUEUED, STATUS_RUNNING)
+                ).fetchone()
+            if row:
+                logger.info(f'PDF任务与进行中的任务 {row["id"]} 合并')
+                return row['id']
+            raise
+
+        self._get_executor().submit(self._run, job_id, ids)
+        logger.info(f'PDF任务已提交: {job_id}，共 {len(ids)} 条数据')
+        return job_id
+
+    def get(self, job_id):
+        """
+        查询任务状态
+
+        执行中的任务租约已过期时（执行它的进程已退出）重新排队，由当前进程执行。
+
+        返回:
+            dict 或 None: 任务信息；任务不存在时返回None
+        """
+        with self.db.connection() as conn:
+            row = conn.execute(
+                'SELECT id, ids, status, progress, filename, error, created_at, updated_at FROM pdf_jobs WHERE id = ?',
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        ids = json.loads(job.pop('ids'))
+        if job['status'] == STATUS_RUNNING and job['updated_at'] < time.time() - JOB_LEASE_SECONDS:
+            if self._requeue_expired(job_id):
+                logger.info(f'PDF任务 {job_id} 租约过期，重新排队')
+                self._get_executor().submit(self._run, job_id, ids)
+                job.update(status=STATUS_QUEUED, progress=0)
+        return job
+
+    def _requeue_expired(self, job_id=None):
+        """把租约过期的执行中任务改回 queued，返回改动的任务数"""
+        now = time.time()
+        sql = 'UPDATE pdf_jobs SET status = ?, progress = 0, updated_at = ? WHERE status = ? AND updated_at < ?'
+        params = [STATUS_QUEUED, now, STATUS_RUNNING, now - JOB_LEASE_SECONDS]
+        if job_id is not None:
+            sql += ' AND id = ?'
+            params.append(job_id)
+        with self.db.connection() as conn:
+            return conn.execute(sql, params).rowcount
+
+    def recover(self):
+        """
+        服务启动时接手未完成的任务
+
+        租约过期的执行中任务重新排队；排队中的任务提交到本进程的线程池，其他进程
+        同时提交的同一个任务只会被先认领的一方执行。
+
+        返回:
+            int: 提交的任务数
+        """
+        expired = self._requeue_expired()
+        with self.db.connection() as conn:
+            rows = conn.execute(
+                'SELECT id, ids FROM pdf_jobs WHERE status = ? ORDER BY created_at', (STATUS_QUEUED,)
+            ).fetchall()
+
+        for row in rows:
+            self._get_executor().submit(self._run, row['id'], json.loads(row['ids']))
+        if rows:
+            logger.info(f'接手 {len(rows)} 个排队中的PDF任务，其中 {expired} 个执行中的任务租约已过期')
+        return len(rows)
+
+    def _update(self, job_id, **fields):
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        with self.db.connection() as conn:
+            conn.execute(f'UPDATE pdf_jobs SET {assignments} WHERE id = ?', list(fields.values()) + [job_id])
+
+    def _claim(self, job_id):
+        """把排队中的任务原子地改为执行中，返回是否认领成功（已被其他线程或进程认领时返回False）"""
+        with self.db.connection() as conn:
+            return conn.execute('UPDATE pdf_jobs SET status = ?, progress = 5, updated_at = ? WHERE id = ? AND status = ?',
+                                (STATUS_RUNNING, time.time(), job_id, STATUS_QUEUED)).rowcount == 1
+
+    def _heartbeat(self, job_id, stopped):
+        """任务执行期间定期刷新租约（渲染PDF时可能长时间没有进度更新）"""
+        while not stopped.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                with self.db.connection() as conn:
+                    conn.execute('UPDATE pdf_jobs SET updated_at = ? WHERE id = ? AND status = ?',
+                                 (time.time(), job_id, STATUS_RUNNING))
+            except sqlite3.Error as e:
+                logger.warning(f'PDF任务 {job_id} 刷新租约失败: {str(e)}')
+
+    def _run(self, job_id, ids):
+        """在工作线程中生成PDF"""
+        if not self._claim(job_id):
+            logger.debug(f'PDF任务 {job_id} 已被其他进程认领，跳过')
+            return
+        stopped = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(job_id, stopped), name=f'pdf-job-heartbeat-{job_id}',
+                         daemon=True).start()
+        start = time.perf_counter()
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            filename = self.render_func(ids, lambda percent: self._update(job_id, progress=int(percent)))
+            self._update(job_id, status=STATUS_DONE, progress=100, filename=filename)
+            JOB_SECONDS.labels(STATUS_DONE).observe(time.perf_counter() - start)
+            logger.info(f'PDF任务完成: {job_id}')
+        except Exception as e:
+            self._update(job_id, status=STATUS_FAILED, error=str(e))
+            JOB_SECONDS.labels(STATUS_FAILED).observe(time.perf_counter() - start)
+            logger.error(f'PDF任务失败: {job_id}, {str(e)}')
+        finally:
+            stopped.set()
+
+    def shutdown(self, wait=True):
+        """停止工作线程池"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
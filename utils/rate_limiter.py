@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应限速与重试退避
+
+同一目标站点的所有爬虫实例和线程共享一个令牌桶限速器：每次请求前取得令牌，
+令牌按当前速率补充。速率根据请求结果自动调整（加性增、乘性减）:
+    成功且响应不慢    速率加性增加，最高到 delay_range 下限对应的速率
+    响应变慢          速率乘以 SLOW_DECREASE
+    5xx/网络错误      速率乘以 ERROR_DECREASE
+    429/验证码        速率乘以 THROTTLE_DECREASE，并暂停所有请求一段冷却时间
+                      （服务器给出 Retry-After 时以其为准，连续被限流时冷却时间加倍）
+
+单页请求失败后按 RetryPolicy 做带随机抖动的指数退避重试。
+"""
+
+import random
+import threading
+import time
+
+from utils import metrics
+
+# 速率调整参数
+ADDITIVE_STEP = 0.05      # 每次成功增加 (最高速率 - 最低速率) 的比例
+SLOW_DECREASE = 0.8
+ERROR_DECREASE = 0.75
+THROTTLE_DECREASE = 0.5
+
+# delay_range 下限为0时的最高速率（次/秒），以及最慢每隔多少秒发起一次请求
+MAX_RATE = 20.0
+MAX_INTERVAL = 30.0
+
+# 平滑响应时间的系数（指数加权移动平均）
+LATENCY_ALPHA = 0.3
+
+
+def parse_retry_after(value):
+    """解析 Retry-After 响应头（秒数形式），无法解析时返回None"""
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return None
+    return seconds if seconds >= 0 else None
+
+
+class AdaptiveRateLimiter:
+    """多线程共享的自适应令牌桶限速器"""
+
+    def __init__(self, rate=0.5, min_rate=1 / MAX_INTERVAL, max_rate=1.0, burst=1,
+                 latency_target=2.0, cooldown=5.0, max_cooldown=120.0, jitter=0.3):
+        """
+        参数:
+            rate: 初始速率（次/秒）
+            min_rate, max_rate: 速率调整的下限和上限
+            burst: 令牌桶容量，空闲后最多可以连续发起的请求数
+            latency_target: 平滑后的响应时间超过该值（秒）时视为服务器变慢，降低速率
+            cooldown: 第一次被限流（429/验证码）后暂停请求的秒数
+            max_cooldown: 连续被限流时冷却时间的上限（秒）
+            jitter: 需要等待时额外随机等待 [0, jitter × 请求间隔] 秒，避免请求节奏过于规律
+        """
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = min(max(rate, min_rate), max_rate)
+        self.burst = burst
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.jitter = jitter
+        self.latency = None
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._throttle_streak = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_delay_range(cls, delay_range, **kwargs):
+        """
+        按原有的请求间隔范围创建限速器：初始间隔取平均值，最短间隔取下限
+
+        参数:
+            delay_range: (最短间隔, 最长间隔)，单位秒
+        """
+        low, high = delay_range
+        max_rate = 1 / low if low > 0 else MAX_RATE
+        rate = min(2 / (low + high), max_rate) if low + high > 0 else max_rate
+        kwargs.setdefault('min_rate', min(1 / MAX_INTERVAL, rate))
+        return cls(rate=rate, max_rate=max_rate, **kwargs)
+
+    def _refill(self, now):
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def acquire(self):
+        """
+        阻塞直到可以发起下一次请求
+
+        返回:
+            float: 实际等待的秒数
+        """
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                self._tokens -= 1
+                # 令牌不足时预约未来的令牌，后来的线程排在更后面
+                ready_at = self._updated + max(0.0, -self._tokens) / self.rate
+                wait = ready_at - now
+                if wait > 0:
+                    wait += random.uniform(0, self.jitter / self.rate)
+            if wait > 0:
+                time.sleep(wait)
+            # 等待期间被限流时重新排队，等冷却结束
+            with self._lock:
+                if self._blocked_until <= time.monotonic():
+                    return time.monotonic() - start
+
+    def record(self, outcome, latency=None, retry_after=None):
+        """
+        反馈一次请求的结果，调整速率
+
+        参数:
+            outcome: 'ok'、'error'（5xx或网络错误）或 'throttled'（429或验证码）
+            latency: 请求耗时（秒）
+            retry_after: 服务器要求的等待秒数（Retry-After）
+        """
+        with self._lock:
+            if latency is not None:
+                self.latency = latency if self.latency is None else (
+                    LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * self.latency)
+
+            if outcome == 'ok':
+                self._throttle_streak = 0
+                if self.latency is not None and self.latency > self.latency_target:
+                    rate = self.rate * SLOW_DECREASE
+                else:
+                    rate = self.rate + (self.max_rate - self.min_rate) * ADDITIVE_STEP
+            elif outcome == 'throttled':
+                self._throttle_streak += 1
+                rate = self.rate * THROTTLE_DECREASE
+                cooldown = retry_after if retry_after is not None else min(
+                    self.max_cooldown, self.cooldown * 2 ** (self._throttle_streak - 1))
+                # 冷却结束前不补充令牌，已预约的请求也要重新排队
+                self._blocked_until = max(self._blocked_until, time.monotonic() + cooldown)
+                self._updated = max(self._updated, self._blocked_until)
+                self._tokens = min(self._tokens, 0.0)
+            else:
+                if retry_after is not None:
+                    self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+                    self._updated = max(self._updated, self._blocked_until)
+                rate = self.rate * ERROR_DECREASE
+            self.rate = min(max(rate, self.min_rate), self.max_rate)
+
+    def stats(self):
+        """返回当前速率、平滑后的响应时间和剩余冷却时间"""
+        with self._lock:
+            return {
+                'rate': self.rate,
+                'latency': self.latency,
+                'blocked_for': max(0.0, self._blocked_until - time.monotonic()),
+            }
+
+
+class RetryPolicy:
+    """单页请求的重试策略：带全抖动的指数退避"""
+
+    def __init__(self, max_retries=3, base=1.0, cap=30.0):
+        """
+        参数:
+            max_retries: 最多重试次数（不含第一次请求）
+            base: 第一次重试前的最长等待秒数，之后每次加倍
+            cap: 单次等待的上限（秒）
+        """
+        self.max_retries = max_retries
+        self.base = base
+        self.cap = cap
+
+    def backoff(self, attempt):
+        """第 attempt 次重试（从1开始）前等待的秒数，在 [0, min(cap, base × 2^(attempt-1))] 内随机取值"""
+        return random.uniform(0, min(self.cap, self.base * 2 ** (attempt - 1)))
+
+
+# 按目标站点共享的限速器，首次使用时创建
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(host, delay_range=(1, 3)):
+    """
+    返回目标站点共享的限速器
+
+    参数:
+        host: 目标站点（主机名和端口），同一站点的所有爬虫共用一个限速器
+        delay_range: 首次创建时的请求间隔范围，见 AdaptiveRateLimiter.from_delay_range
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = _limiters[host] = AdaptiveRateLimiter.from_delay_range(delay_range)
+        return limiter
+
+
+def _rates():
+    with _limiters_lock:
+        return {(host,): limiter.rate for host, limiter in _limiters.items()}
+
+
+metrics.callback('crawler_rate_limit_per_second', '各目标站点当前允许的请求速率（次/秒）', 'gauge', _rates, ['host'])
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF报告缓存模块
+
+以“排序后的数据行内容 + 报告模板版本”的哈希作为文件名保存生成好的PDF，
+同一批数据重复生成报告时直接复用磁盘上的文件；报告目录按最近使用时间
+淘汰旧文件，控制文件数量和总大小。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ReportCache:
+    """按内容寻址的PDF报告缓存"""
+
+    def __init__(self, directory, template_path, max_files=200, max_bytes=500 * 1024 * 1024):
+        """
+        参数:
+            directory: 报告输出目录
+            template_path: 报告模板文件路径，模板内容变化后旧缓存自动失效
+            max_files: 目录中最多保留的PDF文件数
+            max_bytes: 目录中PDF文件的总大小上限（字节）
+        """
+        self.directory = directory
+        self.template_path = template_path
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._template_version = None
+        self._template_mtime = None
+        self._lock = threading.Lock()
+
+    def template_version(self):
+        """返回报告模板内容的哈希，模板文件修改后重新计算"""
+        mtime = os.path.getmtime(self.template_path)
+        if mtime != self._template_mtime:
+            with open(self.template_path, 'rb') as f:
+                self._template_version = hashlib.sha256(f.read()).hexdigest()
+            self._template_mtime = mtime
+        return self._template_version
+
+    def key(self, rows):
+        """
+        计算一批数据行对应的缓存键
+
+        参数:
+            rows: 数据行列表（sqlite3.Row 或 dict），必须包含 id 列
+        """
+        items = sorted((dict(row) for row in rows), key=lambda item: item['id'])
+        digest = hashlib.sha256()
+        digest.update(self.template_version().encode('ascii'))
+        for item in items:
+            digest.update(json.dumps(item, ensure_ascii=False, sort_keys=True, default=str).encode('utf-8'))
+            digest.update(b'\n')
+        return digest.hexdigest()
+
+    @staticmethod
+    def filename_for(key):
+        return f'report_{key[:32]}.pdf'
+
+    def get(self, key):
+        """
+        查找缓存的报告
+
+        返回:
+            str 或 None: 命中时返回报告文件名（相对于报告目录），并刷新其最近使用时间
+        """
+        filename = self.filename_for(key)
+        path = os.path.join(self.directory, filename)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        logger.info(f'PDF报告缓存命中: {filename}')
+        return filename
+
+    def temp_path(self, key):
+        """
+        返回生成报告时使用的临时文件路径，生成完成后再用 put() 放入缓存
+
+        文件名包含进程号和线程号：多个工作进程的线程号可能相同，同时生成同一份报告时
+        不能写入同一个临时文件。
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f'{self.filename_for(key)}.{os.getpid()}.{threading.get_ident()}.tmp')
+
+    def put(self, key, temp_path):
+        """
+        把生成好的临时文件放入缓存
+
+        返回:
+            str: 报告文件名（相对于报告目录）
+        """
+        filename = self.filename_for(key)
+        os.replace(temp_path, os.path.join(self.directory, filename))
+        self.evict(keep=filename)
+        return filename
+
+    def evict(self, keep=None):
+        """按最近使用时间从旧到新删除报告，直到数量和总大小都在上限以内"""
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.name.endswith('.pdf'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.name))
+
+            count = len(entries)
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for _, size, name in sorted(entries):
+                if count <= self.max_files and total <= self.max_bytes:
+                    break
+                if name == keep:
+                    continue
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+                count -= 1
+                total -= size
+                removed += 1
+
+        if removed:
+            logger.info(f'PDF报告目录超出上限，淘汰 {removed} 个旧报告')
+        return removed
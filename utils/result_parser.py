@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+百度搜索结果页解析模块
+
+提供多种可插拔的解析后端：默认使用 BeautifulSoup + html.parser，安装了 selectolax
+或 lxml 时可以改用这些C实现的解析器（BaiduSpider(parser_backend=...)）。各后端使用
+预编译的选择器逐个结果容器提取标题、链接、来源和摘要。
+
+结构正确的页面上各后端的输出完全一致；标签嵌套错误的页面上可能不同：selectolax 和
+lxml 按HTML规范修复文档树（例如 <p> 中出现 <div> 时先结束 <p>），html.parser 不做
+修复，因此 <p class="content">p1<div>d</div>p2</p> 的摘要分别是 "p1" 和 "p1dp2"。
+为了不改变保存到数据仓库的内容，默认后端保持 html.parser，C实现的后端需要显式选择。
+"""
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# 结果容器、标题、来源和摘要对应的元素和class
+CONTAINER_TAGS, CONTAINER_CLASSES = ('div',), ('result', 'result-op', 'result-tts', 'result-game-item')
+TITLE_TAGS, TITLE_CLASSES = ('h3', 'div'), ('t', 'result-title', 'result-op-title', 'tts-title')
+SOURCE_TAGS, SOURCE_CLASSES = ('span', 'div'), ('c-showurl', 'result-op-source', 'tts-source')
+CONTENT_TAGS, CONTENT_CLASSES = ('div', 'p'), ('c-abstract', 'content', 'op_exactqa_s_answer', 'c-span-last',
+                                               'result-game-desc', 'tts-content')
+
+# 提取文本时跳过的元素（与 BeautifulSoup 的 get_text 行为一致）
+SKIP_TEXT_TAGS = frozenset(['script', 'style', 'template'])
+
+# 按解析速度排列的解析后端
+BACKEND_PRIORITY = ('selectolax', 'lxml', 'html.parser')
+
+# 未指定后端时使用的解析后端（输出与原有实现一致，见模块说明）
+DEFAULT_BACKEND = 'html.parser'
+
+
+def _css(tags, classes):
+    return ', '.join(f'{tag}.{cls}' for tag in tags for cls in classes)
+
+
+def _xpath(tags, classes):
+    tag_test = ' or '.join(f'self::{tag}' for tag in tags)
+    class_test = ' or '.join(f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')" for cls in classes)
+    return f'({tag_test}) and ({class_test})'
+
+
+def _build_item(title, url, source, contents):
+    content = ' '.join(text for text in contents if text)
+    return {
+        'title': title,
+        'url': url,
+        'source': '未知' if source is None else source,
+        'content': content.strip(),
+    }
+
+
+class Bs4Parser:
+    """BeautifulSoup + html.parser 后端（纯Python，始终可用）"""
+
+    name = 'html.parser'
+
+    def __init__(self):
+        import soupsieve
+        from bs4 import BeautifulSoup
+        self._soup = BeautifulSoup
+        self._container = soupsieve.compile(_css(CONTAINER_TAGS, CONTAINER_CLASSES))
+        self._title = soupsieve.compile(_css(TITLE_TAGS, TITLE_CLASSES))
+        self._link = soupsieve.compile('a[href]')
+        self._source = soupsieve.compile(_css(SOURCE_TAGS, SOURCE_CLASSES))
+        self._content = soupsieve.compile(_css(CONTENT_TAGS, CONTENT_CLASSES))
+
+    def parse(self, html):
+        soup = self._soup(html, 'html.parser')
+        containers = self._container.select(soup)
+        if not containers:
+            return None
+
+        items = []
+        for idx, container in enumerate(containers):
+            try:
+                title_element = self._title.select_one(container)
+                if not title_element:
+                    continue
+                url_element = self._link.select_one(title_element)
+                if not url_element:
+                    continue
+                source_element = self._source.select_one(container)
+                items.append(_build_item(
+                    title_element.get_text(strip=True),
+                    url_element['href'],
+                    source_element.get_text(strip=True) if source_element else None,
+                    [element.get_text(strip=True) for element in self._content.select(container)],
+                ))
+            except Exception as e:
+                logger.error(f'解析第 {idx+1} 条结果时出错: {str(e)}')
+        return items
+
+
+class LxmlParser:
+    """lxml 后端，使用预编译的XPath"""
+
+    name = 'lxml'
+
+    def __init__(self):
+        import lxml.html
+        from lxml import etree
+        self._fromstring = lxml.html.fromstring
+        self._container = etree.XPath(f'//*[{_xpath(CONTAINER_TAGS, CONTAINER_CLASSES)}]')
+        self._title = etree.XPath(f'(.//*[{_xpath(TITLE_TAGS, TITLE_CLASSES)}])[1]')
+        self._link = etree.XPath('(.//a[@href])[1]')
+        self._source = etree.XPath(f'(.//*[{_xpath(SOURCE_TAGS, SOURCE_CLASSES)}])[1]')
+        self._content = etree.XPath(f'.//*[{_xpath(CONTENT_TAGS, CONTENT_CLASSES)}]')
+
+    @classmethod
+    def _text(cls, element):
+        parts = []
+        cls._collect_text(element, parts)
+        return ''.join(part.strip() for part in parts)
+
+    @classmethod
+    def _collect_text(cls, element, parts):
+        # 注释等非元素节点的tag不是字符串，跳过其内容但保留其后的tail文本
+        if not isinstance(element.tag, str) or element.tag in SKIP_TEXT_TAGS:
+            return
+        if element.text:
+            parts.append(element.text)
+        for child in element:
+            cls._collect_text(child, parts)
+            if child.tail:
+                parts.append(child.tail)
+
+    def parse(self, html):
+        if not html or not html.strip():
+            return None
+        root = self._fromstring(html)
+        containers = self._container(root)
+        if not containers:
+            return None
+
+        items = []
+        for idx, container in enumerate(containers):
+            try:
+                title_element = self._title(container)
+                if not title_element:
+                    continue
+                url_element = self._link(title_element[0])
+                if not url_element:
+                    continue
+                source_element = self._source(container)
+                items.append(_build_item(
+                    self._text(title_element[0]),
+                    url_element[0].get('href'),
+                    self._text(source_element[0]) if source_element else None,
+                    [self._text(element) for element in self._content(container)],
+                ))
+            except Exception as e:
+                logger.error(f'解析第 {idx+1} 条结果时出错: {str(e)}')
+        return items
+
+
+class SelectolaxParser:
+    """selectolax（lexbor引擎）后端"""
+
+    name = 'selectolax'
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._parser = LexborHTMLParser
+        self._container = _css(CONTAINER_TAGS, CONTAINER_CLASSES)
+        self._title = _css(TITLE_TAGS, TITLE_CLASSES)
+        self._source = _css(SOURCE_TAGS, SOURCE_CLASSES)
+        self._content = _css(CONTENT_TAGS, CONTENT_CLASSES)
+
+    @classmethod
+    def _text(cls, node):
+        parts = []
+        cls._collect_text(node, parts)
+        return ''.join(part.strip() for part in parts)
+
+    @classmethod
+    def _collect_text(cls, node, parts):
+        for child in node.iter(include_text=True):
+            tag = child.tag
+            if tag == '-text':
+                parts.append(child.text_content or '')
+            elif not tag.startswith('-') and tag not in SKIP_TEXT_TAGS:
+                cls._collect_text(child, parts)
+
+    def parse(self, html):
+        tree = self._parser(html)
+        containers = tree.css(self._container)
+        if not containers:
+            return None
+
+        items = []
+        for idx, container in enumerate(containers):
+            try:
+                title_element = container.css_first(self._title)
+                if title_element is None:
+                    continue
+                url_element = title_element.css_first('a[href]')
+                if url_element is None:
+                    continue
+                source_element = container.css_first(self._source)
+                items.append(_build_item(
+                    self._text(title_element),
+                    url_element.attributes.get('href') or '',
+                    self._text(source_element) if source_element is not None else None,
+                    [self._text(element) for element in container.css(self._content)],
+                ))
+            except Exception as e:
+                logger.error(f'解析第 {idx+1} 条结果时出错: {str(e)}')
+        return items
+
+
+_BACKENDS = {
+    'selectolax': SelectolaxParser,
+    'lxml': LxmlParser,
+    'html.parser': Bs4Parser,
+}
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def available_backends():
+    """返回当前环境中可用的解析后端名称（按解析速度排列）"""
+    names = []
+    for name in BACKEND_PRIORITY:
+        try:
+            get_parser(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def get_parser(backend=None):
+    """
+    获取解析器实例
+
+    参数:
+        backend: 后端名称；为None时使用 DEFAULT_BACKEND
+
+    异常:
+        ImportError: 指定的后端依赖的库没有安装
+    """
+    backend = backend or DEFAULT_BACKEND
+    with _instances_lock:
+        parser = _instances.get(backend)
+        if parser is None:
+            parser = _BACKENDS[backend]()
+            _instances[backend] = parser
+        return parser
+
+
+def parse_result_page(html, backend=None):
+    """
+    解析一页百度搜索结果
+
+    返回:
+        list 或 None: 结果列表（未去重），每个元素包含title, url, source, content；
+                      页面中没有结果容器时返回None
+    """
+    return get_parser(backend).parse(html)
+
+
+# 多页并发抓取时用于解析的进程池，首次使用时创建
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool(max_workers=None):
+    """返回共享的解析进程池（使用spawn方式启动，避免在多线程进程中fork）"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=max_workers,
+                                                mp_context=multiprocessing.get_context('spawn'))
+        return _process_pool
+
+
+def shutdown_process_pool():
+    """关闭共享的解析进程池"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown()
+            _process_pool = None
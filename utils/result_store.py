@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+服务器端搜索结果存储模块
+
+搜索结果保存在SQLite中，会话Cookie里只保留一个简短的搜索ID，
+避免整份结果随每个请求在客户端与服务器之间来回传输。
+"""
+
+import json
+import logging
+import secrets
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ResultStore:
+    """以搜索ID为键的搜索结果存储，支持TTL过期和容量上限"""
+
+    def __init__(self, db, ttl=3600, max_entries=1000, max_bytes=50 * 1024 * 1024):
+        """
+        参数:
+            db: 数据库连接池（utils.db.ConnectionPool）
+            ttl: 结果的有效期（秒）
+            max_entries: 最多保留的搜索结果集数量
+            max_bytes: 所有结果集序列化后的总大小上限（字节）
+        """
+        self.db = db
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._table_ready = False
+
+    def _ensure_table(self, conn):
+        if not self._table_ready:
+            self.init_table(conn)
+            self._table_ready = True
+
+    @staticmethod
+    def init_table(conn):
+        """创建结果存储表（如果不存在）"""
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS search_results (
+                search_id TEXT PRIMARY KEY,
+                keywords TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_search_results_created_at ON search_results (created_at)')
+        conn.commit()
+
+    def put(self, keywords, results):
+        """
+        保存一次搜索的结果
+
+        返回:
+            str: 新生成的搜索ID
+        """
+        search_id = secrets.token_urlsafe(8)
+        payload = json.dumps(results, ensure_ascii=False)
+        with self.db.connection() as conn:
+            self._ensure_table(conn)
+            conn.execute(
+                'INSERT INTO search_results (search_id, keywords, payload, size, created_at) VALUES (?, ?, ?, ?, ?)',
+                (search_id, keywords, payload, len(payload.encode('utf-8')), time.time())
+            )
+            self._evict(conn)
+        return search_id
+
+    def update(self, search_id, results):
+        """
+        替换一次搜索已保存的结果（逐页推送搜索结果时，每收到一页更新一次）
+
+        返回:
+            bool: ID不存在（已过期或被淘汰）时返回False
+        """
+        payload = json.dumps(results, ensure_ascii=False)
+        with self.db.connection() as conn:
+            self._ensure_table(conn)
+            cursor = conn.execute('UPDATE search_results SET payload = ?, size = ? WHERE search_id = ?',
+                                  (payload, len(payload.encode('utf-8')), search_id))
+        return cursor.rowcount > 0
+
+    def get(self, search_id):
+        """
+        读取搜索结果
+
+        返回:
+            dict 或 None: 包含keywords和results的字典；ID不存在或已过期时返回None
+        """
+        if not search_id:
+            return None
+        with self.db.connection() as conn:
+            self._ensure_table(conn)
+            row = conn.execute(
+                'SELECT keywords, payload FROM search_results WHERE search_id = ? AND created_at >= ?',
+                (search_id, time.time() - self.ttl)
+            ).fetchone()
+        if not row:
+            return None
+        return {'keywords': row[0], 'results': json.loads(row[1])}
+
+    def _evict(self, conn):
+        """删除过期结果，并按创建时间从旧到新淘汰超出容量上限的结果"""
+        conn.execute('DELETE FROM search_results WHERE created_at < ?', (time.time() - self.ttl,))
+
+        count, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM search_results').fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        evicted = 0
+        for search_id, size in conn.execute('SELECT search_id, size FROM search_results ORDER BY created_at').fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            # 至少保留最新的一条结果
+            if count <= 1:
+                break
+            conn.execute('DELETE FROM search_results WHERE search_id = ?', (search_id,))
+            count -= 1
+            total -= size
+            evicted += 1
+        logger.info(f'搜索结果存储超出容量上限，淘汰 {evicted} 条旧结果')
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库结构模块
+
+Web应用和各个命令行工具（关键词监控、批量搜索等）共用的建表和迁移入口。数据库
+结构版本记录在 PRAGMA user_version 中，已是当前版本的数据库直接跳过；还没有被
+应用打开过的旧数据库（例如只有最初的 users / data_warehouse 表）会在此时补建
+URL去重、全文索引、相似报道、趋势汇总和归档等各模块的表并迁移已有数据。
+"""
+
+import logging
+import time
+
+from utils import analytics, near_dup, warehouse_archive
+from utils.pdf_jobs import PdfJobQueue
+from utils.result_store import ResultStore
+from utils.search_cache import SqliteSearchCache
+from utils.warehouse import init_url_dedup
+from utils.warehouse_search import init_search_index
+
+logger = logging.getLogger(__name__)
+
+# 数据库结构版本：修改 create_schema 或其中调用的各模块 init_table 的表结构时加1
+SCHEMA_VERSION = 2
+
+
+def init_schema(conn):
+    """
+    数据库结构低于当前版本时建表和迁移，并记录新的版本号
+
+    参数:
+        conn: 数据库连接，事务由调用方提交
+
+    返回:
+        bool: 是否执行了建表和迁移
+    """
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return False
+    started = time.perf_counter()
+    create_schema(conn)
+    conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    logger.info(f'数据库结构已更新到版本 {SCHEMA_VERSION}，用时 {time.perf_counter() - started:.2f}s')
+    return True
+
+
+def create_schema(conn):
+    """创建全部表和索引（如果不存在），并迁移旧数据库中的已有数据"""
+    # 只在建表和迁移时用到的后台任务模块（监控进程需要爬虫，内容补全需要 requests / bs4），
+    # 它们的命令行入口也会导入本模块
+    from utils import monitor, enrichment
+
+    cursor = conn.cursor()
+
+    # 创建用户表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # 创建数据仓库表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS data_warehouse (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            source TEXT,
+            url TEXT NOT NULL,
+            content TEXT,
+            keywords TEXT NOT NULL,
+            crawled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            url_norm TEXT
+        )
+    ''')
+
+    # 创建规范化URL唯一索引（旧数据库会在此时合并重复记录）
+    init_url_dedup(conn)
+
+    # 创建全文索引和日期索引（旧数据库会在此时补建索引）
+    init_search_index(conn)
+
+    # 创建服务器端搜索结果存储表
+    ResultStore.init_table(conn)
+
+    # 创建搜索结果缓存表
+    SqliteSearchCache.init_table(conn)
+
+    # 创建PDF报告任务表
+    PdfJobQueue.init_table(conn)
+
+    # 创建关键词监控列表（由 python -m utils.monitor 后台进程使用）
+    monitor.init_table(conn)
+
+    # 创建落地页内容附表（由 python -m utils.enrichment 后台进程补全）
+    enrichment.init_table(conn)
+
+    # 创建归档分区登记表和已归档记录索引（由 python -m utils.warehouse_archive 后台任务归档）
+    warehouse_archive.init_table(conn)
+
+    # 创建相似报道签名表（旧数据库可用 python -m utils.near_dup backfill 补算）
+    near_dup.init_table(conn)
+
+    # 创建关键词趋势汇总表（旧数据库会在此时从已有数据生成汇总）
+    analytics.init_table(conn)
+
+    # 创建管理员用户（如果不存在）
+    cursor.execute('SELECT * FROM users WHERE username = ?', ('admin',))
+    if not cursor.fetchone():
+        cursor.execute('INSERT INTO users (username, password) VALUES (?, ?)', ('admin', 'admin888'))
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+百度搜索结果缓存模块
+
+按 (关键词, 页码) 缓存每一页解析后的搜索结果，相同关键词的搜索可以复用
+已经抓取过的页面，例如3页的搜索可以直接使用之前2页搜索缓存的前两页。
+提供内存和SQLite两种后端，都支持TTL过期和LRU淘汰，并统计命中/未命中次数。
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class SearchCache:
+    """搜索结果缓存基类，子类实现 _get/_set/_clear"""
+
+    def __init__(self, ttl=3600, max_entries=10000):
+        """
+        参数:
+            ttl: 缓存有效期（秒）
+            max_entries: 最多缓存的页面数，超出后淘汰最久未使用的页面
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def _key(keywords):
+        return keywords.strip()
+
+    def get(self, keywords, page):
+        """
+        读取缓存的一页结果
+
+        返回:
+            list 或 None: 未命中或已过期时返回None
+        """
+        items = self._get(self._key(keywords), page)
+        with self._stats_lock:
+            if items is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return items
+
+    def set(self, keywords, page, items):
+        """缓存一页结果"""
+        self._set(self._key(keywords), page, items)
+
+    def clear(self):
+        """清空缓存并重置计数"""
+        self._clear()
+        with self._stats_lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """返回命中/未命中计数"""
+        with self._stats_lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+    def _get(self, key, page):
+        raise NotImplementedError
+
+    def _set(self, key, page, items):
+        raise NotImplementedError
+
+    def _clear(self):
+        raise NotImplementedError
+
+
+class MemorySearchCache(SearchCache):
+    """进程内存中的搜索结果缓存"""
+
+    def __init__(self, ttl=3600, max_entries=10000):
+        super().__init__(ttl, max_entries)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key, page):
+        with self._lock:
+            entry = self._entries.get((key, page))
+            if entry is None:
+                return None
+            stored_at, items = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[(key, page)]
+                return None
+            self._entries.move_to_end((key, page))
+            return items
+
+    def _set(self, key, page, items):
+        with self._lock:
+            self._entries[(key, page)] = (time.time(), items)
+            self._entries.move_to_end((key, page))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SqliteSearchCache(SearchCache):
+    """保存在SQLite中的搜索结果缓存，可在多个进程之间共享"""
+
+    def __init__(self, db, ttl=3600, max_entries=10000):
+        """
+        参数:
+            db: 数据库连接池（utils.db.ConnectionPool）
+        """
+        super().__init__(ttl, max_entries)
+        self.db = db
+        self._table_ready = False
+
+    @staticmethod
+    def init_table(conn):
+        """创建缓存表（如果不存在）"""
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS search_cache (
+                keywords TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (keywords, page)
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_search_cache_accessed_at ON search_cache (accessed_at)')
+
+    def _ensure_table(self, conn):
+        if not self._table_ready:
+            self.init_table(conn)
+            self._table_ready = True
+
+    def _get(self, key, page):
+        now = time.time()
+        with self.db.connection() as conn:
+            self._ensure_table(conn)
+            row = conn.execute(
+                'SELECT payload FROM search_cache WHERE keywords = ? AND page = ? AND created_at >= ?',
+                (key, page, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE search_cache SET accessed_at = ? WHERE keywords = ? AND page = ?', (now, key, page))
+        return json.loads(row[0])
+
+    def _set(self, key, page, items):
+        now = time.time()
+        with self.db.connection() as conn:
+            self._ensure_table(conn)
+            conn.execute(
+                'INSERT OR REPLACE INTO search_cache (keywords, page, payload, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                (key, page, json.dumps(items, ensure_ascii=False), now, now)
+            )
+            # 删除过期页面，再按最近访问时间淘汰超出上限的页面
+            conn.execute('DELETE FROM search_cache WHERE created_at < ?', (now - self.ttl,))
+            conn.execute('''
+                DELETE FROM search_cache WHERE rowid IN (
+                    SELECT rowid FROM search_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
+
+    def _clear(self):
+        with self.db.connection() as conn:
+            self._ensure_table(conn)
+            conn.execute('DELETE FROM search_cache')
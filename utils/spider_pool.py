@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬虫会话池
+
+进程内共享一组已初始化的 BaiduSpider，每次搜索从池中借出一个、用完归还，
+不再每个请求新建爬虫：省去访问首页获取Cookie的往返，也能复用已建立的
+keep-alive 连接。Cookie过期的会话在下次借出使用时由爬虫自行重新初始化。
+
+池是线程安全的，同一时刻一个爬虫只会借给一个线程；池中爬虫都被借出时
+等待归还，等待超时后临时创建一个额外的爬虫，用完即关闭，请求不会因此失败。
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+SPIDERS_CREATED = metrics.counter('spider_pool_created_total', '爬虫会话池新建的爬虫数', ['kind'])
+ACQUIRE_WAIT_SECONDS = metrics.histogram('spider_pool_acquire_wait_seconds', '从爬虫会话池借出爬虫的等待时间（秒）')
+
+
+def _create_baidu_spider():
+    from utils.baidu_spider import BaiduSpider
+    return BaiduSpider()
+
+
+class SpiderPool:
+    """线程安全的 BaiduSpider 会话池"""
+
+    def __init__(self, factory=None, max_size=8, acquire_timeout=10):
+        """
+        参数:
+            factory: 创建爬虫的函数，例如 functools.partial(BaiduSpider, cache=...)；
+                     默认创建 BaiduSpider，在第一次创建爬虫时才导入爬虫模块
+            max_size: 池中最多保留的爬虫数，通常与WSGI服务器的工作线程数相当
+            acquire_timeout: 所有爬虫都被借出时最多等待的秒数，超时后临时创建额外的爬虫
+        """
+        self.factory = factory or _create_baidu_spider
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self._idle = []
+        self._overflow = set()
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def warm(self, count=None):
+        """
+        预先创建并初始化爬虫（访问首页获取Cookie），首批搜索无需等待初始化
+
+        返回:
+            int: 成功预热的爬虫数
+        """
+        count = min(count or self.max_size, self.max_size)
+        warmed = []
+        for _ in range(count):
+            spider = self._acquire()
+            warmed.append(spider)
+            try:
+                spider._initialize()
+            except Exception as e:
+                logger.warning(f'爬虫会话预热失败，将在首次使用时重新初始化: {str(e)}')
+        for spider in warmed:
+            self.release(spider)
+        ready = sum(1 for spider in warmed if spider.initialized)
+        logger.info(f'爬虫会话池预热完成: {ready}/{count}')
+        return ready
+
+    def _acquire(self):
+        start = time.perf_counter()
+        deadline = time.monotonic() + self.acquire_timeout
+        overflow = False
+        spider = None
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError('爬虫会话池已关闭')
+                if self._idle:
+                    # 后进先出：优先复用最近用过的爬虫，其连接最可能仍然有效
+                    spider = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f'爬虫会话池已满（{self.max_size}），临时创建额外的爬虫')
+                    overflow = True
+                    break
+                self._condition.wait(remaining)
+
+        if spider is None:
+            try:
+                spider = self.factory()
+            except Exception:
+                if not overflow:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                raise
+            if overflow:
+                with self._condition:
+                    self._overflow.add(spider)
+            SPIDERS_CREATED.labels('overflow' if overflow else 'pooled').inc()
+        ACQUIRE_WAIT_SECONDS.observe(time.perf_counter() - start)
+        return spider
+
+    def release(self, spider):
+        """归还爬虫；池已关闭或是临时创建的爬虫时直接关闭"""
+        with self._condition:
+            overflow = spider in self._overflow
+            self._overflow.discard(spider)
+            if not overflow and not self._closed:
+                self._idle.append(spider)
+                self._condition.notify()
+                return
+            if not overflow:
+                self._size -= 1
+        spider.close()
+
+    @contextmanager
+    def spider(self):
+        """
+        借出一个爬虫，退出时归还
+
+        搜索出错时把爬虫标记为需要重新初始化，下次使用前重新获取Cookie。
+        """
+        spider = self._acquire()
+        try:
+            yield spider
+        except Exception:
+            spider.invalidate()
+            raise
+        finally:
+            self.release(spider)
+
+    def stats(self):
+        """返回池的大小和空闲爬虫数"""
+        with self._condition:
+            return {'size': self._size, 'idle': len(self._idle), 'max_size': self.max_size}
+
+    def close(self):
+        """关闭池中所有空闲的爬虫，借出中的爬虫在归还时关闭"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for spider in idle:
+            spider.close()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据仓库写入模块
+
+按规范化后的URL去重：同一URL重复保存时不再插入新行，而是把新的搜索关键词
+合并到已有记录中。所有写入使用 executemany 批量执行，由调用方控制事务。
+新插入的记录同时计算相似报道签名（见 utils.near_dup），并累加关键词统计
+（见 utils.analytics）。已移入归档分区的URL（见 utils.warehouse_archive）同样
+只合并关键词，不会重新插入热数据表。
+"""
+
+import logging
+import sqlite3
+import sys
+import urllib.parse
+
+from utils import analytics, near_dup, warehouse_archive
+
+logger = logging.getLogger(__name__)
+
+# 关键词之间的分隔符
+KEYWORD_SEPARATOR = ','
+
+# 规范化URL时去掉的跟踪参数前缀
+TRACKING_PARAM_PREFIXES = ('utm_',)
+
+# 按 url_norm 插入新记录；已保存的URL在 save_items 中先行合并关键词，冲突子句只处理
+# 其他连接同时插入同一URL的情况（已包含该关键词时保持不变）
+UPSERT_SQL = f'''
+    INSERT INTO data_warehouse (title, source, url, content, keywords, url_norm)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (url_norm) DO UPDATE SET keywords = CASE
+        WHEN instr('{KEYWORD_SEPARATOR}' || keywords || '{KEYWORD_SEPARATOR}',
+                   '{KEYWORD_SEPARATOR}' || excluded.keywords || '{KEYWORD_SEPARATOR}') > 0 THEN keywords
+        ELSE keywords || '{KEYWORD_SEPARATOR}' || excluded.keywords
+    END
+'''
+
+
+def normalize_url(url):
+    """
+    规范化URL，用于判断两条记录是否指向同一页面
+
+    协议和域名转小写，去掉默认端口、锚点和跟踪参数，查询参数排序，
+    去掉路径末尾多余的斜杠。
+    """
+    url = (url or '').strip()
+    try:
+        parts = urllib.parse.urlsplit(url)
+    except ValueError:
+        return url
+
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme == 'http' and netloc.endswith(':80')) or (scheme == 'https' and netloc.endswith(':443')):
+        netloc = netloc.rsplit(':', 1)[0]
+
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/') or '/'
+
+    query = urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+    query = sorted((k, v) for k, v in query if not k.lower().startswith(TRACKING_PARAM_PREFIXES))
+
+    return urllib.parse.urlunsplit((scheme, netloc, path, urllib.parse.urlencode(query), ''))
+
+
+def merge_keywords(existing, new):
+    """合并两个关键词列表字符串，保持原有顺序并去掉重复项"""
+    merged = []
+    for value in (existing, new):
+        for keyword in (value or '').split(KEYWORD_SEPARATOR):
+            keyword = keyword.strip()
+            if keyword and keyword not in merged:
+                merged.append(keyword)
+    return KEYWORD_SEPARATOR.join(merged)
+
+
+def init_url_dedup(conn):
+    """
+    为 data_warehouse 建立规范化URL唯一索引（如果不存在）
+
+    旧数据库会先补齐 url_norm 列，再执行一次去重：同一URL的多条记录
+    只保留最早的一条，其余记录的关键词合并进去后删除。
+    """
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_data_warehouse_url_norm'")
+    if cursor.fetchone():
+        return
+
+    columns = [row[1] for row in cursor.execute('PRAGMA table_info(data_warehouse)')]
+    if 'url_norm' not in columns:
+        cursor.execute('ALTER TABLE data_warehouse ADD COLUMN url_norm TEXT')
+
+    rows = cursor.execute('SELECT id, url FROM data_warehouse WHERE url_norm IS NULL').fetchall()
+    cursor.executemany('UPDATE data_warehouse SET url_norm = ? WHERE id = ?',
+                       [(normalize_url(url), row_id) for row_id, url in rows])
+
+    removed = dedup_existing(conn)
+    cursor.execute('CREATE UNIQUE INDEX idx_data_warehouse_url_norm ON data_warehouse (url_norm)')
+    logger.info(f'数据仓库URL去重索引已创建，合并删除 {removed} 条重复记录')
+
+
+def dedup_existing(conn):
+    """
+    合并 url_norm 相同的重复记录
+
+    返回:
+        int: 删除的记录数
+    """
+    cursor = conn.cursor()
+    duplicates = cursor.execute('''
+        SELECT url_norm FROM data_warehouse
+        GROUP BY url_norm HAVING COUNT(*) > 1
+    ''').fetchall()
+
+    removed = 0
+    for (url_norm,) in duplicates:
+        rows = cursor.execute('SELECT id, keywords FROM data_warehouse WHERE url_norm = ? ORDER BY id',
+                              (url_norm,)).fetchall()
+        keep_id = rows[0][0]
+        keywords = ''
+        for _, row_keywords in rows:
+            keywords = merge_keywords(keywords, row_keywords)
+        cursor.execute('UPDATE data_warehouse SET keywords = ? WHERE id = ?', (keywords, keep_id))
+        cursor.executemany('DELETE FROM data_warehouse WHERE id = ?', [(row_id,) for row_id, _ in rows[1:]])
+        removed += len(rows) - 1
+    return removed
+
+
+def save_items(conn, items, keywords):
+    """
+    批量保存搜索结果，已存在的URL只合并关键词
+
+    参数:
+        conn: 数据库连接，事务由调用方提交
+        items: 搜索结果列表，每个元素包含 title, source, url, content
+        keywords: 这批结果对应的搜索关键词，多个关键词用 KEYWORD_SEPARATOR 分隔
+
+    返回:
+        tuple: (新插入的条数, 合并到已有记录的条数)
+    """
+    rows = []
+    seen = set()
+    for item in items:
+        url_norm = normalize_url(item['url'])
+        if url_norm in seen:
+            continue
+        seen.add(url_norm)
+        rows.append((item['title'], item['source'], item['url'], item['content'], keywords, url_norm))
+
+    if not rows:
+        return 0, 0
+
+    new_keywords = analytics.split_keywords(keywords)
+    existing = {}
+    updates = []
+    for url_norm, old_keywords, day, source in _select_by_url_norm(
+            conn, 'url_norm, keywords, DATE(crawled_at), source', [row[5] for row in rows]):
+        existing[url_norm] = (old_keywords, day, source)
+        # 逐个关键词合并（一次可能带多个关键词），已全部包含时不更新
+        merged = merge_keywords(old_keywords, keywords)
+        if merged != old_keywords:
+            updates.append((merged, url_norm))
+    conn.executemany('UPDATE data_warehouse SET keywords = ? WHERE url_norm = ?', updates)
+
+    # 已归档的记录在所属分区中合并关键词
+    archived = warehouse_archive.find_archived(conn, [row[5] for row in rows if row[5] not in existing])
+    for url_norm, (row_id, partition, old_keywords, day, source) in archived.items():
+        merged = merge_keywords(old_keywords, keywords)
+        if merged != old_keywords:
+            warehouse_archive.update_keywords(conn, partition, row_id, merged)
+        existing[url_norm] = (old_keywords, day, source)
+    conn.executemany(UPSERT_SQL, [row for row in rows if row[5] not in existing])
+
+    # 已保存的文章第一次带上这个关键词时也计入关键词统计
+    entries = [(keyword, day, source) for old_keywords, day, source in existing.values()
+               for keyword in new_keywords if keyword not in analytics.split_keywords(old_keywords)]
+
+    new_urls = [row[5] for row in rows if row[5] not in existing]
+    new_rows = sorted(tuple(row) for row in _select_by_url_norm(
+        conn, 'id, title, content, DATE(crawled_at), source', new_urls))
+    near_dup.index_rows(conn, (row[:3] for row in new_rows))
+    entries.extend((keyword, day, source) for _, _, _, day, source in new_rows for keyword in new_keywords)
+    analytics.record(conn, entries)
+    return len(new_urls), len(existing)
+
+
+def find_existing(conn, url_norms):
+    """
+    查询哪些规范化URL已经保存在数据仓库中（包括已归档的记录）
+
+    返回:
+        set: 已存在的规范化URL
+    """
+    url_norms = list(url_norms)
+    existing = {row[0] for row in _select_by_url_norm(conn, 'url_norm', url_norms)}
+    return existing | set(warehouse_archive.find_archived(conn, [url for url in url_norms if url not in existing]))
+
+
+def _select_by_url_norm(conn, columns, url_norms):
+    """按规范化URL查询数据仓库中的记录，逐行返回指定的列"""
+    url_norms = list(url_norms)
+    # 分批查询，避免超过SQLite的参数个数上限
+    for start in range(0, len(url_norms), 500):
+        chunk = url_norms[start:start + 500]
+        placeholders = ','.join(['?'] * len(chunk))
+        yield from conn.execute(f'SELECT {columns} FROM data_warehouse WHERE url_norm IN ({placeholders})', chunk)
+
+
+def migrate(db_path):
+    """为已有的数据库文件补建URL去重索引并合并重复记录"""
+    conn = sqlite3.connect(db_path)
+    try:
+        init_url_dedup(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    # 用法: python -m utils.warehouse [数据库路径]
+    path = sys.argv[1] if len(sys.argv) > 1 else 'data.db'
+    migrate(path)
+    print(f'已完成数据仓库URL去重迁移: {path}')
@@ -0,0 +1,573 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据仓库归档模块
+
+data_warehouse 只保留最近的热数据；保存时间早于 ARCHIVE_AFTER_DAYS 天的记录由
+归档任务按保存月份移入分区表 data_warehouse_archive_YYYYMM，content 用 zlib 压缩
+存储。单条摘要只有几百字节，单独压缩几乎没有效果，因此每个分区在创建时用第一批
+归档记录的内容生成一个预置字典（zdict），分区内的记录都以它为基础压缩。
+记录移入分区后id不变，相似报道签名保留；落地页内容补全（见 utils.enrichment）只处理
+热数据，记录归档时删除其 page_content 附表中的内容:
+    warehouse_partitions            每个分区的记录数、保存时间范围、压缩字典和压缩前后的大小
+    data_warehouse_archived         已归档记录的 id -> 分区，以及规范化URL（保存时去重）
+    data_warehouse_archive_fts      已归档记录的全文索引（不保存原文，只用于检索）
+
+数据仓库页面、导出和PDF报告通过 select_page / export_queries / fetch_rows 同时查询
+热数据表和各分区，只解压返回的记录；按保存时间范围跳过不可能包含结果的分区。
+归档和压缩整理在后台运行:
+    python -m utils.warehouse_archive archive --older-than 180
+    python -m utils.warehouse_archive compact
+    python -m utils.warehouse_archive status
+"""
+
+import argparse
+import datetime
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import sys
+import time
+import zlib
+
+from utils import near_dup
+from utils.warehouse_search import build_filters, build_keyset
+
+logger = logging.getLogger(__name__)
+
+# 保存时间早于该天数的记录移入归档分区
+ARCHIVE_AFTER_DAYS = 180
+
+# 归档时每批移动的记录数（每批一个事务）
+ARCHIVE_BATCH = 2000
+
+# zlib 压缩级别
+COMPRESS_LEVEL = 6
+
+# 分区压缩字典的最大字节数（zlib 预置字典最多使用32KB）
+DICTIONARY_SIZE = 32 * 1024
+
+# 数据仓库的列（分区表的列顺序相同，content 为压缩后的BLOB）
+WAREHOUSE_COLUMNS = ('id', 'title', 'source', 'url', 'content', 'keywords', 'crawled_at', 'url_norm')
+
+# 分区表名前缀，后接保存月份 YYYYMM
+PARTITION_PREFIX = 'data_warehouse_archive_'
+
+# 在SQL中解压 content 的函数名
+UNZIP_FUNCTION = 'warehouse_unzip'
+
+ARCHIVE_FTS_TABLE = 'data_warehouse_archive_fts'
+
+_MONTH_PATTERN = re.compile(r'\d{4}-\d{2}')
+
+# 比任何保存时间都大的上界，表示热数据表
+_HOT_BOUND = '9999'
+
+# 压缩字典编号 -> 字典内容（字典内容不会改变，按内容哈希编号，可在不同数据库间共用缓存）
+_dictionaries = {0: b''}
+
+
+def init_table(conn):
+    """创建分区登记表、已归档记录索引和归档全文索引（如果不存在）"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS warehouse_partitions (
+            name TEXT PRIMARY KEY,
+            month TEXT NOT NULL UNIQUE,
+            rows INTEGER NOT NULL DEFAULT 0,
+            min_crawled_at TEXT,
+            max_crawled_at TEXT,
+            raw_bytes INTEGER NOT NULL DEFAULT 0,
+            stored_bytes INTEGER NOT NULL DEFAULT 0,
+            dictionary_id INTEGER NOT NULL DEFAULT 0,
+            dictionary BLOB,
+            updated_at REAL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS data_warehouse_archived (
+            id INTEGER PRIMARY KEY,
+            partition TEXT NOT NULL,
+            url_norm TEXT
+        )
+    ''')
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_data_warehouse_archived_url_norm '
+                 'ON data_warehouse_archived (url_norm)')
+    # 不保存原文（content=''），删除或更新时需要提供原来的各列
+    conn.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS {ARCHIVE_FTS_TABLE} USING fts5(
+            title, content, source, keywords, content='', tokenize='trigram'
+        )
+    ''')
+
+
+def build_dictionary(texts):
+    """
+    用一批内容生成压缩字典：最近的内容放在字典末尾（zlib 对字典末尾的匹配编码更短）
+
+    返回:
+        tuple: (字典编号, 字典内容)；没有内容时为 (0, b'')
+    """
+    dictionary = '\n'.join(text for text in texts if text).encode('utf-8')[-DICTIONARY_SIZE:]
+    if not dictionary:
+        return 0, b''
+    # 编号取内容哈希的前7个字节，保证是正的64位整数
+    return int.from_bytes(hashlib.blake2b(dictionary, digest_size=7).digest(), 'big'), dictionary
+
+
+def compress_text(text, dictionary=b''):
+    if text is None:
+        return None
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, -15, zdict=dictionary) if dictionary else \
+        zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, -15)
+    return compressor.compress(text.encode('utf-8')) + compressor.flush()
+
+
+def decompress_text(data, dictionary=b''):
+    if data is None:
+        return None
+    decompressor = zlib.decompressobj(-15, zdict=dictionary) if dictionary else zlib.decompressobj(-15)
+    return (decompressor.decompress(data) + decompressor.flush()).decode('utf-8')
+
+
+def _unzip(data, dictionary_id):
+    return decompress_text(data, _dictionaries[dictionary_id])
+
+
+def register_functions(conn, partitions):
+    """
+    在连接上注册解压 content 的SQL函数 warehouse_unzip(content, 字典编号)，
+    并载入这些分区中还没有缓存的压缩字典
+    """
+    missing = list({partition[3] for partition in partitions} - _dictionaries.keys())
+    if missing:
+        placeholders = ','.join(['?'] * len(missing))
+        _dictionaries.update(conn.execute(f'SELECT dictionary_id, dictionary FROM warehouse_partitions '
+                                          f'WHERE dictionary_id IN ({placeholders})', missing))
+    conn.create_function(UNZIP_FUNCTION, 2, _unzip, deterministic=True)
+
+
+def partition_name(month):
+    """
+    保存月份（YYYY-MM）对应的分区表名
+
+    异常:
+        ValueError: 月份格式不正确
+    """
+    if not _MONTH_PATTERN.fullmatch(month or ''):
+        raise ValueError(f'无效的分区月份: {month}')
+    return PARTITION_PREFIX + month.replace('-', '')
+
+
+def list_partitions(conn):
+    """
+    按保存时间从新到旧列出归档分区
+
+    数据库还没有创建归档表（例如只读打开的旧数据库）时返回空列表。
+
+    返回:
+        list: (表名, 最早保存时间, 最晚保存时间, 压缩字典编号)
+    """
+    try:
+        return conn.execute('SELECT name, min_crawled_at, max_crawled_at, dictionary_id FROM warehouse_partitions '
+                            'WHERE rows > 0 ORDER BY max_crawled_at DESC').fetchall()
+    except sqlite3.OperationalError as e:
+        if 'no such table' in str(e):
+            return []
+        raise
+
+
+def _ensure_partition(conn, month, texts):
+    """
+    创建分区（如果不存在），新分区用 texts 生成压缩字典
+
+    返回:
+        tuple: (表名, 压缩字典)
+    """
+    name = partition_name(month)
+    row = conn.execute('SELECT dictionary FROM warehouse_partitions WHERE name = ?', (name,)).fetchone()
+    if row is not None:
+        return name, row[0] or b''
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            source TEXT,
+            url TEXT NOT NULL,
+            content BLOB,
+            keywords TEXT NOT NULL,
+            crawled_at TIMESTAMP,
+            url_norm TEXT
+        )
+    ''')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{name}_crawled_at ON {name} (crawled_at)')
+    dictionary_id, dictionary = build_dictionary(texts)
+    conn.execute('INSERT INTO warehouse_partitions (name, month, dictionary_id, dictionary) VALUES (?, ?, ?, ?)',
+                 (name, month, dictionary_id, dictionary))
+    _dictionaries[dictionary_id] = dictionary
+    return name, dictionary
+
+
+def _content_expression(partition):
+    """分区中解压 content 的SQL表达式"""
+    return f'{UNZIP_FUNCTION}(content, {int(partition[3])})'
+
+
+def _select_columns(columns=WAREHOUSE_COLUMNS, partition=None):
+    """查询分区（partition 不为None）时在SQL中解压 content"""
+    return ', '.join(f'{_content_expression(partition)} AS content' if partition and column == 'content' else column
+                     for column in columns)
+
+
+def _partition_filters(partition, keywords, date, text):
+    return build_filters(keywords, date, text, fts_table=ARCHIVE_FTS_TABLE,
+                         content_column=_content_expression(partition))
+
+
+def _overlaps(partition, date, after):
+    """分区的保存时间范围是否可能包含满足日期条件和分页游标的记录"""
+    _, min_crawled_at, max_crawled_at, _ = partition
+    if date:
+        day = datetime.datetime.strptime(date, '%Y-%m-%d').date()
+        if max_crawled_at < day.isoformat() or min_crawled_at >= (day + datetime.timedelta(days=1)).isoformat():
+            return False
+    if after and min_crawled_at > after.rpartition('|')[0]:
+        return False
+    return True
+
+
+def select_page(conn, keywords='', date='', text='', after='', limit=50, collapse=False):
+    """
+    按检索条件从热数据表和归档分区中按 (crawled_at, id) 倒序取最多 limit 行
+
+    先查询热数据表，再按保存时间从新到旧依次查询分区；已取到的记录比之后所有分区
+    的最晚保存时间都新时立即输出，取够 limit 行后不再查询更早的分区。没有分区时
+    直接逐行返回热数据表的游标。
+
+    参数:
+        conn: 数据库连接
+        keywords, date, text: 与 utils.warehouse_search.build_filters 相同的检索条件
+        after: 分页游标（utils.warehouse_search.encode_cursor）
+        limit: 最多返回的行数
+        collapse: 是否合并相似报道（每组只返回检索结果中最早保存的记录，并带 duplicate_count 列，
+                  即检索结果中同组其他记录的条数）
+
+    返回:
+        iterator: 数据行，列见 WAREHOUSE_COLUMNS（collapse 时多一列 duplicate_count）
+
+    异常:
+        ValueError: 日期或游标格式不正确
+    """
+    keyset, keyset_params = build_keyset(after)
+    filters, params = build_filters(keywords, date, text)
+    # 分页游标之外的分区也可能有同组的记录，合并相似报道时按全部满足日期条件的分区判断
+    candidates = [partition for partition in list_partitions(conn) if _overlaps(partition, date, '')]
+    if candidates:
+        register_functions(conn, candidates)
+    tables = [(None, 'data_warehouse', filters, params)]
+    for partition in candidates:
+        tables.append((partition, partition[0]) + _partition_filters(partition, keywords, date, text))
+    # 没有检索条件时所有有签名的记录都在结果中，不需要逐条判断同组记录是否满足条件
+    members = [table[1:] for table in tables] if keywords or date or text else None
+
+    order = ' ORDER BY crawled_at DESC, id DESC LIMIT ?'
+    sources = []
+    for partition, name, table_filters, table_params in tables:
+        if partition and not _overlaps(partition, date, after):
+            continue
+        columns = _select_columns(partition=partition)
+        column_params = []
+        if collapse:
+            count_column, column_params = near_dup.duplicate_count_column(name, members)
+            collapse_sql, collapse_params = near_dup.collapse_filter(name, members)
+            columns = f'{columns}, {count_column}'
+            table_filters += collapse_sql
+            table_params = table_params + collapse_params
+        sources.append((partition[2] if partition else _HOT_BOUND,
+                        f'SELECT {columns} FROM {name} WHERE 1=1{table_filters}{keyset}{order}',
+                        column_params + table_params + keyset_params))
+
+    if len(sources) == 1:
+        _, sql, source_params = sources[0]
+        return conn.execute(sql, source_params + [limit])
+    return _iter_merged(conn, sources, limit)
+
+
+def _sort_key(row):
+    # crawled_at 和 id 分别是第7列和第1列（见 WAREHOUSE_COLUMNS）
+    return row[6] or '', row[0]
+
+
+def _iter_merged(conn, sources, limit):
+    emitted = 0
+    pending = []
+    for bound, sql, params in sources:
+        if pending:
+            # 之后的分区中不会有比 bound 更晚保存的记录，这些记录的顺序已经确定
+            pending.sort(key=_sort_key, reverse=True)
+            ready = 0
+            while ready < len(pending) and emitted + ready < limit and (pending[ready][6] or '') > bound:
+                ready += 1
+            yield from pending[:ready]
+            emitted += ready
+            del pending[:ready]
+        if emitted >= limit:
+            return
+        pending.extend(conn.execute(sql, params + [limit - emitted]))
+    pending.sort(key=_sort_key, reverse=True)
+    yield from pending[:limit - emitted]
+
+
+def export_queries(conn, columns, keywords='', date='', text=''):
+    """
+    导出时依次执行的查询：热数据表和满足日期条件的各个分区
+
+    不加 ORDER BY：按日期等条件过滤时排序需要在临时B树中缓存全部结果，
+    而导出只需要按索引/rowid 的自然顺序逐行输出。
+
+    参数:
+        columns: 导出的列名，content 在分区中解压后返回
+
+    返回:
+        list: (SQL, 参数列表)
+
+    异常:
+        ValueError: 日期格式不正确
+    """
+    filters, params = build_filters(keywords, date, text)
+    queries = [(f"SELECT {', '.join(columns)} FROM data_warehouse WHERE 1=1{filters}", params)]
+    partitions = [partition for partition in list_partitions(conn) if _overlaps(partition, date, '')]
+    if partitions:
+        register_functions(conn, partitions)
+    for partition in partitions:
+        partition_filters, partition_params = _partition_filters(partition, keywords, date, text)
+        queries.append((f'SELECT {_select_columns(columns, partition)} FROM {partition[0]} '
+                        f'WHERE 1=1{partition_filters}', partition_params))
+    return queries
+
+
+def fetch_rows(conn, ids):
+    """
+    按id读取记录（热数据表中没有的到所属分区中读取）
+
+    返回:
+        list: 数据行，列见 WAREHOUSE_COLUMNS
+    """
+    ids = list(ids)
+    rows = []
+    missing = []
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        placeholders = ','.join(['?'] * len(chunk))
+        found = conn.execute(f'SELECT {_select_columns()} FROM data_warehouse WHERE id IN ({placeholders})',
+                             chunk).fetchall()
+        rows.extend(found)
+        found_ids = {row[0] for row in found}
+        missing.extend(row_id for row_id in chunk if row_id not in found_ids)
+    partitions = {partition[0]: partition for partition in list_partitions(conn)} if missing else {}
+    if not partitions:
+        return rows
+
+    register_functions(conn, partitions.values())
+    by_partition = {}
+    for start in range(0, len(missing), 500):
+        chunk = missing[start:start + 500]
+        placeholders = ','.join(['?'] * len(chunk))
+        for row_id, name in conn.execute(
+                f'SELECT id, partition FROM data_warehouse_archived WHERE id IN ({placeholders})', chunk):
+            by_partition.setdefault(name, []).append(row_id)
+    for name, partition_ids in by_partition.items():
+        placeholders = ','.join(['?'] * len(partition_ids))
+        rows.extend(conn.execute(f'SELECT {_select_columns(partition=partitions[name])} FROM {name} '
+                                 f'WHERE id IN ({placeholders})', partition_ids))
+    return rows
+
+
+def find_archived(conn, url_norms):
+    """
+    按规范化URL查询已归档的记录
+
+    返回:
+        dict: 规范化URL -> (id, 分区表名, keywords, 保存日期, source)
+    """
+    url_norms = list(url_norms)
+    if not url_norms or not list_partitions(conn):
+        return {}
+    by_partition = {}
+    for start in range(0, len(url_norms), 500):
+        chunk = url_norms[start:start + 500]
+        placeholders = ','.join(['?'] * len(chunk))
+        for row_id, name in conn.execute(
+                f'SELECT id, partition FROM data_warehouse_archived WHERE url_norm IN ({placeholders})', chunk):
+            by_partition.setdefault(name, []).append(row_id)
+    archived = {}
+    for name, row_ids in by_partition.items():
+        placeholders = ','.join(['?'] * len(row_ids))
+        for row_id, url_norm, keywords, day, source in conn.execute(
+                f'SELECT id, url_norm, keywords, DATE(crawled_at), source FROM {name} WHERE id IN ({placeholders})',
+                row_ids):
+            archived[url_norm] = (row_id, name, keywords, day, source)
+    return archived
+
+
+def update_keywords(conn, name, row_id, keywords):
+    """更新已归档记录的关键词，同步归档全文索引；事务由调用方提交"""
+    title, source, content, old_keywords = conn.execute(
+        f'SELECT title, source, content, keywords FROM {name} WHERE id = ?', (row_id,)).fetchone()
+    dictionary = conn.execute('SELECT dictionary FROM warehouse_partitions WHERE name = ?', (name,)).fetchone()[0]
+    content = decompress_text(content, dictionary or b'')
+    conn.execute(f"INSERT INTO {ARCHIVE_FTS_TABLE} ({ARCHIVE_FTS_TABLE}, rowid, title, content, source, keywords) "
+                 f"VALUES ('delete', ?, ?, ?, ?, ?)", (row_id, title, content, source, old_keywords))
+    conn.execute(f'INSERT INTO {ARCHIVE_FTS_TABLE} (rowid, title, content, source, keywords) VALUES (?, ?, ?, ?, ?)',
+                 (row_id, title, content, source, keywords))
+    conn.execute(f'UPDATE {name} SET keywords = ? WHERE id = ?', (keywords, row_id))
+
+
+def archive(conn, older_than_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH, progress=None):
+    """
+    把保存时间早于 older_than_days 天的记录移入按月分区的归档表，每批提交一次
+
+    参数:
+        conn: 数据库连接
+        older_than_days: 保留在热数据表中的天数
+        batch_size: 每批移动的记录数
+        progress: 可选的回调，每批完成后以已归档的记录数调用
+
+    返回:
+        int: 归档的记录数
+    """
+    cutoff = (datetime.datetime.now(datetime.timezone.utc)
+              - datetime.timedelta(days=older_than_days)).strftime('%Y-%m-%d %H:%M:%S')
+    columns = ', '.join(WAREHOUSE_COLUMNS)
+    placeholders = ', '.join(['?'] * len(WAREHOUSE_COLUMNS))
+    start = time.perf_counter()
+    has_page_content = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'page_content'").fetchone() is not None
+    if has_page_content:
+        # 清理之前归档时正在补全、归档后才写入的内容
+        conn.execute('DELETE FROM page_content WHERE warehouse_id IN (SELECT id FROM data_warehouse_archived)')
+    total = 0
+    while True:
+        rows = conn.execute(f'SELECT {columns} FROM data_warehouse WHERE crawled_at < ? ORDER BY crawled_at LIMIT ?',
+                            (cutoff, batch_size)).fetchall()
+        if not rows:
+            break
+        by_month = {}
+        for row in rows:
+            month = row[6][:7] if _MONTH_PATTERN.match(row[6] or '') else '0000-00'
+            by_month.setdefault(month, []).append(row)
+
+        for month, month_rows in by_month.items():
+            name, dictionary = _ensure_partition(conn, month, [row[4] for row in month_rows])
+            compressed = [row[:4] + (compress_text(row[4], dictionary),) + row[5:] for row in month_rows]
+            conn.executemany(f'INSERT INTO {name} ({columns}) VALUES ({placeholders})', compressed)
+            # 先登记已归档的id，删除热数据时相似报道签名的触发器据此保留签名
+            conn.executemany('INSERT INTO data_warehouse_archived (id, partition, url_norm) VALUES (?, ?, ?)',
+                             [(row[0], name, row[7]) for row in month_rows])
+            conn.executemany(f'INSERT INTO {ARCHIVE_FTS_TABLE} (rowid, title, content, source, keywords) '
+                             f'VALUES (?, ?, ?, ?, ?)', [(row[0], row[1], row[4], row[2], row[5]) for row in month_rows])
+            crawled = [row[6] for row in month_rows if row[6]]
+            conn.execute('''
+                UPDATE warehouse_partitions SET
+                    rows = rows + ?,
+                    min_crawled_at = MIN(COALESCE(min_crawled_at, ?), ?),
+                    max_crawled_at = MAX(COALESCE(max_crawled_at, ?), ?),
+                    raw_bytes = raw_bytes + ?,
+                    stored_bytes = stored_bytes + ?,
+                    updated_at = ?
+                WHERE name = ?
+            ''', (len(month_rows), min(crawled, default=''), min(crawled, default=''),
+                  max(crawled, default=''), max(crawled, default=''),
+                  sum(len((row[4] or '').encode('utf-8')) for row in month_rows),
+                  sum(len(row[4] or b'') for row in compressed), time.time(), name))
+
+        conn.executemany('DELETE FROM data_warehouse WHERE id = ?', [(row[0],) for row in rows])
+        if has_page_content:
+            conn.executemany('DELETE FROM page_content WHERE warehouse_id = ?', [(row[0],) for row in rows])
+        conn.commit()
+        total += len(rows)
+        if progress:
+            progress(total)
+    logger.info(f'数据仓库归档完成: {total} 条早于 {cutoff} 的记录移入归档分区，用时 {time.perf_counter() - start:.1f}s')
+    return total
+
+
+def compact(conn):
+    """
+    整理数据库：合并全文索引段、更新查询统计信息，VACUUM 回收归档后空出的页面
+
+    VACUUM 期间其他连接不能写入，应在访问量低时运行。
+
+    返回:
+        tuple: (整理前的文件大小, 整理后的文件大小)，单位字节
+    """
+    path = conn.execute('PRAGMA database_list').fetchone()[2]
+    before = os.path.getsize(path)
+    start = time.perf_counter()
+    conn.execute("INSERT INTO data_warehouse_fts (data_warehouse_fts) VALUES ('optimize')")
+    conn.execute(f"INSERT INTO {ARCHIVE_FTS_TABLE} ({ARCHIVE_FTS_TABLE}) VALUES ('optimize')")
+    conn.commit()
+    conn.execute('PRAGMA optimize')
+    conn.execute('VACUUM')
+    # WAL模式下检查点完成后数据库文件才会变小
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    after = os.path.getsize(path)
+    logger.info(f'数据库整理完成: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB，用时 {time.perf_counter() - start:.1f}s')
+    return before, after
+
+
+def status(conn):
+    """
+    返回:
+        dict: hot_rows 热数据表记录数，partitions 各分区的统计（按月份升序）
+    """
+    partitions = [dict(zip(('name', 'month', 'rows', 'min_crawled_at', 'max_crawled_at', 'raw_bytes', 'stored_bytes'),
+                           row))
+                  for row in conn.execute('SELECT name, month, rows, min_crawled_at, max_crawled_at, raw_bytes, '
+                                          'stored_bytes FROM warehouse_partitions ORDER BY month')]
+    hot_rows = conn.execute('SELECT COUNT(*) FROM data_warehouse').fetchone()[0]
+    return {'hot_rows': hot_rows, 'partitions': partitions}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='数据仓库归档')
+    parser.add_argument('--db', default='data.db', help='数据库文件路径')
+    sub = parser.add_subparsers(dest='command', required=True)
+    archive_parser = sub.add_parser('archive', help='把较早保存的记录移入按月分区的归档表')
+    archive_parser.add_argument('--older-than', type=int, default=ARCHIVE_AFTER_DAYS,
+                                help='保存时间早于该天数的记录被归档')
+    archive_parser.add_argument('--batch', type=int, default=ARCHIVE_BATCH, help='每批移动的记录数')
+    archive_parser.add_argument('--compact', action='store_true', help='归档完成后整理数据库（VACUUM）')
+    sub.add_parser('compact', help='整理数据库，回收归档后空出的空间')
+    sub.add_parser('status', help='查看热数据和各归档分区的记录数与大小')
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        conn.execute('PRAGMA busy_timeout = 5000')
+        # 本模块是 utils.schema 的依赖，在函数内导入避免循环导入
+        from utils import schema
+        schema.init_schema(conn)
+        conn.commit()
+        if args.command == 'archive':
+            total = archive(conn, args.older_than, args.batch,
+                            progress=lambda total: print(f'已归档 {total} 条', end='\r'))
+            print(f'\n归档完成: {total} 条')
+        if args.command == 'compact' or (args.command == 'archive' and args.compact):
+            before, after = compact(conn)
+            print(f'整理完成: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB')
+        if args.command == 'status':
+            info = status(conn)
+            print(f"热数据: {info['hot_rows']} 条")
+            for partition in info['partitions']:
+                ratio = partition['stored_bytes'] / partition['raw_bytes'] if partition['raw_bytes'] else 0
+                print(f"{partition['month']}\t{partition['rows']} 条\t内容 {partition['raw_bytes'] / 1e6:.1f} MB -> "
+                      f"{partition['stored_bytes'] / 1e6:.1f} MB（{ratio:.0%}）")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据仓库批量导出模块
+
+按与数据仓库页面相同的关键词/日期/全文检索条件导出 data_warehouse 及各归档分区中的数据，
+支持 CSV、JSON Lines（NDJSON）和 Parquet（需要安装 pyarrow）三种格式。
+数据从游标中按块读取、边编码边输出，可选 gzip 实时压缩，内存占用与导出行数无关。
+
+用法:
+    python -m utils.warehouse_export --format csv -o export.csv.gz
+    python -m utils.warehouse_export --format ndjson --keywords 人工智能 --date 2024-06-18 -o -
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import sys
+import time
+import zlib
+
+from utils.db import ConnectionPool
+from utils.warehouse_archive import export_queries
+
+logger = logging.getLogger(__name__)
+
+# 导出的列（按输出顺序）
+EXPORT_COLUMNS = ('id', 'title', 'source', 'url', 'content', 'keywords', 'crawled_at')
+
+# 每次从游标读取并编码的行数
+EXPORT_CHUNK_SIZE = 2000
+
+# 支持的导出格式: 格式名 -> (MIME类型, 文件扩展名)
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson; charset=utf-8', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def iter_row_chunks(conn, query, params, chunk_size=EXPORT_CHUNK_SIZE):
+    """逐块读取查询结果，每次最多 chunk_size 行"""
+    cursor = conn.execute(query, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+
+def iter_query_chunks(conn, queries, chunk_size=EXPORT_CHUNK_SIZE):
+    """依次逐块读取多个查询（热数据表和各归档分区）的结果"""
+    for query, params in queries:
+        yield from iter_row_chunks(conn, query, params, chunk_size)
+
+
+def encode_csv(chunks):
+    """把行块编码为CSV（带BOM，便于Excel正确识别中文）"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def encode_ndjson(chunks):
+    """把行块编码为JSON Lines，每行一个JSON对象"""
+    for rows in chunks:
+        lines = [json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) for row in rows]
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class _ChunkSink:
+    """供 pyarrow 写入的只追加输出流，写入的数据可以随时取走"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError('导出Parquet格式需要安装 pyarrow')
+    return pyarrow, pyarrow.parquet
+
+
+def encode_parquet(chunks):
+    """把行块编码为Parquet，每个行块写成一个行组（列内使用zstd压缩）"""
+    pa, pq = _require_pyarrow()
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('title', pa.string()),
+        ('source', pa.string()),
+        ('url', pa.string()),
+        ('content', pa.string()),
+        ('keywords', pa.string()),
+        ('crawled_at', pa.string()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema, compression='zstd')
+    try:
+        for rows in chunks:
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+            ))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def gzip_stream(parts, level=6):
+    """对字节流做gzip实时压缩"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for part in parts:
+        data = compressor.compress(part)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+_ENCODERS = {
+    'csv': encode_csv,
+    'ndjson': encode_ndjson,
+    'parquet': encode_parquet,
+}
+
+
+def export_stream(conn, fmt='csv', keywords='', date='', text='', compress=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    按检索条件导出数据仓库
+
+    格式、日期和依赖库在调用时立即检查，返回的生成器在迭代时才开始查询。
+
+    参数:
+        conn: 数据库连接，导出期间一直使用，由调用方关闭
+        fmt: 导出格式，见 EXPORT_FORMATS
+        keywords, date, text: 与数据仓库页面相同的检索条件
+        compress: 是否gzip压缩（Parquet 已在列内压缩，忽略此参数）
+        chunk_size: 每次读取和编码的行数
+
+    返回:
+        generator: 依次产生输出的字节块
+
+    异常:
+        ValueError: 不支持的格式或日期格式不正确
+        ImportError: 导出Parquet但没有安装 pyarrow
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'不支持的导出格式: {fmt}')
+    if fmt == 'parquet':
+        _require_pyarrow()
+        compress = False
+    queries = export_queries(conn, EXPORT_COLUMNS, keywords, date, text)
+
+    parts = _ENCODERS[fmt](iter_query_chunks(conn, queries, chunk_size))
+    if compress:
+        parts = gzip_stream(parts)
+    return parts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='数据仓库批量导出')
+    parser.add_argument('--db', default='data.db', help='数据库文件路径')
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+    parser.add_argument('--keywords', default='', help='按搜索关键词过滤')
+    parser.add_argument('--date', default='', help='按保存日期过滤（YYYY-MM-DD）')
+    parser.add_argument('--q', default='', help='在标题/内容/来源/关键词中全文检索')
+    parser.add_argument('--gzip', action='store_true', help='gzip压缩输出（输出文件名以 .gz 结尾时自动启用）')
+    parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+    parser.add_argument('-o', '--output', default='-', help='输出文件路径，- 表示标准输出')
+    args = parser.parse_args(argv)
+
+    compress = args.gzip or args.output.endswith('.gz')
+    conn = ConnectionPool(args.db).open_readonly()
+    started = time.monotonic()
+    written = 0
+    try:
+        parts = export_stream(conn, args.format, args.keywords, args.date, args.q,
+                              compress=compress, chunk_size=args.chunk_size)
+        out = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+        try:
+            for part in parts:
+                out.write(part)
+                written += len(part)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+    except (ValueError, ImportError) as e:
+        print(f'导出失败: {str(e)}', file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+
+    elapsed = time.monotonic() - started
+    logger.info(f'数据仓库导出完成，格式 {args.format}，{written} 字节，用时 {elapsed:.1f}s')
+    print(f'已导出 {written} 字节，用时 {elapsed:.1f}s', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
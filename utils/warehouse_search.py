@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据仓库检索模块
+
+为 data_warehouse 表维护 FTS5 全文索引（trigram 分词，支持中文子串匹配）
+和 crawled_at 普通索引，并把页面上的检索条件翻译成能走索引的SQL。
+"""
+
+import datetime
+import logging
+import sqlite3
+import sys
+
+logger = logging.getLogger(__name__)
+
+# trigram 分词器至少需要3个字符才能匹配，更短的检索词退回 LIKE 扫描
+FTS_MIN_TERM_LENGTH = 3
+
+
+def init_search_index(conn):
+    """
+    创建全文索引、同步触发器和日期索引（如果不存在）
+
+    对已有数据的旧数据库，首次创建全文索引时会从 data_warehouse 重建索引内容。
+    """
+    cursor = conn.cursor()
+
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_data_warehouse_crawled_at ON data_warehouse (crawled_at)')
+
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'data_warehouse_fts'")
+    fts_exists = cursor.fetchone() is not None
+
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS data_warehouse_fts USING fts5(
+            title, content, source, keywords,
+            content='data_warehouse', content_rowid='id', tokenize='trigram'
+        )
+    ''')
+
+    # 插入、删除、更新时同步全文索引
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS data_warehouse_fts_ai AFTER INSERT ON data_warehouse BEGIN
+            INSERT INTO data_warehouse_fts (rowid, title, content, source, keywords)
+            VALUES (new.id, new.title, new.content, new.source, new.keywords);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS data_warehouse_fts_ad AFTER DELETE ON data_warehouse BEGIN
+            INSERT INTO data_warehouse_fts (data_warehouse_fts, rowid, title, content, source, keywords)
+            VALUES ('delete', old.id, old.title, old.content, old.source, old.keywords);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS data_warehouse_fts_au AFTER UPDATE ON data_warehouse BEGIN
+            INSERT INTO data_warehouse_fts (data_warehouse_fts, rowid, title, content, source, keywords)
+            VALUES ('delete', old.id, old.title, old.content, old.source, old.keywords);
+            INSERT INTO data_warehouse_fts (rowid, title, content, source, keywords)
+            VALUES (new.id, new.title, new.content, new.source, new.keywords);
+        END
+    ''')
+
+    if not fts_exists:
+        cursor.execute("INSERT INTO data_warehouse_fts (data_warehouse_fts) VALUES ('rebuild')")
+        logger.info('数据仓库全文索引已创建并从现有数据重建')
+
+
+def _fts_phrase(term, column=None):
+    """把用户输入转换成FTS5短语查询，避免其中的引号和运算符被解释为查询语法"""
+    phrase = '"' + term.replace('"', '""') + '"'
+    if column:
+        return f'{column} : {phrase}'
+    return phrase
+
+
+def build_filters(keywords='', date='', text='', fts_table='data_warehouse_fts', content_column='content'):
+    """
+    根据页面检索条件构造WHERE子句
+
+    参数:
+        keywords: 按保存时的搜索关键词过滤（子串匹配）
+        date: 按保存日期过滤，格式 YYYY-MM-DD
+        text: 在标题、内容、来源和关键词中全文检索
+        fts_table: 全文索引表名（归档分区使用归档全文索引，见 utils.warehouse_archive）
+        content_column: 检索词较短、退回 LIKE 扫描时内容列的SQL表达式
+
+    返回:
+        tuple: (以 " AND ..." 形式拼接的条件SQL, 参数列表)
+
+    异常:
+        ValueError: 日期格式不正确
+    """
+    clauses = []
+    params = []
+
+    if keywords:
+        if len(keywords) >= FTS_MIN_TERM_LENGTH:
+            clauses.append(f'id IN (SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ?)')
+            params.append(_fts_phrase(keywords, 'keywords'))
+        else:
+            clauses.append('keywords LIKE ?')
+            params.append(f'%{keywords}%')
+
+    if text:
+        if len(text) >= FTS_MIN_TERM_LENGTH:
+            clauses.append(f'id IN (SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ?)')
+            params.append(_fts_phrase(text))
+        else:
+            clauses.append(f'(title LIKE ? OR {content_column} LIKE ? OR source LIKE ? OR keywords LIKE ?)')
+            params.extend([f'%{text}%'] * 4)
+
+    if date:
+        # 用范围条件代替 DATE(crawled_at) = ?，使查询可以走 crawled_at 索引
+        day = datetime.datetime.strptime(date, '%Y-%m-%d').date()
+        clauses.append('crawled_at >= ? AND crawled_at < ?')
+        params.extend([day.isoformat(), (day + datetime.timedelta(days=1)).isoformat()])
+
+    sql = ''.join(f' AND {clause}' for clause in clauses)
+    return sql, params
+
+
+def encode_cursor(row):
+    """把一行数据的排序键编码为分页游标"""
+    return f"{row['crawled_at']}|{row['id']}"
+
+
+def build_keyset(after):
+    """
+    根据分页游标构造键集分页条件
+
+    返回 (crawled_at, id) 严格小于游标的行，配合
+    ORDER BY crawled_at DESC, id DESC 使用，可以沿 crawled_at 索引直接定位，
+    不需要像 OFFSET 那样跳过前面的所有行。
+
+    异常:
+        ValueError: 游标格式不正确
+    """
+    if not after:
+        return '', []
+    crawled_at, _, row_id = after.rpartition('|')
+    if not crawled_at:
+        raise ValueError(f'无效的分页游标: {after}')
+    row_id = int(row_id)
+    return ' AND crawled_at <= ? AND (crawled_at < ? OR id < ?)', [crawled_at, crawled_at, row_id]
+
+
+class KeysetPage:
+    """
+    一页键集分页结果
+
+    查询时多取一行用于判断是否还有下一页。既可以用 load() 一次性读入，
+    也可以直接迭代（流式渲染时逐行读取），has_more 和 next_cursor
+    在迭代结束后可用。
+    """
+
+    def __init__(self, cursor, page_size, on_close=None):
+        self._cursor = cursor
+        self._on_close = on_close
+        self.page_size = page_size
+        self.count = 0
+        self.has_more = False
+        self.next_cursor = None
+        self._rows = None
+
+    def __iter__(self):
+        if self._rows is not None:
+            return iter(self._rows)
+        return self._iter_cursor()
+
+    def _iter_cursor(self):
+        try:
+            for row in self._cursor:
+                if self.count == self.page_size:
+                    self.has_more = True
+                    break
+                self.count += 1
+                self.next_cursor = encode_cursor(row)
+                yield row
+        finally:
+            self.close()
+
+    def load(self):
+        """一次性读入本页所有行"""
+        self._rows = list(self._iter_cursor())
+        return self
+
+    def close(self):
+        if self._on_close:
+            self._on_close()
+            self._on_close = None
+
+
+def migrate(db_path):
+    """为已有的数据库文件补建检索索引"""
+    conn = sqlite3.connect(db_path)
+    try:
+        init_search_index(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    # 用法: python -m utils.warehouse_search [数据库路径]
+    path = sys.argv[1] if len(sys.argv) > 1 else 'data.db'
+    migrate(path)
+    print(f'已完成数据库检索索引迁移: {path}')